@@ -0,0 +1,295 @@
+# bench_async_tier.py
+# Compares the asyncio tier (--async) with the threaded tier on the read-heavy
+# pages (/events, /attendance, /reports) when every query is slow.
+#
+# No Oracle server is needed. The database layer is replaced, in this process
+# only, by a local stand-in that sleeps for --latency per statement and returns
+# canned rows (also for the engagement and forecast panels of /reports, which
+# analytics.py and forecast.py compute and cache between refreshes). Pool limits are enforced as in production: DB_POOL_MAX
+# connections for the threaded tier, DB_ASYNC_POOL_MAX for the async tier.
+#
+#   threaded: one process with --threads request threads (like one --serve worker)
+#   async:    one process running the ASGI app on uvicorn
+#
+# Usage (from the project root):
+#   python benchmarks/bench_async_tier.py --latency 0.05 --concurrency 10 50 200
+
+import argparse
+import asyncio
+import contextlib
+import datetime
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from werkzeug.serving import BaseWSGIServer  # noqa: E402
+
+from event_system import db, analytics, forecast  # noqa: E402
+from event_system.config import DB_CONFIG  # noqa: E402
+
+PATHS = ['/events', '/attendance?event_id=1', '/reports?event_id=1']
+
+EVENT_ROWS = [(i, f"Event {i}", datetime.date(2025, 1, 1) + datetime.timedelta(days=i), '10:00 AM', 'Main Hall', 100)
+              for i in range(1, 21)]
+ROSTER_ROWS = [(f"S{i:04d}", f"Student {i}", 'Y' if i % 3 else 'N') for i in range(1, 51)]
+STUDENT_ROWS = [(f"S{i:04d}", ('CS', 'EE', 'ME')[i % 3], 1 + i % 4) for i in range(1, 51)]
+ENGAGEMENT_ROWS = [(f"S{i:04d}", 4, 3 if i % 3 else 1, 1 if i % 3 else 3) for i in range(1, 51)]
+# (event_id, venue, event_time, course, registered, attended) of past events
+HISTORY_ROWS = [(i, ('Main Hall', 'Lab 2')[i % 2], ('10:00 AM', '06:00 PM')[i % 2], course, 30, 20 + i % 7)
+                for i in range(1, 21) for course in ('CS', 'EE', 'ME')]
+# (event_id, event_name, event_date, event_time, venue, total_slots, course, registered) of upcoming events
+UPCOMING_ROWS = [(i, f"Upcoming {i}", datetime.date(2030, 1, 1) + datetime.timedelta(days=i), '10:00 AM', 'Main Hall',
+                  100, course, 25) for i in range(21, 31) for course in ('CS', 'EE', 'ME')]
+
+
+def _rows_for(statement):
+    if statement == analytics.ROSTER_QUERY:
+        return STUDENT_ROWS
+    if statement == analytics.ENGAGEMENT_QUERY:
+        return ENGAGEMENT_ROWS
+    if statement == forecast.HISTORY_QUERY:
+        return HISTORY_ROWS
+    if statement == forecast.UPCOMING_QUERY:
+        return UPCOMING_ROWS
+    if 'COUNT(*)' in statement:
+        return [(len(ROSTER_ROWS),)]
+    if 'SELECT event_name' in statement:
+        return [('Event',)]
+    if 'attendance_status' in statement:
+        return ROSTER_ROWS
+    return EVENT_ROWS
+
+
+# --- Database stand-in ---
+
+class _StandInCursor:
+    def __init__(self, latency):
+        self.latency = latency
+        self.rows = []
+        self.description = None
+        self.rowcount = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def close(self):
+        pass
+
+    def execute(self, statement, parameters=None):
+        time.sleep(self.latency)
+        self.rows = list(_rows_for(statement))
+        self.description = [('col',)]
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchmany(self, size=100):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+
+class _StandInConnection:
+    def __init__(self, latency, slots):
+        self.latency = latency
+        self.slots = slots
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def cursor(self):
+        return _StandInCursor(self.latency)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        self.slots.release()
+
+
+class _StandInAsyncCursor(_StandInCursor):
+    async def execute(self, statement, parameters=None):
+        await asyncio.sleep(self.latency)
+        self.rows = list(_rows_for(statement))
+        self.description = [('col',)]
+
+    async def fetchone(self):
+        return _StandInCursor.fetchone(self)
+
+    async def fetchmany(self, size=100):
+        return _StandInCursor.fetchmany(self, size)
+
+    async def fetchall(self):
+        return _StandInCursor.fetchall(self)
+
+
+class _StandInAsyncConnection:
+    def __init__(self, latency):
+        self.latency = latency
+
+    def cursor(self):
+        return _StandInAsyncCursor(self.latency)
+
+
+def install_stand_in(latency):
+    sync_slots = threading.BoundedSemaphore(DB_CONFIG['pool_max'])
+    async_slots = {}
+
+    def get_connection():
+        sync_slots.acquire()
+        return _StandInConnection(latency, sync_slots)
+
+    @contextlib.asynccontextmanager
+    async def get_async_connection():
+        loop = asyncio.get_running_loop()
+        slots = async_slots.setdefault(loop, asyncio.Semaphore(DB_CONFIG['async_pool_max']))
+        async with slots:
+            yield _StandInAsyncConnection(latency)
+
+    db.get_connection = get_connection
+    db.get_async_connection = get_async_connection
+
+
+# --- Servers ---
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug server with a fixed pool of request threads, like a gthread worker."""
+
+    def __init__(self, host, port, app, threads):
+        super().__init__(host, port, app)
+        self.executor = ThreadPoolExecutor(threads)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._handle, request, client_address)
+
+    def _handle(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+
+@contextlib.contextmanager
+def threaded_server(flask_app, threads):
+    port = _free_port()
+    server = PooledWSGIServer('127.0.0.1', port, flask_app, threads)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield port
+    finally:
+        server.shutdown()
+        server.executor.shutdown(wait=True)
+
+
+@contextlib.contextmanager
+def async_server(asgi_app):
+    import uvicorn
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(asgi_app, host='127.0.0.1', port=port, lifespan='off',
+                                           log_level='warning', backlog=4096))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    try:
+        yield port
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+# --- Load generator ---
+
+async def _client(port, cookie, stop_at, latencies, errors, offset):
+    i = offset
+    while time.perf_counter() < stop_at:
+        path = PATHS[i % len(PATHS)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\nCookie: {cookie}\r\nConnection: close\r\n\r\n".encode())
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+            status = int(response.split(b' ', 2)[1])
+            if status != 200:
+                errors.append(status)
+                continue
+            latencies.append(time.perf_counter() - start)
+        except (OSError, ValueError, IndexError):
+            errors.append(0)
+
+
+def drive(port, cookie, concurrency, duration):
+    latencies, errors = [], []
+
+    async def main():
+        stop_at = time.perf_counter() + duration
+        await asyncio.gather(*(_client(port, cookie, stop_at, latencies, errors, i) for i in range(concurrency)))
+
+    asyncio.run(main())
+    return latencies, errors
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else float('nan')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="asyncio tier vs threaded tier with a slow database stand-in")
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds per SQL statement")
+    parser.add_argument('--threads', type=int, default=8, help="request threads for the threaded tier")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[10, 50, 200])
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds per run")
+    args = parser.parse_args()
+
+    install_stand_in(args.latency)
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    from event_system.web_ui import create_app
+    from event_system.async_web import AsyncWebApp
+    flask_app = create_app()
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    cookie = f"{flask_app.config['SESSION_COOKIE_NAME']}={serializer.dumps({'user_id': 1, 'username': 'bench', 'role': 'admin'})}"
+
+    print(f"statement latency {args.latency * 1000:.0f} ms, threaded tier: {args.threads} threads / "
+          f"{DB_CONFIG['pool_max']} connections, async tier: {DB_CONFIG['async_pool_max']} connections")
+    print(f"{'mode':<9} {'clients':>7} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for concurrency in args.concurrency:
+        for mode in ('threaded', 'async'):
+            server = threaded_server(flask_app, args.threads) if mode == 'threaded' else async_server(AsyncWebApp(flask_app))
+            with server as port:
+                latencies, errors = drive(port, cookie, concurrency, args.duration)
+            print(f"{mode:<9} {concurrency:>7} {len(latencies) / args.duration:>8.1f} "
+                  f"{_percentile(latencies, 0.50) * 1000:>8.1f} {_percentile(latencies, 0.95) * 1000:>8.1f} "
+                  f"{_percentile(latencies, 0.99) * 1000:>8.1f} {len(errors):>7}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,327 @@
+# bench_core.py
+# End-to-end benchmark of the core operations, called the way the UIs call them:
+#
+#   register            registrations.register_student_for_event
+#   mark_attendance     attendance.mark_attendance
+#   event_attendance    attendance.get_event_attendance
+#   event_statistics    reports.get_event_statistics
+#   export_csv          reports.export_attendance_to_csv
+#   login               auth.login (includes the bcrypt check)
+#   bulk_email          email_utils.send_emails_in_background to a local SMTP sink
+#
+# Each operation runs for --duration seconds under each client count in
+# --clients (one thread per client). Reported: throughput and p50/p95/p99
+# latency; for bulk_email also messages per second.
+#
+# By default the database is a fresh SQLite file seeded with the synthetic data
+# generator (event_system/datagen.py), so runs are reproducible and need no
+# server. --database configured uses DB_BACKEND/DB_* from the environment
+# instead and (re)loads rows with the BENCH prefix there.
+#
+# Results are written as JSON (--output). With --baseline, each result is
+# compared with the same operation and client count in a saved results file;
+# the exit code is 1 when throughput drops or p95 rises by more than --threshold.
+#
+# Usage (from the project root):
+#   python benchmarks/bench_core.py --clients 1 4 16 --output results.json
+#   python benchmarks/bench_core.py --clients 1 4 16 --baseline results.json
+
+import argparse
+import contextlib
+import datetime
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from smtp_sink import SMTPSink  # noqa: E402
+from event_system import db, datagen  # noqa: E402
+from event_system.config import DB_CONFIG, EMAIL_CONFIG  # noqa: E402
+
+OPERATIONS = ('register', 'mark_attendance', 'event_attendance', 'event_statistics',
+              'export_csv', 'login', 'bulk_email')
+
+BENCH_USER = ('bench_user', 'bench-password')
+PREFIX = 'BENCH'
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else None
+
+
+def _failed(result):
+    if result is None or result is False:
+        return True
+    return isinstance(result, str) and not result.startswith(("Success", "Info"))
+
+
+# --- Fixture ---
+
+class Fixture:
+    """Seeds the database and picks the IDs each operation works on."""
+
+    def __init__(self, args, workdir):
+        self.args = args
+        self.workdir = workdir
+        self.plan = datagen.Plan(args.seed, args.students, args.events, args.registrations,
+                                 hot_events=max(1, args.events // 100), hot_share=0.2, attendance_rate=0.7,
+                                 days_back=365, days_ahead=90, anchor_date=datetime.date.today(), prefix=PREFIX)
+
+    def load(self):
+        from event_system import auth, events
+        if self.args.database == 'sqlite':
+            from event_system import sqlite_backend
+            db.use_backend('sqlite')
+            DB_CONFIG['sqlite_path'] = os.path.join(self.workdir, 'bench.db')
+            sqlite_backend.create_schema(DB_CONFIG['sqlite_path'])
+        if not self.args.skip_load:
+            datagen.generate(self.plan, clear_first=self.args.database == 'configured')
+            auth.create_web_user(*BENCH_USER)
+
+        today = datetime.date.today()
+        with db.get_connection() as conn:
+            event_ids = datagen.event_ids_by_index(conn, self.plan)
+        dates = [row[0] for row in self.plan.event_plan()]
+        self.past_events = [event_ids[i] for i, date in enumerate(dates) if date < today]
+
+        # Registration targets: fresh future events with room for everybody, so
+        # every call inserts. Fewer events means more contention on each one.
+        for i in range(self.args.register_events):
+            events.create_event(f"{PREFIX} Register {i}", today + datetime.timedelta(days=30), "10:00 AM",
+                                "Main Auditorium", self.plan.students)
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                cursor.execute("SELECT event_id FROM EVENTS WHERE event_name LIKE :pattern ORDER BY event_id",
+                               {'pattern': f"{PREFIX} Register %"})
+                self.register_events = [row[0] for row in cursor.fetchall()][-self.args.register_events:]
+                query, params = db.paginate(
+                    "SELECT r.event_id, r.student_id FROM REGISTRATIONS r JOIN EVENTS e ON e.event_id = r.event_id "
+                    "WHERE e.event_date < :today ORDER BY r.reg_id", {'today': today}, limit=20000)
+                cursor.execute(query, params)
+                self.attendance_pairs = cursor.fetchall()
+                cursor.execute("SELECT email FROM STUDENTS WHERE student_id LIKE :pattern ORDER BY student_id",
+                               {'pattern': f"{PREFIX}%"})
+                self.emails = [row[0] for row in cursor.fetchall()[:self.args.email_recipients]]
+        self._registration_counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def next_registration(self):
+        with self._lock:
+            n = next(self._registration_counter)
+        events_count = len(self.register_events)
+        return self.register_events[n % events_count], self.plan.student_id((n // events_count) % self.plan.students)
+
+
+def build_operations(fixture, sink_port):
+    from event_system import auth, attendance, email_utils, registrations, reports
+
+    def register(rng, client):
+        return registrations.register_student_for_event(*fixture.next_registration())
+
+    def mark(rng, client):
+        event_id, student_id = rng.choice(fixture.attendance_pairs)
+        return attendance.mark_attendance(event_id, student_id, rng.choice('YN'))
+
+    def event_attendance(rng, client):
+        return attendance.get_event_attendance(rng.choice(fixture.past_events)) is not None
+
+    def event_statistics(rng, client):
+        return reports.get_event_statistics(rng.choice(fixture.past_events))
+
+    def export_csv(rng, client):
+        path = os.path.join(fixture.workdir, f"export-{client}.csv")
+        return reports.export_attendance_to_csv(rng.choice(fixture.past_events), path)
+
+    def login(rng, client):
+        return auth.login(*BENCH_USER)
+
+    def bulk_email(rng, client):
+        EMAIL_CONFIG.update(smtp_server='127.0.0.1', smtp_port=sink_port, smtp_starttls=False, smtp_username='')
+        done = threading.Event()
+        outcome = {}
+
+        def finished(result):
+            outcome.update(result)
+            done.set()
+
+        email_utils.send_emails_in_background(fixture.emails, "Benchmark", "Benchmark body", finished)
+        done.wait()
+        return outcome.get('fail_count') == 0
+
+    return {
+        'register': (register, 1),
+        'mark_attendance': (mark, 1),
+        'event_attendance': (event_attendance, 1),
+        'event_statistics': (event_statistics, 1),
+        'export_csv': (export_csv, 1),
+        'login': (login, 1),
+        'bulk_email': (bulk_email, len(fixture.emails)),
+    }
+
+
+# --- Runner ---
+
+def run(name, func, items_per_call, clients, duration, seed):
+    barrier = threading.Barrier(clients + 1)
+    latencies = [[] for _ in range(clients)]
+    errors = [0] * clients
+    stop_at = [0.0]
+
+    def client(index):
+        rng = random.Random(f"{seed}:{name}:{clients}:{index}")
+        barrier.wait()
+        while time.perf_counter() < stop_at[0]:
+            start = time.perf_counter()
+            try:
+                failed = _failed(func(rng, index))
+            except Exception:
+                failed = True
+            latencies[index].append(time.perf_counter() - start)
+            errors[index] += failed
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    started = time.perf_counter()
+    stop_at[0] = started + duration
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    samples = [value for per_client in latencies for value in per_client]
+    result = {
+        'operation': name,
+        'clients': clients,
+        'calls': len(samples),
+        'errors': sum(errors),
+        'throughput': round(len(samples) / elapsed, 2),
+        'p50_ms': None, 'p95_ms': None, 'p99_ms': None,
+    }
+    for key, fraction in (('p50_ms', 0.50), ('p95_ms', 0.95), ('p99_ms', 0.99)):
+        value = _percentile(samples, fraction)
+        result[key] = round(value * 1000, 3) if value is not None else None
+    if items_per_call != 1:
+        result['items_per_second'] = round(len(samples) * items_per_call / elapsed, 2)
+    return result
+
+
+def compare(results, baseline, threshold):
+    """Returns a list of regression descriptions."""
+    previous = {(r['operation'], r['clients']): r for r in baseline.get('results', [])}
+    regressions = []
+    print(f"\n{'operation':<18} {'clients':>7} {'ops/s':>10} {'change':>8} {'p95 ms':>9} {'change':>8}")
+    for result in results:
+        old = previous.get((result['operation'], result['clients']))
+        if not old or not old['throughput'] or not old['p95_ms'] or result['p95_ms'] is None:
+            continue
+        throughput_change = result['throughput'] / old['throughput'] - 1
+        p95_change = result['p95_ms'] / old['p95_ms'] - 1
+        flag = ""
+        if throughput_change < -threshold or p95_change > threshold:
+            flag = "  REGRESSION"
+            regressions.append(f"{result['operation']} x{result['clients']}: throughput {throughput_change:+.1%}, "
+                               f"p95 {p95_change:+.1%}")
+        print(f"{result['operation']:<18} {result['clients']:>7} {result['throughput']:>10.1f} "
+              f"{throughput_change:>+8.1%} {result['p95_ms']:>9.2f} {p95_change:>+8.1%}{flag}")
+    return regressions
+
+
+def _git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the core operations under concurrent clients.")
+    parser.add_argument('--operations', nargs='+', choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument('--clients', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--duration', type=float, default=5.0, help="seconds per operation and client count")
+    parser.add_argument('--database', choices=('sqlite', 'configured'), default='sqlite')
+    parser.add_argument('--skip-load', action='store_true', help="reuse BENCH rows already in a configured database")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--events', type=int, default=400)
+    parser.add_argument('--registrations', type=int, default=200000)
+    parser.add_argument('--register-events', type=int, default=4, help="events the register benchmark spreads over")
+    parser.add_argument('--email-recipients', type=int, default=50, help="recipients per bulk email call")
+    parser.add_argument('--smtp-latency', type=float, default=0.0, help="seconds the SMTP sink spends per message")
+    parser.add_argument('--output', help="write results JSON to this file")
+    parser.add_argument('--baseline', help="results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="allowed relative regression (default 10%%)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir, SMTPSink(latency=args.smtp_latency) as sink:
+        fixture = Fixture(args, workdir)
+        print(f"Seeding {args.database} database ({args.students} students, {args.events} events, "
+              f"{args.registrations} registrations, seed {args.seed})...", file=sys.stderr)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            fixture.load()
+        operations = build_operations(fixture, sink.port)
+        # email_utils logs every message at INFO.
+        logging.getLogger().setLevel(logging.WARNING)
+
+        results = []
+        print(f"{'operation':<18} {'clients':>7} {'calls':>8} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} "
+              f"{'p99 ms':>9} {'errors':>7}")
+        for name in args.operations:
+            func, items_per_call = operations[name]
+            for clients in args.clients:
+                # The data-access functions print progress; keep the report readable.
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    result = run(name, func, items_per_call, clients, args.duration, args.seed)
+                results.append(result)
+                fmt = lambda v: f"{v:>9.2f}" if v is not None else f"{'-':>9}"  # noqa: E731
+                print(f"{name:<18} {clients:>7} {result['calls']:>8} {result['throughput']:>10.1f} "
+                      f"{fmt(result['p50_ms'])} {fmt(result['p95_ms'])} {fmt(result['p99_ms'])} {result['errors']:>7}")
+        db.close_pool()
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+            'revision': _git_revision(),
+            'backend': db.backend.name,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'duration': args.duration,
+            'seed': args.seed,
+            'students': args.students,
+            'events': args.events,
+            'registrations': args.registrations,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions.")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,159 @@
+# bench_email_render.py
+# Render and build throughput of personalized emails (email_templates.py,
+# email_builder.py).
+#
+# For --recipients synthetic students it times each stage of a send run:
+#
+#   compile     compile_template() for the subject and the body, once per run
+#   render      the subject and body text of every recipient
+#   stdlib      render plus a MIMEMultipart per recipient, serialized with
+#               as_bytes() (how messages were built before email_builder.py)
+#   build       render plus MessageBuilder.build(), which reuses the encoded
+#               attachments
+#   send        build plus delivery to a local SMTP sink (with --send)
+#
+# Every message carries a calendar invite and an agenda of --agenda-kb KiB
+# (0 for none). Reported: messages per second (best of --runs), and the peak
+# Python memory of building every message as the sender asks for it against
+# building them all into a list first. No database is needed.
+#
+# Usage (from the project root):
+#   python benchmarks/bench_email_render.py --recipients 10000
+#   python benchmarks/bench_email_render.py --recipients 10000 --send --json render.json
+
+import argparse
+import datetime
+import json
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from email.mime.application import MIMEApplication
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from smtp_sink import SMTPSink  # noqa: E402
+from event_system import email_builder, email_templates, email_utils  # noqa: E402
+from event_system.config import EMAIL_CONFIG  # noqa: E402
+
+EVENT_ID = 42
+EVENT = ("Annual Tech Symposium", datetime.datetime(2025, 11, 14), "10:30 AM", "Main Auditorium")
+SUBJECT = "{{ first_name }}, your place at {{ event_name }}"
+BODY = email_templates.notification_template(
+    "Please bring your student card ({{ student_id }}). Doors open 30 minutes before the start."
+)
+
+
+def recipients(count):
+    return [(f"BENCH{i:07d}", f"Student Number{i}", f"bench{i}@example.edu") for i in range(count)]
+
+
+def best_rate(runs, count, work):
+    """Runs `work()` `runs` times; returns (messages per second, seconds) of the fastest run."""
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        work()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return count / best, best
+
+
+def peak_memory(build):
+    tracemalloc.start()
+    try:
+        build()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def stdlib_message(to_email, subject, body, attachments):
+    msg = MIMEMultipart()
+    msg['From'] = EMAIL_CONFIG["sender_email"]
+    msg['To'] = to_email
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain'))
+    for attachment in attachments:
+        part = MIMEApplication(attachment.data, Name=attachment.filename)
+        part['Content-Disposition'] = f'attachment; filename="{attachment.filename}"'
+        msg.attach(part)
+    return msg.as_bytes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark personalized email rendering.")
+    parser.add_argument('--recipients', type=int, default=10000)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--agenda-kb', type=int, default=100, help="size of the attached agenda (0: no attachments)")
+    parser.add_argument('--send', action='store_true', help="also send every message to a local SMTP sink")
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args()
+
+    people = recipients(args.recipients)
+    attachments = []
+    if args.agenda_kb:
+        attachments = [email_builder.calendar_invite(EVENT_ID, EVENT),
+                       email_builder.Attachment("agenda.pdf", "application/pdf", os.urandom(args.agenda_kb * 1024))]
+    results = {'recipients': args.recipients, 'agenda_kb': args.agenda_kb}
+
+    start = time.perf_counter()
+    subject = email_templates.compile_template(SUBJECT, EVENT_ID, EVENT)
+    body = email_templates.compile_template(BODY, EVENT_ID, EVENT)
+    results['compile_us'] = (time.perf_counter() - start) * 1e6
+
+    def render():
+        for student_id, name, email in people:
+            subject.render(student_id, name, email)
+            body.render(student_id, name, email)
+
+    def stdlib():
+        for message in email_utils.personalized_messages(subject, body, people):
+            stdlib_message(*message, attachments)
+
+    def build():
+        builder = email_builder.MessageBuilder(attachments)
+        for message in email_utils.personalized_messages(subject, body, people):
+            builder.build(*message)
+
+    for stage, work in (('render', render), ('stdlib', stdlib), ('build', build)):
+        rate, seconds = best_rate(args.runs, args.recipients, work)
+        results[stage] = {'messages_per_second': rate, 'seconds': seconds}
+
+    builder = email_builder.MessageBuilder(attachments)
+    results['peak_bytes_streaming'] = peak_memory(build)
+    results['peak_bytes_materialized'] = peak_memory(
+        lambda: [builder.build(*message) for message in email_utils.personalized_messages(subject, body, people)])
+
+    if args.send:
+        logging.getLogger().setLevel(logging.WARNING)  # email_utils logs every message at INFO
+        with SMTPSink() as sink:
+            EMAIL_CONFIG.update(smtp_server=sink.host, smtp_port=sink.port, smtp_starttls=False, smtp_username='')
+            counts = {}
+
+            def send():
+                counts.update(email_utils.send_messages(email_builder.MessageBuilder(attachments),
+                                                        email_utils.personalized_messages(subject, body, people)))
+
+            rate, seconds = best_rate(1, args.recipients, send)
+        results['send'] = {'messages_per_second': rate, 'seconds': seconds, 'failed': counts['fail_count']}
+
+    print(f"{args.recipients} recipients; templates compiled in {results['compile_us']:.0f} us")
+    print(f"{'stage':<8} {'msgs/s':>10} {'seconds':>9}")
+    for stage in ('render', 'stdlib', 'build', 'send'):
+        if stage in results:
+            print(f"{stage:<8} {results[stage]['messages_per_second']:>10.0f} {results[stage]['seconds']:>9.3f}")
+    print(f"peak memory: {results['peak_bytes_streaming'] / 1e6:.1f} MB streaming, "
+          f"{results['peak_bytes_materialized'] / 1e6:.1f} MB with every message built first")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+# bench_startup.py
+# Tracks cold-start time of the desktop (--ui) and web (--web) modes.
+#
+# Each sample runs a fresh interpreter that performs the same imports and
+# object construction as `python -m event_system --ui/--web` up to the point
+# where it would open a window or start listening, then reports which heavy
+# GUI/web packages ended up loaded. Nothing connects to the database.
+#
+# Usage (from the project root):
+#   python benchmarks/bench_startup.py --runs 10
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+# Desktop mode: import path of __main__ for --ui, without creating the Tk window.
+UI_SNIPPET = """
+import event_system.__main__
+from event_system.ui import EventSystemUI
+"""
+
+# Web mode: import path of __main__ for --web, including the app factory.
+WEB_SNIPPET = """
+import event_system.__main__
+from event_system.web_ui import create_app
+create_app()
+"""
+
+REPORT_SNIPPET = """
+import json, sys
+print(json.dumps({name: name in sys.modules for name in ('tkinter', 'ttkthemes', 'flask', 'flask_wtf', 'wtforms')}))
+"""
+
+MODES = {'--ui': UI_SNIPPET, '--web': WEB_SNIPPET}
+
+
+def cold_start(snippet):
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', snippet + REPORT_SNIPPET], capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return elapsed, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold-start benchmark for --ui and --web")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--json', help="write results to this file")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'mode':<6} {'median ms':>10} {'min ms':>8} {'max ms':>8}  loaded")
+    for mode, snippet in MODES.items():
+        cold_start(snippet)  # populate the OS file cache and bytecode caches
+        timings = []
+        loaded = {}
+        for _ in range(args.runs):
+            elapsed, loaded = cold_start(snippet)
+            timings.append(elapsed * 1000)
+        results[mode] = {
+            'median_ms': statistics.median(timings),
+            'min_ms': min(timings),
+            'max_ms': max(timings),
+            'loaded': sorted(name for name, present in loaded.items() if present),
+        }
+        r = results[mode]
+        print(f"{mode:<6} {r['median_ms']:>10.1f} {r['min_ms']:>8.1f} {r['max_ms']:>8.1f}  {', '.join(r['loaded'])}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# bench_wsgi_workers.py
+# Measures web UI throughput (requests per second) as `--serve` scales from one
+# worker process up to one per CPU core.
+#
+# Each run starts `python -m event_system --serve` on a free local port and
+# drives it with keep-alive HTTP clients for a fixed duration. The default
+# target is GET /login, which renders a template and issues a CSRF token but
+# needs no database, so the numbers reflect the serving stack itself.
+#
+# Usage (from the project root):
+#   python benchmarks/bench_wsgi_workers.py --threads 4 --clients 32 --duration 10
+
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def _client(port, path, stop_at, results):
+    done = errors = 0
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    while time.perf_counter() < stop_at:
+        try:
+            conn.request('GET', path)
+            response = conn.getresponse()
+            response.read()
+            if response.status < 400:
+                done += 1
+            else:
+                errors += 1
+        except (OSError, http.client.HTTPException):
+            errors += 1
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    conn.close()
+    results.append((done, errors))
+
+
+def run_level(workers, threads, clients, duration, path):
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'event_system', '--serve', '--bind', f'127.0.0.1:{port}',
+         '--workers', str(workers), '--threads', str(threads)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        env=dict(os.environ, SECRET_KEY='benchmark'),
+    )
+    try:
+        if not _wait_for_port(port):
+            raise RuntimeError("server did not start; is gunicorn installed?")
+        # Warm up every worker before measuring.
+        _client(port, path, time.perf_counter() + 1.0, [])
+        results = []
+        stop_at = time.perf_counter() + duration
+        pool = [threading.Thread(target=_client, args=(port, path, stop_at, results)) for _ in range(clients)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        done = sum(r[0] for r in results)
+        errors = sum(r[1] for r in results)
+        return done / duration, errors
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Web UI throughput as --serve scales from one worker to one per CPU core.")
+    parser.add_argument('--threads', type=int, default=4, help="threads per worker")
+    parser.add_argument('--clients', type=int, default=32, help="concurrent HTTP clients")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per level")
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--path', default='/login')
+    args = parser.parse_args()
+
+    levels = []
+    workers = 1
+    while workers < args.max_workers:
+        levels.append(workers)
+        workers *= 2
+    levels.append(args.max_workers)
+
+    print(f"{'workers':>8} {'threads':>8} {'req/s':>10} {'speedup':>8} {'errors':>7}")
+    baseline = None
+    for workers in levels:
+        rps, errors = run_level(workers, args.threads, args.clients, args.duration, args.path)
+        baseline = baseline or rps
+        print(f"{workers:>8} {args.threads:>8} {rps:>10.1f} {rps / baseline:>7.2f}x {errors:>7}")
+
+
+if __name__ == '__main__':
+    main()
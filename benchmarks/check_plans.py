@@ -0,0 +1,296 @@
+# check_plans.py
+# Query-plan regression check for the statements the data-access modules run.
+#
+# Each function in registrations.py, attendance.py, reports.py, events.py,
+# students.py, auth.py, analytics.py, forecast.py, campaigns.py and
+# reminders.py is called once against a seeded database while SQL tracing
+# records every statement it issues (with its binds). Each distinct statement is then explained (EXPLAIN PLAN on
+# Oracle, EXPLAIN QUERY PLAN on SQLite) and compared with a committed baseline:
+#
+#   plan changed     the plan differs from the baseline          -> fails
+#   new full scan    a full table scan the baseline did not have -> fails
+#   new statement    not in the baseline; fails if it full-scans
+#
+# Full scans recorded in the baseline (small tables, whole-table reads) are
+# listed but accepted. After an intended change, review the report and
+# refresh the baseline with --update.
+#
+# By default the database is a fresh SQLite file seeded by the synthetic data
+# generator, compared with plan_baseline_sqlite.json. --database configured
+# checks the database from the environment (e.g. a staging Oracle seeded with
+# `python -m event_system.datagen`) against plan_baseline_<backend>.json.
+#
+# Usage (from the project root):
+#   python benchmarks/check_plans.py
+#   python benchmarks/check_plans.py --update
+#   DB_BACKEND=oracle python benchmarks/check_plans.py --database configured
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import sys
+import tempfile
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from smtp_sink import SMTPSink  # noqa: E402
+from event_system import db, datagen, sqltrace  # noqa: E402
+from event_system import analytics, attendance, auth, campaigns, events, forecast, registrations, reminders, reports, students  # noqa: E402
+from event_system.config import DB_CONFIG, EMAIL_CONFIG  # noqa: E402
+
+MODULES = {module.__name__: module.__name__.rsplit('.', 1)[1]
+           for module in (registrations, attendance, reports, events, students, auth, analytics, forecast, campaigns,
+                          reminders)}
+
+PREFIX = 'PLAN'
+PLAN_USER = ('plan_user', 'plan-password')
+
+
+def default_baseline(backend_name):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), f"plan_baseline_{backend_name}.json")
+
+
+# --- Statement capture ---
+
+class StatementCollector:
+    """Records each distinct (function, statement) with the binds of its first run."""
+
+    def __init__(self):
+        self.statements = {}
+
+    def __call__(self, statement, parameters, many):
+        if many and parameters:
+            parameters = parameters[0]
+        function = self._caller()
+        if function is None:
+            return  # issued by the workload itself
+        key = (function, sqltrace.normalize(statement))
+        if key not in self.statements and not key[1].upper().startswith(('BEGIN', 'COMMIT', 'ROLLBACK')):
+            self.statements[key] = (statement, parameters)
+
+    @staticmethod
+    def _caller():
+        # The innermost frame in one of the checked modules names the statement.
+        frame = sys._getframe(2)
+        while frame is not None:
+            module = MODULES.get(frame.f_globals.get('__name__'))
+            if module:
+                return f"{module}.{frame.f_code.co_name}"
+            frame = frame.f_back
+        return None
+
+
+def run_workload(plan, workdir):
+    """Calls every data-access function once, covering the waitlist and archive paths."""
+    today = datetime.date.today()
+    student = plan.student_id
+
+    with db.get_connection() as conn:
+        event_ids = datagen.event_ids_by_index(conn, plan)
+    dates = [row[0] for row in plan.event_plan()]
+    past_event = next(event_ids[i] for i, date in enumerate(dates) if date < today)
+    busy_event = max(event_ids)
+
+    events.get_all_events()
+    events.get_all_events(limit=20)
+    events.get_event_details(busy_event)
+    events.create_event(f"{PREFIX} Check", today + datetime.timedelta(days=7), "10:00 AM", "Main Auditorium", 2)
+    with db.get_connection() as conn:
+        with db.cursor(conn) as cursor:
+            cursor.execute("SELECT MAX(event_id) FROM EVENTS WHERE event_name = :name", {'name': f"{PREFIX} Check"})
+            small_event = cursor.fetchone()[0]
+
+    students.get_all_students()
+    students.get_all_students(limit=50)
+    students.add_student(f"{PREFIX}X0000001", "Plan Check", "plan.check@example.com", "Physics", 2)
+
+    auth.create_web_user(*PLAN_USER)
+    auth.login(*PLAN_USER)
+
+    # Two places, the rest waitlisted, then cancellations that promote.
+    registrations.register_student_for_event(small_event, student(0))
+    registrations.register_students_for_event(small_event, [student(i) for i in range(1, 6)])
+    registrations.get_registered_students(busy_event)
+    registrations.get_registered_students(busy_event, limit=50)
+    registrations.get_waitlist(small_event)
+    registrations.get_waitlist(small_event, limit=50)
+    registrations.cancel_registration(small_event, student(0))
+    registrations.cancel_registrations(small_event, [student(1), student(2)])
+    registrations.cancel_student_registrations([student(3)])
+    registrations.cancel_event_registrations(small_event)
+
+    attendance.mark_attendance(past_event, registrations.get_registered_students(past_event, limit=1)[0][0])
+    attendance.mark_attendance_bulk(past_event, [(row[0], 'Y') for row in registrations.get_registered_students(past_event, limit=20)])
+    attendance.get_event_attendance(busy_event)
+    attendance.get_event_attendance(busy_event, limit=50)
+
+    reports.get_event_statistics(busy_event)
+    reports.get_event_statistics(past_event, include_archived=True)
+    reports.export_attendance_to_csv(past_event, os.path.join(workdir, 'plan_check.csv'), include_archived=True)
+    # Needs pyarrow; without it no statement is issued (reported as "no longer issued").
+    reports.export_attendance_columnar(os.path.join(workdir, 'plan_check.parquet'),
+                                       date_from=today - datetime.timedelta(days=30), date_to=today)
+    reports.export_attendance_columnar(os.path.join(workdir, 'plan_check.arrow'), 'arrow', event_ids=[past_event, busy_event])
+
+    analytics.student_timeline(student(10))
+    analytics.student_timeline(student(10), limit=20)
+    analytics.engagement.full_refresh_seconds = 0
+    analytics.get_engagement_snapshot(refresh=True)
+    # Needs numpy; without it the forecast queries are not issued.
+    forecast.forecaster.full_refresh_seconds = 0
+    forecast.get_forecast(refresh=True)
+
+    # A campaign to a local SMTP sink; the delivery log flushes before the callback.
+    with SMTPSink() as sink:
+        EMAIL_CONFIG.update(smtp_server=sink.host, smtp_port=sink.port, smtp_starttls=False, smtp_username='')
+        sent = threading.Event()
+        _, event_name, event_date, event_time, venue, _ = events.get_event_details(busy_event)
+        campaigns.suppress_email(f"{PREFIX}.check@example.com", "Plan check")
+        campaigns.count_recipients(busy_event)
+        campaign_id, _ = campaigns.start_campaign(
+            busy_event, (event_name, event_date, event_time, venue), "Plan check", "Dear {{ name }}",
+            completion_callback=lambda counts: sent.set()
+        )
+        sent.wait(60)
+    # The /emails page lists the newest campaigns across events; the SQLite plan
+    # walks the primary key backwards and stops after the page (SCAN c).
+    campaigns.get_campaigns(limit=20)
+    campaigns.get_campaigns(busy_event, limit=20)
+    campaigns.get_campaign(campaign_id)
+    campaigns.get_deliveries(campaign_id, limit=50)
+    campaigns.resend_failed(campaign_id)
+    campaigns.get_suppressions(limit=50)
+    campaigns.unsuppress_email(f"{PREFIX}.check@example.com")
+
+    scheduler = reminders.ReminderScheduler([24, 1], 300, 60)
+    scheduler._acquire_lease()
+    scheduler.refresh()
+    scheduler._record(small_event, 60)
+    scheduler._release_lease()
+
+
+def collect(plan, workdir):
+    collector = StatementCollector()
+    sqltrace.enable(slow_query_ms=float('inf'))
+    sqltrace.add_listener(collector)
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            run_workload(plan, workdir)
+    finally:
+        sqltrace.remove_listener(collector)
+        sqltrace.disable()
+    return collector.statements
+
+
+def explain_all(statements):
+    """Returns {"function: statement": {"plan": [...], "full_scans": [...]}}."""
+    plans = {}
+    with db.get_connection() as conn:
+        with db.cursor(conn) as cursor:
+            for (function, normalized), (statement, parameters) in sorted(statements.items()):
+                try:
+                    steps = db.backend.explain(cursor, statement, parameters)
+                except db.DatabaseError as e:
+                    steps = [(f"(not explainable: {e})", None)]
+                plans[f"{function}: {normalized}"] = {
+                    'plan': [step for step, _ in steps],
+                    'full_scans': sorted({table for _, table in steps if table}),
+                }
+                conn.rollback()
+    return plans
+
+
+# --- Comparison ---
+
+def compare(plans, baseline):
+    """Returns (failures, warnings) as lists of report lines."""
+    failures, warnings = [], []
+    for key, current in plans.items():
+        previous = baseline.get(key)
+        if previous is None:
+            if current['full_scans']:
+                failures.append(f"new statement with full scan of {', '.join(current['full_scans'])}: {key}")
+            else:
+                warnings.append(f"new statement: {key}")
+            continue
+        new_scans = sorted(set(current['full_scans']) - set(previous['full_scans']))
+        if new_scans:
+            failures.append(f"new full scan of {', '.join(new_scans)}: {key}")
+        if current['plan'] != previous['plan']:
+            failures.append(f"plan changed: {key}\n      was: " + "\n           ".join(previous['plan'])
+                            + "\n      now: " + "\n           ".join(current['plan']))
+    for key in sorted(set(baseline) - set(plans)):
+        warnings.append(f"no longer issued: {key}")
+    return failures, warnings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Explain the data-access statements and compare with a baseline.")
+    parser.add_argument('--database', choices=('sqlite', 'configured'), default='sqlite')
+    parser.add_argument('--baseline', help="baseline JSON (default: plan_baseline_<backend>.json next to this script)")
+    parser.add_argument('--update', action='store_true', help="write the current plans as the new baseline")
+    parser.add_argument('--verbose', action='store_true', help="print every plan")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--students', type=int, default=20000)
+    parser.add_argument('--events', type=int, default=400)
+    parser.add_argument('--registrations', type=int, default=200000)
+    args = parser.parse_args()
+
+    plan = datagen.Plan(args.seed, args.students, args.events, args.registrations,
+                        hot_events=max(1, args.events // 100), hot_share=0.2, attendance_rate=0.7,
+                        days_back=365, days_ahead=90, anchor_date=datetime.date.today(), prefix=PREFIX)
+    with tempfile.TemporaryDirectory() as workdir:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            if args.database == 'sqlite':
+                from event_system import sqlite_backend
+                db.use_backend('sqlite')
+                DB_CONFIG['sqlite_path'] = os.path.join(workdir, 'plans.db')
+                sqlite_backend.create_schema(DB_CONFIG['sqlite_path'])
+            print(f"Seeding {db.backend.name} database...", file=sys.stderr)
+            datagen.generate(plan, clear_first=args.database == 'configured')
+        statements = collect(plan, workdir)
+        plans = explain_all(statements)
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            db.close_pool()
+
+    full_scans = {key: entry['full_scans'] for key, entry in plans.items() if entry['full_scans']}
+    print(f"Explained {len(plans)} statements on {db.backend.name}; {len(full_scans)} use a full table scan.")
+    if args.verbose:
+        for key, entry in plans.items():
+            print(f"\n{key}\n    " + "\n    ".join(entry['plan']))
+
+    baseline_path = args.baseline or default_baseline(db.backend.name)
+    if args.update:
+        with open(baseline_path, 'w') as f:
+            json.dump(plans, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Baseline written to {baseline_path}")
+        return
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path}; run with --update to create it.")
+        sys.exit(1)
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+
+    failures, warnings = compare(plans, baseline)
+    accepted = [key for key in full_scans if key in baseline and set(full_scans[key]) <= set(baseline[key]['full_scans'])]
+    if accepted:
+        print(f"\nFull scans accepted by the baseline ({len(accepted)}):")
+        for key in accepted:
+            print(f"  {', '.join(full_scans[key])}: {key}")
+    for line in warnings:
+        print(f"\nwarning: {line}")
+    if failures:
+        print(f"\n{len(failures)} plan regression(s):")
+        for line in failures:
+            print(f"  {line}")
+        sys.exit(1)
+    print("\nNo plan regressions.")
+
+
+if __name__ == '__main__':
+    main()
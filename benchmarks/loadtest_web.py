@@ -0,0 +1,364 @@
+# loadtest_web.py
+# HTTP load test of the web UI during a registration rush.
+#
+# Each virtual user replays the flow of a coordinator at a busy event:
+#
+#   GET  /login                 fetch the CSRF token
+#   POST /login                 log in (session cookie)
+#   then, repeatedly:
+#   GET  /registrations         open the event's registration page (CSRF token)
+#   POST /registrations         register a student, follow the redirect
+#   GET  /attendance            poll the roster (--polls times, with think time)
+#   GET  /reports/export/<id>   download the attendance CSV
+#
+# Concurrency ramps through --ramp (virtual users per stage, each stage lasting
+# --stage-seconds); users are added, never restarted, so sessions persist.
+# Latency percentiles and error rates are reported per route and per stage.
+# Registration outcomes (registered / waitlisted / already registered / event
+# full) are counted separately from errors, since a full event is the expected
+# end of a rush.
+#
+# By default the app is started locally (`--serve`, i.e. gunicorn) on the
+# SQLite backend, seeded by the synthetic data generator, so nothing external
+# is needed. Use --url with --username/--password to test a running server.
+#
+# Usage (from the project root):
+#   python benchmarks/loadtest_web.py --ramp 5 10 25 50 --stage-seconds 20 --workers 2 --threads 8
+#   python benchmarks/loadtest_web.py --url http://127.0.0.1:8000 --username admin1 --password admin123 --events 1 2
+
+import argparse
+import http.client
+import http.cookies
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CSRF_TOKEN = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+FLASH = re.compile(r'class="alert alert-(\w+)[^"]*">([^<]*)<')
+
+PREFIX = 'LOAD'
+
+
+def _percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] if ordered else None
+
+
+# --- Local server on the SQLite stand-in ---
+
+def seed_database(path, args):
+    """Creates and seeds a SQLite database; returns (credentials, rush event IDs, student IDs)."""
+    import datetime
+    from event_system import auth, datagen, db, sqlite_backend
+    from event_system.config import DB_CONFIG
+
+    db.use_backend('sqlite')
+    DB_CONFIG['sqlite_path'] = path
+    sqlite_backend.create_schema(path)
+    plan = datagen.Plan(args.seed, args.students, args.seed_events, args.seed_registrations,
+                        hot_events=1, hot_share=0.2, attendance_rate=0.7, days_back=180, days_ahead=60,
+                        anchor_date=datetime.date.today(), prefix=PREFIX)
+    datagen.generate(plan)
+
+    credentials = ('load_admin', 'load-password')
+    today = datetime.date.today()
+    with db.get_connection() as conn:
+        with db.cursor(conn) as cursor:
+            cursor.execute("INSERT INTO USERS (username, password, role) VALUES (:1, :2, 'admin')",
+                           [credentials[0], auth.hash_password(credentials[1])])
+            # The rush: events open today with limited slots.
+            cursor.executemany(
+                "INSERT INTO EVENTS (event_name, event_date, event_time, venue, total_slots) VALUES (:1, :2, :3, :4, :5)",
+                [(f"{PREFIX} Rush {i}", today, "10:00 AM", "Main Auditorium", args.slots) for i in range(args.rush_events)])
+            cursor.execute("SELECT event_id FROM EVENTS WHERE event_name LIKE :pattern ORDER BY event_id",
+                           {'pattern': f"{PREFIX} Rush %"})
+            rush_events = [row[0] for row in cursor.fetchall()]
+        conn.commit()
+    db.close_pool()
+    return credentials, rush_events, [plan.student_id(i) for i in range(args.students)]
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(db_path, workers, threads, log_path):
+    port = _free_port()
+    env = dict(os.environ, DB_BACKEND='sqlite', SQLITE_PATH=db_path, SECRET_KEY='load-test-secret')
+    log = open(log_path, 'w')
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'event_system', '--serve', '--bind', f'127.0.0.1:{port}',
+         '--workers', str(workers), '--threads', str(threads)],
+        cwd=ROOT, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            connection.request('GET', '/login')
+            if connection.getresponse().status == 200:
+                return process, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"The server did not start; see {log_path}")
+
+
+# --- Virtual users ---
+
+class Recorder:
+    """Collects (stage, route, seconds, ok) samples and registration outcomes."""
+
+    def __init__(self):
+        self.stage = 0
+        self.samples = []
+        self.outcomes = {}
+        self._lock = threading.Lock()
+
+    def record(self, route, seconds, ok):
+        self.samples.append((self.stage, route, seconds, ok))  # list.append is atomic
+
+    def outcome(self, kind):
+        with self._lock:
+            self.outcomes[kind] = self.outcomes.get(kind, 0) + 1
+
+
+class Browser:
+    """A keep-alive HTTP client with a cookie jar, like one browser tab."""
+
+    def __init__(self, base_url, recorder):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.host, self.port = parsed.hostname, parsed.port or 80
+        self.recorder = recorder
+        self.cookies = {}
+        self.connection = None
+
+    def _connect(self):
+        self.connection = http.client.HTTPConnection(self.host, self.port, timeout=60)
+
+    def request(self, route, method, path, form=None):
+        """Returns (status, headers, body); records the sample under `route`."""
+        headers = {}
+        if self.cookies:
+            headers['Cookie'] = "; ".join(f"{k}={v}" for k, v in self.cookies.items())
+        body = None
+        if form is not None:
+            body = urllib.parse.urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        start = time.perf_counter()
+        for attempt in (1, 2):
+            try:
+                if self.connection is None:
+                    self._connect()
+                self.connection.request(method, path, body=body, headers=headers)
+                response = self.connection.getresponse()
+                data = response.read()
+                break
+            except (OSError, http.client.HTTPException):
+                # The server may close an idle keep-alive connection; retry once.
+                self.connection = None
+                if attempt == 2:
+                    self.recorder.record(route, time.perf_counter() - start, False)
+                    return 0, {}, b""
+        elapsed = time.perf_counter() - start
+        for header in response.headers.get_all('Set-Cookie') or []:
+            cookie = http.cookies.SimpleCookie(header)
+            for name, morsel in cookie.items():
+                self.cookies[name] = morsel.value
+        self.recorder.record(route, elapsed, response.status < 400)
+        return response.status, response.headers, data
+
+    def redirect_target(self, headers):
+        location = headers.get('Location', '')
+        parsed = urllib.parse.urlsplit(location)
+        return parsed.path + (f"?{parsed.query}" if parsed.query else "")
+
+
+def _csrf(body):
+    match = CSRF_TOKEN.search(body.decode('utf-8', 'replace'))
+    return match.group(1) if match else ''
+
+
+def virtual_user(index, base_url, args, credentials, events, students, recorder, stop):
+    rng = random.Random(f"{args.seed}:user:{index}")
+    browser = Browser(base_url, recorder)
+
+    def think():
+        stop.wait(rng.expovariate(1 / args.think) if args.think else 0)
+
+    status, _, body = browser.request('GET /login', 'GET', '/login')
+    status, headers, _ = browser.request('POST /login', 'POST', '/login', {
+        'csrf_token': _csrf(body), 'username': credentials[0], 'password': credentials[1]})
+    if status != 302 or '/dashboard' not in headers.get('Location', ''):
+        recorder.record('login failed', 0.0, False)
+        return
+
+    while not stop.is_set():
+        event_id = rng.choice(events)
+        status, _, body = browser.request('GET /registrations', 'GET', f'/registrations?event_id={event_id}')
+        think()
+        status, headers, _ = browser.request('POST /registrations', 'POST', '/registrations', {
+            'csrf_token': _csrf(body), 'event_id': event_id, 'student_id': rng.choice(students)})
+        if status == 302:
+            _, _, page = browser.request('GET /registrations', 'GET', browser.redirect_target(headers))
+            flashes = FLASH.findall(page.decode('utf-8', 'replace'))
+            category, message = flashes[0] if flashes else ('', '')
+            if category == 'success':
+                recorder.outcome('registered')
+            elif 'waitlist (position' in message:
+                recorder.outcome('waitlisted')
+            elif category == 'info':
+                recorder.outcome('already registered')
+            elif 'is full' in message or 'Too many' in message:
+                recorder.outcome('event full')
+            else:
+                recorder.outcome('other')
+        for _ in range(args.polls):
+            if stop.is_set():
+                return
+            think()
+            browser.request('GET /attendance', 'GET', f'/attendance?event_id={event_id}')
+        think()
+        browser.request('GET /reports/export', 'GET', f'/reports/export/{event_id}')
+        think()
+
+
+# --- Report ---
+
+def summarize(samples, duration_by_stage):
+    """Returns {stage: {route: stats}}; stage 'all' covers the whole run."""
+    grouped = {}
+    for stage, route, seconds, ok in samples:
+        for key in (stage, 'all'):
+            grouped.setdefault(key, {}).setdefault(route, []).append((seconds, ok))
+    summary = {}
+    total_duration = sum(duration_by_stage.values())
+    for stage, routes in grouped.items():
+        duration = total_duration if stage == 'all' else duration_by_stage.get(stage, 1)
+        summary[stage] = {}
+        for route, values in sorted(routes.items()):
+            latencies = [seconds for seconds, _ in values]
+            errors = sum(1 for _, ok in values if not ok)
+            summary[stage][route] = {
+                'requests': len(values),
+                'errors': errors,
+                'error_rate': round(errors / len(values), 4),
+                'rps': round(len(values) / duration, 2),
+                'p50_ms': round(_percentile(latencies, 0.50) * 1000, 2),
+                'p95_ms': round(_percentile(latencies, 0.95) * 1000, 2),
+                'p99_ms': round(_percentile(latencies, 0.99) * 1000, 2),
+            }
+    return summary
+
+
+def print_stage(title, routes):
+    print(f"\n{title}")
+    print(f"  {'route':<22} {'requests':>8} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>8}")
+    for route, stats in routes.items():
+        print(f"  {route:<22} {stats['requests']:>8} {stats['rps']:>8.1f} {stats['p50_ms']:>9.1f} "
+              f"{stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f} {stats['error_rate']:>8.2%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ramped HTTP load test of the web UI flows.")
+    parser.add_argument('--ramp', type=int, nargs='+', default=[5, 10, 25, 50], help="virtual users per stage")
+    parser.add_argument('--stage-seconds', type=float, default=15.0)
+    parser.add_argument('--think', type=float, default=0.5, help="mean think time between requests, seconds")
+    parser.add_argument('--polls', type=int, default=3, help="attendance polls per iteration")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--url', help="test a running server instead of starting one")
+    parser.add_argument('--username', help="admin user for --url")
+    parser.add_argument('--password', help="password for --url")
+    parser.add_argument('--events', type=int, nargs='+', help="event IDs to register for (with --url)")
+    parser.add_argument('--student-ids', nargs='+', help="student IDs to register (with --url)")
+    parser.add_argument('--workers', type=int, default=2, help="server worker processes (local server)")
+    parser.add_argument('--threads', type=int, default=8, help="threads per worker (local server)")
+    parser.add_argument('--students', type=int, default=5000, help="seeded students (local server)")
+    parser.add_argument('--seed-events', type=int, default=100, help="seeded past/future events (local server)")
+    parser.add_argument('--seed-registrations', type=int, default=50000, help="seeded registrations (local server)")
+    parser.add_argument('--rush-events', type=int, default=2, help="events opening today (local server)")
+    parser.add_argument('--slots', type=int, default=300, help="slots per rush event (local server)")
+    parser.add_argument('--output', help="write the summary as JSON to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        process = None
+        if args.url:
+            if not (args.username and args.password and args.events and args.student_ids):
+                parser.error("--url requires --username, --password, --events and --student-ids")
+            base_url, credentials = args.url, (args.username, args.password)
+            events, students = args.events, args.student_ids
+        else:
+            db_path = os.path.join(workdir, 'load.db')
+            print("Seeding the SQLite stand-in...", file=sys.stderr)
+            with open(os.devnull, 'w') as devnull:
+                stdout, sys.stdout = sys.stdout, devnull
+                try:
+                    credentials, events, students = seed_database(db_path, args)
+                finally:
+                    sys.stdout = stdout
+            process, base_url = start_server(db_path, args.workers, args.threads, os.path.join(workdir, 'server.log'))
+            print(f"Server: {base_url} ({args.workers} workers x {args.threads} threads)", file=sys.stderr)
+
+        recorder = Recorder()
+        stop = threading.Event()
+        users = []
+        durations = {}
+        try:
+            for stage, target in enumerate(args.ramp):
+                recorder.stage = stage
+                while len(users) < target:
+                    thread = threading.Thread(target=virtual_user, daemon=True, args=(
+                        len(users), base_url, args, credentials, events, students, recorder, stop))
+                    thread.start()
+                    users.append(thread)
+                print(f"Stage {stage + 1}/{len(args.ramp)}: {target} users for {args.stage_seconds:.0f}s...",
+                      file=sys.stderr)
+                stage_start = time.perf_counter()
+                time.sleep(args.stage_seconds)
+                durations[stage] = time.perf_counter() - stage_start
+        finally:
+            stop.set()
+            for thread in users:
+                thread.join(timeout=60)
+            if process is not None:
+                process.terminate()
+                process.wait(timeout=30)
+
+    summary = summarize(recorder.samples, durations)
+    for stage, target in enumerate(args.ramp):
+        if stage in summary:
+            print_stage(f"Stage {stage + 1}: {target} users", summary[stage])
+    if 'all' in summary:
+        print_stage("Whole run", summary['all'])
+    print(f"\nRegistration outcomes: " + ", ".join(f"{k} {v}" for k, v in sorted(recorder.outcomes.items())))
+
+    if args.output:
+        report = {
+            'ramp': args.ramp,
+            'stage_seconds': args.stage_seconds,
+            'stages': {str(stage + 1): summary.get(stage, {}) for stage in range(len(args.ramp))},
+            'all': summary.get('all', {}),
+            'registration_outcomes': recorder.outcomes,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
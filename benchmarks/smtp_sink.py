@@ -0,0 +1,104 @@
+# smtp_sink.py
+# A local SMTP server that accepts and discards every message, for benchmarks.
+#
+# It speaks just enough plain SMTP for smtplib (no TLS, no AUTH), so point the
+# application at it with smtp_starttls=False and an empty smtp_username.
+# An optional per-message delay stands in for a slow relay.
+#
+#   with SMTPSink(latency=0.005) as sink:
+#       ... send to 127.0.0.1:sink.port ...
+#       print(sink.messages, sink.recipients)
+
+import socketserver
+import threading
+import time
+
+
+class _SinkHandler(socketserver.StreamRequestHandler):
+    # Replies are small writes; without this, Nagle plus the client's delayed
+    # ACK adds ~40 ms to every message.
+    disable_nagle_algorithm = True
+
+    def _reply(self, line):
+        self.wfile.write(line.encode('ascii') + b"\r\n")
+
+    def handle(self):
+        sink = self.server.sink
+        self._reply("220 localhost benchmark sink")
+        recipients = 0
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == b"EHLO":
+                self._reply("250-localhost\r\n250 8BITMIME")
+            elif command == b"HELO":
+                self._reply("250 localhost")
+            elif command == b"MAIL":
+                recipients = 0
+                self._reply("250 OK")
+            elif command == b"RCPT":
+                recipients += 1
+                self._reply("250 OK")
+            elif command == b"DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                for data_line in self.rfile:
+                    if data_line in (b".\r\n", b".\n"):
+                        break
+                    size += len(data_line)
+                if sink.latency:
+                    time.sleep(sink.latency)
+                sink._accepted(recipients, size)
+                self._reply("250 OK: queued")
+            elif command in (b"RSET", b"NOOP"):
+                self._reply("250 OK")
+            elif command == b"QUIT":
+                self._reply("221 Bye")
+                return
+            else:
+                self._reply("502 Command not implemented")
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    request_queue_size = 128
+
+
+class SMTPSink:
+    """Counts accepted messages, recipients and bytes."""
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        self.latency = latency
+        self.messages = 0
+        self.recipients = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), _SinkHandler)
+        self._server.sink = self
+        self.host, self.port = self._server.server_address[:2]
+        self._thread = None
+
+    def _accepted(self, recipients, size):
+        with self._lock:
+            self.messages += 1
+            self.recipients += recipients
+            self.bytes += size
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
@@ -1,10 +1,10 @@
 # main.py
 # Main entry point for the Event Registration and Attendance System.
+#
+# Interface modules are imported only for the selected mode: the desktop UI
+# never loads Flask, and the web modes never load Tkinter.
 
 import argparse
-from .ui import EventSystemUI
-from .web_ui import app as web_app
-from . import db
 
 def main():
     """
@@ -13,15 +13,28 @@ def main():
     parser = argparse.ArgumentParser(description="Event Registration and Attendance System")
     group = parser.add_mutually_exclusive_group()
     group.add_argument("--ui", action="store_true", help="Run the Tkinter desktop UI")
-    group.add_argument("--web", action="store_true", help="Run the Flask web UI")
+    group.add_argument("--web", action="store_true", help="Run the Flask web UI (development server)")
+    group.add_argument("--serve", action="store_true", help="Run the web UI on a multi-worker production server")
+    group.add_argument("--async", dest="async_web", action="store_true", help="Run the web UI on the asyncio tier (single process)")
+    parser.add_argument("--bind", help="Address for --serve/--async, e.g. 0.0.0.0:8000")
+    parser.add_argument("--workers", type=int, help="Worker processes for --serve")
+    parser.add_argument("--threads", type=int, help="Threads per worker for --serve")
 
     args = parser.parse_args()
 
-    if args.web:
+    if args.serve:
+        from . import serve
+        serve.run(bind=args.bind, workers=args.workers, threads=args.threads)
+    elif args.async_web:
+        from . import async_web
+        async_web.run(bind=args.bind)
+    elif args.web:
+        from .web_ui import create_app
         print("Starting the Event Management System Web UI...")
-        # Note: For production, use a proper WSGI server instead of app.run()
-        web_app.run(debug=True)
+        # Development server only; use --serve (or event_system.wsgi) in production
+        create_app(init_pool=True, start_reminders=True).run(debug=True)
     else:
+        from .ui import EventSystemUI
         print("Starting the Event Management System Desktop UI...")
         app = EventSystemUI()
         app.mainloop()
@@ -0,0 +1,332 @@
+# analytics.py
+# Per-student participation history and course/year engagement rates.
+#
+# student_timeline() returns one student's events from the live and archive
+# tables in one query. Each event is marked REGISTERED (upcoming), ATTENDED,
+# MISSED or WAITLISTED.
+#
+# Engagement counts every student's registrations, attendances and misses with
+# one set-based aggregate instead of a query per event. The result is kept in
+# memory as columns aligned by student: student_id and course are lists; year
+# and the counts are array.array, which numpy.asarray() reads without copying.
+# Snapshot.batches() yields dicts of columns that pandas.DataFrame() accepts
+# as they are.
+#
+# Refreshes are incremental. Events more than SETTLE_DAYS in the past rarely
+# change, so their totals are aggregated once and extended as days go by.
+# Each refresh re-aggregates only the events of the last SETTLE_DAYS days and
+# upcoming ones. A full rebuild every FULL_REFRESH_SECONDS picks up late
+# edits to older events and removed students. Students who register between
+# full rebuilds are added when they first appear.
+#
+# Readers never wait for a refresh once the first snapshot exists. A snapshot
+# older than REFRESH_SECONDS is still returned, and a background thread
+# replaces it. The per-group rollup is computed during the refresh too. The
+# cache is per process.
+
+import array
+import datetime
+import operator
+import threading
+import time
+
+from . import db
+from . import metrics
+from .config import ANALYTICS_CONFIG
+
+BATCH_SIZE = 10000
+FIRST_DATE = datetime.date(1900, 1, 1)
+LAST_DATE = datetime.date(9999, 12, 31)
+COUNT_COLUMNS = ('registered', 'attended', 'missed')
+
+TIMELINE_QUERY = """
+SELECT e.event_id, e.event_name, e.event_date, e.venue,
+       CASE WHEN r.status = 'WAITLISTED' THEN 'WAITLISTED'
+            WHEN a.attended = 'Y' THEN 'ATTENDED'
+            WHEN e.event_date < :today THEN 'MISSED'
+            ELSE 'REGISTERED' END AS participation
+FROM REGISTRATIONS r
+JOIN EVENTS e ON e.event_id = r.event_id
+LEFT JOIN ATTENDANCE a ON a.event_id = r.event_id AND a.student_id = r.student_id
+WHERE r.student_id = :student_id
+UNION ALL
+SELECT e.event_id, e.event_name, e.event_date, e.venue,
+       CASE WHEN r.status = 'WAITLISTED' THEN 'WAITLISTED'
+            WHEN a.attended = 'Y' THEN 'ATTENDED'
+            ELSE 'MISSED' END AS participation
+FROM REGISTRATIONS_ARCHIVE r
+JOIN EVENTS e ON e.event_id = r.event_id
+LEFT JOIN ATTENDANCE_ARCHIVE a ON a.event_id = r.event_id AND a.student_id = r.student_id
+WHERE r.student_id = :student_id
+ORDER BY 3 DESC, 1 DESC
+"""
+
+# Per-student counts for the events dated in [date_from, date_to). Archived
+# events are aggregated against the archive tables, which always hold an
+# event's registrations and attendance together.
+ENGAGEMENT_QUERY = """
+SELECT student_id, SUM(registered), SUM(attended), SUM(missed)
+FROM (
+    SELECT r.student_id, COUNT(*) AS registered,
+           SUM(CASE WHEN a.attended = 'Y' THEN 1 ELSE 0 END) AS attended,
+           SUM(CASE WHEN a.attended = 'Y' OR e.event_date >= :today THEN 0 ELSE 1 END) AS missed
+    FROM EVENTS e
+    JOIN REGISTRATIONS r ON r.event_id = e.event_id
+    LEFT JOIN ATTENDANCE a ON a.event_id = r.event_id AND a.student_id = r.student_id
+    WHERE e.event_date >= :date_from AND e.event_date < :date_to AND r.status = 'REGISTERED'
+    GROUP BY r.student_id
+    UNION ALL
+    SELECT r.student_id, COUNT(*) AS registered,
+           SUM(CASE WHEN a.attended = 'Y' THEN 1 ELSE 0 END) AS attended,
+           SUM(CASE WHEN a.attended = 'Y' OR e.event_date >= :today THEN 0 ELSE 1 END) AS missed
+    FROM EVENTS e
+    JOIN REGISTRATIONS_ARCHIVE r ON r.event_id = e.event_id
+    LEFT JOIN ATTENDANCE_ARCHIVE a ON a.event_id = r.event_id AND a.student_id = r.student_id
+    WHERE e.event_date >= :date_from AND e.event_date < :date_to AND r.status = 'REGISTERED'
+    GROUP BY r.student_id
+) counts
+GROUP BY student_id
+"""
+
+ROSTER_QUERY = "SELECT student_id, course, year FROM STUDENTS ORDER BY student_id"
+
+
+@metrics.track_query
+def student_timeline(student_id, limit=None, offset=0):
+    """
+    Returns (event_id, event_name, event_date, venue, participation) for every
+    event a student registered for, newest first, archived events included.
+    Pass `limit`/`offset` to fetch a single page.
+    """
+    params = {'student_id': student_id, 'today': datetime.date.today()}
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                cursor.execute(*db.paginate(TIMELINE_QUERY, params, limit, offset))
+                return cursor.fetchall()
+    except Exception as e:
+        print(f"Error fetching student timeline: {e}")
+        return []
+
+
+class Snapshot:
+    """Engagement columns from one refresh, one entry per student."""
+
+    COLUMNS = ('student_id', 'course', 'year') + COUNT_COLUMNS
+
+    def __init__(self, columns, refreshed_at):
+        self.columns = columns
+        self.refreshed_at = refreshed_at
+        self.size = len(columns['student_id'])
+        self._groups = None
+
+    def batches(self, size=BATCH_SIZE):
+        """Yields {column: slice} dicts of at most `size` students."""
+        for start in range(0, self.size, size):
+            yield {name: column[start:start + size] for name, column in self.columns.items()}
+
+    def rows(self, limit=None, offset=0):
+        """Returns (student_id, course, year, registered, attended, missed) tuples."""
+        end = self.size if limit is None else offset + limit
+        return list(zip(*(self.columns[name][offset:end] for name in self.COLUMNS)))
+
+    def by_group(self):
+        """
+        Engagement per (course, year) as columns: students, active (registered
+        for at least one event), registered, attended, missed, and
+        participation_rate / attendance_rate percentages. Computed once per
+        snapshot.
+        """
+        if self._groups is None:
+            totals = {}
+            columns = self.columns
+            for course, year, registered, attended, missed in zip(
+                    columns['course'], columns['year'], columns['registered'], columns['attended'], columns['missed']):
+                group = totals.get((course, year))
+                if group is None:
+                    group = totals[(course, year)] = [0, 0, 0, 0, 0]
+                group[0] += 1
+                group[1] += registered > 0
+                group[2] += registered
+                group[3] += attended
+                group[4] += missed
+            groups = {name: [] for name in ('course', 'year', 'students', 'active', 'registered', 'attended',
+                                            'missed', 'participation_rate', 'attendance_rate')}
+            for (course, year), (students, active, registered, attended, missed) in sorted(
+                    totals.items(), key=lambda item: (item[0][0] or '', item[0][1])):
+                concluded = attended + missed
+                for name, value in (('course', course), ('year', year), ('students', students),
+                                    ('active', active), ('registered', registered), ('attended', attended),
+                                    ('missed', missed),
+                                    ('participation_rate', round(active / students * 100, 2)),
+                                    ('attendance_rate', round(attended / concluded * 100, 2) if concluded else 0)):
+                    groups[name].append(value)
+            self._groups = groups
+        return self._groups
+
+
+class CachedSnapshot:
+    """
+    A per-process cache of a computed snapshot; subclasses implement
+    _compute(). The first call to snapshot() (or one with `refresh`) computes
+    it. After that, a stale snapshot is returned at once while one background
+    thread refreshes it, so readers never wait for the database.
+    """
+
+    name = "snapshot"
+
+    def __init__(self, refresh_seconds):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._refreshed = 0  # time.monotonic() of the last refresh
+
+    def snapshot(self, refresh=False):
+        if refresh or self._snapshot is None:
+            with self._lock:
+                if refresh or self._snapshot is None:
+                    self._refresh()
+        elif time.monotonic() - self._refreshed >= self.refresh_seconds and self._lock.acquire(blocking=False):
+            threading.Thread(target=self._refresh_in_background, name=f"{self.name}-refresh", daemon=True).start()
+        return self._snapshot
+
+    def _refresh_in_background(self):
+        try:
+            self._refresh()
+        except Exception as e:
+            print(f"Error refreshing {self.name}: {e}")
+        finally:
+            self._lock.release()
+
+    def _refresh(self):
+        now = time.monotonic()
+        self._snapshot = self._compute()
+        self._refreshed = now
+
+    def _compute(self):
+        raise NotImplementedError
+
+
+class Engagement(CachedSnapshot):
+    """Per-student engagement totals, cached and refreshed incrementally."""
+
+    name = "engagement"
+
+    def __init__(self, settle_days, refresh_seconds, full_refresh_seconds):
+        super().__init__(refresh_seconds)
+        self.settle_days = settle_days
+        self.full_refresh_seconds = full_refresh_seconds
+        self._full_refreshed = None    # time.monotonic() of the last full rebuild
+        self._index = {}               # student_id -> position in the columns
+        self._roster = None            # student_id, course and year columns
+        self._settled = None           # counts for events before _settled_before
+        self._settled_before = None
+
+    def _compute(self):
+        today = datetime.date.today()
+        settle_before = today - datetime.timedelta(days=self.settle_days)
+        now = time.monotonic()
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                if self._full_refreshed is None or now - self._full_refreshed >= self.full_refresh_seconds:
+                    self._load_roster(cursor)
+                    self._settled = self._zeros()
+                    self._add(cursor, self._settled, FIRST_DATE, settle_before, today)
+                    self._full_refreshed = now
+                elif settle_before > self._settled_before:
+                    # Days that have just settled move from the recent window
+                    # into the stored totals.
+                    self._add(cursor, self._settled, self._settled_before, settle_before, today)
+                self._settled_before = settle_before
+                recent = self._zeros()
+                self._add(cursor, recent, settle_before, LAST_DATE, today)
+        # Copies, so later additions to the roster do not show up in this snapshot.
+        columns = {name: column[:] for name, column in self._roster.items()}
+        for name in COUNT_COLUMNS:
+            columns[name] = array.array('l', map(operator.add, self._settled[name], recent[name]))
+        snapshot = Snapshot(columns, datetime.datetime.now())
+        snapshot.by_group()
+        return snapshot
+
+    def _zeros(self):
+        size = len(self._roster['student_id'])
+        return {name: array.array('l', bytes(array.array('l').itemsize * size)) for name in COUNT_COLUMNS}
+
+    def _load_roster(self, cursor):
+        self._roster = {'student_id': [], 'course': [], 'year': array.array('l')}
+        self._index = {}
+        cursor.execute(ROSTER_QUERY)
+        self._append_students(cursor)
+
+    def _append_students(self, cursor):
+        student_ids, courses, years = self._roster['student_id'], self._roster['course'], self._roster['year']
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                return
+            for student_id, course, year in rows:
+                self._index[student_id] = len(student_ids)
+                student_ids.append(student_id)
+                courses.append(course)
+                years.append(year or 0)
+
+    def _add(self, cursor, totals, date_from, date_to, today):
+        """Adds the counts of the events dated in [date_from, date_to) to `totals`."""
+        cursor.execute(ENGAGEMENT_QUERY, {'date_from': date_from, 'date_to': date_to, 'today': today})
+        unknown = []
+        while True:
+            rows = cursor.fetchmany(BATCH_SIZE)
+            if not rows:
+                break
+            for row in rows:
+                position = self._index.get(row[0])
+                if position is None:
+                    unknown.append(row)
+                    continue
+                for name, value in zip(COUNT_COLUMNS, row[1:]):
+                    totals[name][position] += value
+        if unknown:
+            self._add_students(cursor, [row[0] for row in unknown], (self._settled, totals))
+            for row in unknown:
+                position = self._index.get(row[0])
+                if position is not None:
+                    for name, value in zip(COUNT_COLUMNS, row[1:]):
+                        totals[name][position] += value
+
+    def _add_students(self, cursor, student_ids, count_sets):
+        """Appends students added since the roster was loaded, growing every set of counts."""
+        before = len(self._roster['student_id'])
+        for chunk in db.chunked(student_ids):
+            in_list, params = db.bind_list(chunk)
+            cursor.execute(f"SELECT student_id, course, year FROM STUDENTS WHERE student_id IN ({in_list})", params)
+            self._append_students(cursor)
+        added = len(self._roster['student_id']) - before
+        for counts in {id(c): c for c in count_sets}.values():
+            for name in COUNT_COLUMNS:
+                counts[name].extend(array.array('l', bytes(counts[name].itemsize * added)))
+
+
+# The process-wide engagement cache.
+engagement = Engagement(
+    ANALYTICS_CONFIG['settle_days'],
+    ANALYTICS_CONFIG['refresh_seconds'],
+    ANALYTICS_CONFIG['full_refresh_seconds']
+)
+
+
+@metrics.track_query
+def get_engagement_snapshot(refresh=False):
+    """Returns the current engagement Snapshot, or None if it could not be computed."""
+    try:
+        return engagement.snapshot(refresh)
+    except Exception as e:
+        print(f"Error computing engagement: {e}")
+        return None
+
+
+def get_engagement_by_group():
+    """Returns (refreshed_at, columns) of engagement per course and year, or None."""
+    snapshot = get_engagement_snapshot()
+    if snapshot is None:
+        return None
+    return snapshot.refreshed_at, snapshot.by_group()
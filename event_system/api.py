@@ -0,0 +1,475 @@
+# api.py
+# Versioned JSON API (/api/v1) over the data-access modules, for mobile
+# check-in scanners and integrations.
+#
+# Conventions:
+#   - Authentication uses the same session cookie as the web UI; clients log in
+#     with POST /api/v1/session. Write requests must send a JSON body, which a
+#     cross-site HTML form cannot do, so the blueprint is exempt from CSRF tokens.
+#   - List endpoints take ?limit=&offset= (paged in the database) and
+#     ?fields=a,b to select columns. ?compact=1 returns {"columns", "rows"}
+#     arrays instead of one object per row.
+#   - GET responses carry an ETag. Clients that send If-None-Match get an empty
+#     304 when nothing changed, so polling a roster is cheap on the wire.
+
+import datetime
+import json
+from flask import Blueprint, request, session, abort, current_app
+from werkzeug.exceptions import HTTPException
+from . import auth, events, students, registrations, attendance, reports, intake, analytics, forecast, email_templates, campaigns
+
+api = Blueprint('api', __name__, url_prefix='/api/v1')
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_BATCH_SIZE = 5000
+
+EVENT_FIELDS = ('event_id', 'event_name', 'event_date', 'event_time', 'venue', 'total_slots')
+STUDENT_FIELDS = ('student_id', 'name', 'email', 'course', 'year')
+REGISTRATION_FIELDS = ('student_id', 'name', 'email', 'reg_date')
+ATTENDANCE_FIELDS = ('student_id', 'name', 'attended')
+TIMELINE_FIELDS = ('event_id', 'event_name', 'event_date', 'venue', 'participation')
+ENGAGEMENT_FIELDS = ('student_id', 'course', 'year', 'registered', 'attended', 'missed')
+FORECAST_FIELDS = ('event_id', 'event_name', 'event_date', 'venue', 'slot', 'total_slots', 'registered',
+                   'predicted_show_rate', 'expected_attendance', 'recommended_limit')
+CAMPAIGN_FIELDS = ('campaign_id', 'event_id', 'event_name', 'subject', 'created_date', 'created_by',
+                   'recipients', 'sent', 'failed', 'pending', 'heartbeat')
+DELIVERY_FIELDS = ('student_id', 'name', 'email', 'last_error', 'updated_date')
+SUPPRESSION_FIELDS = ('email', 'reason', 'created_date')
+
+
+# --- Helpers ---
+
+def _json_default(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _json_response(payload, status=200):
+    body = json.dumps(payload, separators=(',', ':'), default=_json_default)
+    response = current_app.response_class(body, status=status, mimetype='application/json')
+    if request.method == 'GET' and status == 200:
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.add_etag()
+        response = response.make_conditional(request)
+    return response
+
+
+def _require_login(admin=False):
+    if 'username' not in session:
+        abort(401, description="Login required.")
+    if admin and session.get('role') != 'admin':
+        abort(403, description="Admin role required.")
+
+
+def _json_body():
+    if not request.is_json:
+        abort(415, description="Request body must be JSON (Content-Type: application/json).")
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        abort(400, description="Request body must be a JSON object.")
+    return data
+
+
+def _page_args():
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+        offset = int(request.args.get('offset', 0))
+    except ValueError:
+        abort(400, description="limit and offset must be integers.")
+    if limit < 1 or limit > MAX_PAGE_SIZE or offset < 0:
+        abort(400, description=f"limit must be between 1 and {MAX_PAGE_SIZE} and offset must not be negative.")
+    return limit, offset
+
+
+def _selected_fields(all_fields):
+    requested = request.args.get('fields')
+    if not requested:
+        return all_fields
+    fields = tuple(name.strip() for name in requested.split(',') if name.strip())
+    unknown = [name for name in fields if name not in all_fields]
+    if unknown:
+        abort(400, description=f"Unknown field(s): {', '.join(unknown)}. Available: {', '.join(all_fields)}.")
+    return fields
+
+
+def _shape(rows, all_fields):
+    """Applies field selection and the compact/object representation to rows."""
+    fields = _selected_fields(all_fields)
+    indexes = [all_fields.index(name) for name in fields]
+    if request.args.get('compact') in ('1', 'true'):
+        return {'columns': list(fields), 'rows': [[row[i] for i in indexes] for row in rows]}
+    return {'items': [{name: row[i] for name, i in zip(fields, indexes)} for row in rows]}
+
+
+def _paged_response(fetch_page, all_fields):
+    """
+    Calls fetch_page(limit, offset) for one row more than the page size to
+    find out whether another page exists.
+    """
+    limit, offset = _page_args()
+    rows = fetch_page(limit + 1, offset)
+    payload = _shape(rows[:limit], all_fields)
+    payload['offset'] = offset
+    payload['limit'] = limit
+    payload['next_offset'] = offset + limit if len(rows) > limit else None
+    return _json_response(payload)
+
+
+def _outcome(message):
+    """Maps a data-access result message to (outcome, HTTP status)."""
+    if message.startswith("Success"):
+        return 'success', 200
+    if message.startswith("Info"):
+        return 'info', 200
+    if "not found" in message.lower():
+        return 'error', 404
+    if message == intake.QUEUE_FULL_MESSAGE:
+        return 'error', 503
+    if message.startswith("Error"):
+        return 'error', 409 if "full" in message or "already exists" in message else 400
+    return 'error', 500
+
+
+def _result_response(message, success_status=200):
+    outcome, status = _outcome(message)
+    if outcome == 'success':
+        status = success_status
+    response = _json_response({'status': outcome, 'message': message}, status)
+    if status == 503:
+        response.headers['Retry-After'] = str(intake.QUEUE_FULL_RETRY_SECONDS)
+    return response
+
+
+def _batch_response(results):
+    items = []
+    summary = {'success': 0, 'info': 0, 'error': 0}
+    for student_id, message in results:
+        outcome, _ = _outcome(message)
+        summary[outcome] += 1
+        items.append({'student_id': student_id, 'status': outcome, 'message': message})
+    return _json_response({'results': items, 'summary': summary})
+
+
+def _cancel_response(counts):
+    """Reports the rows affected by a bulk cancellation."""
+    status = 200
+    if counts['error']:
+        status = 404 if "not found" in counts['error'].lower() else 500
+    return _json_response(counts, status)
+
+
+def _batch_list(data, key):
+    values = data.get(key)
+    if not isinstance(values, list) or not values:
+        abort(400, description=f"'{key}' must be a non-empty list.")
+    if len(values) > MAX_BATCH_SIZE:
+        abort(413, description=f"At most {MAX_BATCH_SIZE} items per batch.")
+    return values
+
+
+@api.errorhandler(HTTPException)
+def _http_error(e):
+    return _json_response({'status': 'error', 'message': e.description}, e.code)
+
+
+# --- Session ---
+
+@api.route('/session', methods=['POST'])
+def create_session():
+    data = _json_body()
+    user_data = auth.login(data.get('username', ''), data.get('password', ''))
+    if not user_data:
+        abort(401, description="Invalid username or password.")
+    session['user_id'] = user_data['user_id']
+    session['username'] = user_data['username']
+    session['role'] = user_data['role']
+    return _json_response(user_data)
+
+
+@api.route('/session', methods=['DELETE'])
+def delete_session():
+    session.pop('user_id', None)
+    session.pop('username', None)
+    session.pop('role', None)
+    return _json_response({'status': 'success', 'message': "Logged out."})
+
+
+# --- Events ---
+
+@api.route('/events', methods=['GET'])
+def list_events():
+    _require_login()
+    return _paged_response(lambda limit, offset: events.get_all_events(limit, offset), EVENT_FIELDS)
+
+
+@api.route('/events/<int:event_id>', methods=['GET'])
+def get_event(event_id):
+    _require_login()
+    event = events.get_event_details(event_id)
+    if not event:
+        abort(404, description="Event not found.")
+    fields = _selected_fields(EVENT_FIELDS)
+    return _json_response({name: event[EVENT_FIELDS.index(name)] for name in fields})
+
+
+@api.route('/events', methods=['POST'])
+def create_event():
+    _require_login(admin=True)
+    data = _json_body()
+    try:
+        event_date = datetime.date.fromisoformat(str(data.get('event_date', '')))
+    except ValueError:
+        abort(400, description="event_date must be an ISO date (YYYY-MM-DD).")
+    result = events.create_event(data.get('event_name'), event_date, data.get('event_time'),
+                                 data.get('venue'), data.get('total_slots'))
+    return _result_response(result, success_status=201)
+
+
+@api.route('/events/<int:event_id>/statistics', methods=['GET'])
+def event_statistics(event_id):
+    _require_login()
+    stats = reports.get_event_statistics(event_id, include_archived=request.args.get('include_archived') in ('1', 'true'))
+    if stats is None:
+        abort(404, description="Event not found.")
+    return _json_response(stats)
+
+
+# --- Students ---
+
+@api.route('/students', methods=['GET'])
+def list_students():
+    _require_login(admin=True)
+    return _paged_response(lambda limit, offset: students.get_all_students(limit, offset), STUDENT_FIELDS)
+
+
+@api.route('/students', methods=['POST'])
+def create_student():
+    _require_login(admin=True)
+    data = _json_body()
+    result = students.add_student(data.get('student_id'), data.get('name'), data.get('email'),
+                                  data.get('course'), data.get('year'))
+    return _result_response(result, success_status=201)
+
+
+@api.route('/students/<student_id>/timeline', methods=['GET'])
+def student_timeline(student_id):
+    _require_login(admin=True)
+    return _paged_response(
+        lambda limit, offset: analytics.student_timeline(student_id, limit, offset),
+        TIMELINE_FIELDS
+    )
+
+
+# --- Analytics ---
+
+@api.route('/analytics/engagement', methods=['GET'])
+def engagement_by_group():
+    _require_login(admin=True)
+    result = analytics.get_engagement_by_group()
+    if result is None:
+        abort(500, description="Engagement could not be computed.")
+    refreshed_at, groups = result
+    return _json_response({'refreshed_at': refreshed_at, 'columns': groups})
+
+
+@api.route('/analytics/students', methods=['GET'])
+def student_engagement():
+    _require_login(admin=True)
+    snapshot = analytics.get_engagement_snapshot()
+    if snapshot is None:
+        abort(500, description="Engagement could not be computed.")
+    return _paged_response(snapshot.rows, ENGAGEMENT_FIELDS)
+
+
+@api.route('/analytics/forecast', methods=['GET'])
+def attendance_forecast():
+    _require_login(admin=True)
+    result = forecast.get_forecast()
+    if result is None:
+        abort(500, description="The attendance forecast could not be computed.")
+    return _paged_response(result.rows, FORECAST_FIELDS)
+
+
+@api.route('/analytics/forecast/factors', methods=['GET'])
+def forecast_factors():
+    _require_login(admin=True)
+    result = forecast.get_forecast()
+    if result is None:
+        abort(500, description="The attendance forecast could not be computed.")
+    return _json_response({'refreshed_at': result.refreshed_at, 'base_rate': result.base_rate,
+                           'history_events': result.history_events, 'factors': result.factors})
+
+
+# --- Registrations ---
+
+@api.route('/events/<int:event_id>/registrations', methods=['GET'])
+def list_registrations(event_id):
+    _require_login(admin=True)
+    return _paged_response(
+        lambda limit, offset: registrations.get_registered_students(event_id, limit, offset),
+        REGISTRATION_FIELDS
+    )
+
+
+@api.route('/events/<int:event_id>/waitlist', methods=['GET'])
+def list_waitlist(event_id):
+    _require_login(admin=True)
+    return _paged_response(
+        lambda limit, offset: registrations.get_waitlist(event_id, limit, offset),
+        REGISTRATION_FIELDS
+    )
+
+
+@api.route('/events/<int:event_id>/registrations', methods=['POST'])
+def create_registration(event_id):
+    _require_login(admin=True)
+    student_id = _json_body().get('student_id')
+    if isinstance(student_id, bool) or not isinstance(student_id, (str, int)) or not str(student_id).strip():
+        abort(400, description="'student_id' must be a non-empty string.")
+    result, position = intake.register(event_id, str(student_id))
+    response = _result_response(result, success_status=201)
+    if position is not None:
+        response.headers['X-Queue-Position'] = str(position)
+    return response
+
+
+@api.route('/events/<int:event_id>/registrations/batch', methods=['POST'])
+def create_registrations_batch(event_id):
+    _require_login(admin=True)
+    student_ids = _batch_list(_json_body(), 'student_ids')
+    return _batch_response(registrations.register_students_for_event(event_id, [str(s) for s in student_ids]))
+
+
+@api.route('/events/<int:event_id>/registrations/<student_id>', methods=['DELETE'])
+def delete_registration(event_id, student_id):
+    _require_login(admin=True)
+    return _result_response(registrations.cancel_registration(event_id, student_id))
+
+
+@api.route('/events/<int:event_id>/registrations/cancel', methods=['POST'])
+def cancel_registrations_batch(event_id):
+    _require_login(admin=True)
+    student_ids = _batch_list(_json_body(), 'student_ids')
+    return _cancel_response(registrations.cancel_registrations(event_id, [str(s) for s in student_ids]))
+
+
+@api.route('/events/<int:event_id>/registrations', methods=['DELETE'])
+def cancel_event_registrations(event_id):
+    _require_login(admin=True)
+    return _cancel_response(registrations.cancel_event_registrations(event_id))
+
+
+@api.route('/students/registrations/cancel', methods=['POST'])
+def cancel_student_registrations():
+    _require_login(admin=True)
+    student_ids = _batch_list(_json_body(), 'student_ids')
+    return _cancel_response(registrations.cancel_student_registrations([str(s) for s in student_ids]))
+
+
+# --- Attendance ---
+
+@api.route('/events/<int:event_id>/attendance', methods=['GET'])
+def list_attendance(event_id):
+    _require_login()
+    return _paged_response(
+        lambda limit, offset: attendance.get_event_attendance(event_id, limit, offset),
+        ATTENDANCE_FIELDS
+    )
+
+
+@api.route('/events/<int:event_id>/attendance', methods=['POST'])
+def mark_attendance(event_id):
+    _require_login()
+    data = _json_body()
+    result = attendance.mark_attendance(event_id, data.get('student_id'), data.get('status', 'Y'))
+    return _result_response(result)
+
+
+@api.route('/events/<int:event_id>/check-in', methods=['POST'])
+def check_in(event_id):
+    """Marks a student present on the check-in code from their personalized email."""
+    _require_login()
+    data = _json_body()
+    student_id = data.get('student_id')
+    if not email_templates.verify_check_in_code(event_id, student_id, data.get('check_in_code')):
+        abort(403, description="Invalid check-in code.")
+    return _result_response(attendance.mark_attendance(event_id, student_id, 'Y'))
+
+
+@api.route('/events/<int:event_id>/attendance/batch', methods=['POST'])
+def mark_attendance_batch(event_id):
+    _require_login()
+    records = _batch_list(_json_body(), 'records')
+    try:
+        pairs = [(str(record['student_id']), record.get('status', 'Y')) for record in records]
+    except (TypeError, KeyError):
+        abort(400, description="Each record must be an object with a 'student_id' (and optional 'status').")
+    return _batch_response(attendance.mark_attendance_bulk(event_id, pairs))
+
+
+# --- Email campaigns ---
+
+@api.route('/campaigns', methods=['GET'])
+def list_campaigns():
+    _require_login(admin=True)
+    event_id = request.args.get('event_id', type=int)
+    return _paged_response(
+        lambda limit, offset: campaigns.get_campaigns(event_id, limit, offset),
+        CAMPAIGN_FIELDS
+    )
+
+
+@api.route('/campaigns/<int:campaign_id>', methods=['GET'])
+def get_campaign(campaign_id):
+    _require_login(admin=True)
+    campaign = campaigns.get_campaign(campaign_id)
+    if not campaign:
+        abort(404, description="Campaign not found.")
+    fields = _selected_fields(CAMPAIGN_FIELDS)
+    return _json_response({name: campaign[CAMPAIGN_FIELDS.index(name)] for name in fields})
+
+
+@api.route('/campaigns/<int:campaign_id>/deliveries', methods=['GET'])
+def list_deliveries(campaign_id):
+    """Deliveries in one state: ?status=FAILED (default), SENT or PENDING."""
+    _require_login(admin=True)
+    status = request.args.get('status', campaigns.FAILED).upper()
+    if status not in (campaigns.PENDING, campaigns.SENT, campaigns.FAILED):
+        abort(400, description="status must be PENDING, SENT or FAILED.")
+    return _paged_response(
+        lambda limit, offset: campaigns.get_deliveries(campaign_id, status, limit, offset),
+        DELIVERY_FIELDS
+    )
+
+
+@api.route('/campaigns/<int:campaign_id>/resend', methods=['POST'])
+def resend_campaign(campaign_id):
+    """Sends the campaign's failed deliveries again, in the background."""
+    _require_login(admin=True)
+    return _result_response(campaigns.resend_failed(campaign_id), success_status=202)
+
+
+@api.route('/suppressions', methods=['GET'])
+def list_suppressions():
+    """Addresses no campaign emails: permanent bounces and manual entries."""
+    _require_login(admin=True)
+    return _paged_response(campaigns.get_suppressions, SUPPRESSION_FIELDS)
+
+
+@api.route('/suppressions', methods=['POST'])
+def create_suppression():
+    _require_login(admin=True)
+    data = _json_body()
+    email = data.get('email')
+    if not isinstance(email, str):
+        abort(400, description="'email' must be a string.")
+    reason = data.get('reason')
+    return _result_response(campaigns.suppress_email(email, str(reason) if reason else None), success_status=201)
+
+
+@api.route('/suppressions/<path:email>', methods=['DELETE'])
+def delete_suppression(email):
+    _require_login(admin=True)
+    return _result_response(campaigns.unsuppress_email(email))
@@ -0,0 +1,191 @@
+# archive.py
+# Moves the registrations and attendance of past events out of the live tables.
+#
+# REGISTRATIONS and ATTENDANCE only need the events people still register for
+# and check in to. Events older than the retention window (ARCHIVE_RETENTION_DAYS,
+# default 365) are archived whole, oldest first, a batch of events per
+# transaction: their rows are copied into REGISTRATIONS_ARCHIVE and
+# ATTENDANCE_ARCHIVE with INSERT ... SELECT and then deleted from the live
+# tables, so rosters and statistics for current events work on small indexes.
+# Reports can still include archived rows (reports.get_event_statistics(...,
+# include_archived=True)).
+#
+# With --file, rows are written to a gzip-compressed JSON-lines file instead of
+# the archive tables, one object per row with a "table" key. Reports cannot
+# read those rows back.
+#
+# Usage:
+#   python -m event_system.archive                       # archive tables, default retention
+#   python -m event_system.archive --retention-days 730 --dry-run
+#   python -m event_system.archive --file archive-2024.jsonl.gz
+
+import argparse
+import datetime
+import gzip
+import json
+import time
+
+from . import db
+from . import metrics
+from .config import ARCHIVE_CONFIG
+
+REGISTRATION_COLUMNS = ('reg_id', 'event_id', 'student_id', 'reg_date', 'status')
+ATTENDANCE_COLUMNS = ('attendance_id', 'event_id', 'student_id', 'attended')
+
+EVENTS_TO_ARCHIVE_QUERY = """
+SELECT e.event_id
+FROM EVENTS e
+WHERE e.event_date < :cutoff
+  AND (EXISTS (SELECT 1 FROM REGISTRATIONS r WHERE r.event_id = e.event_id)
+       OR EXISTS (SELECT 1 FROM ATTENDANCE a WHERE a.event_id = e.event_id))
+ORDER BY e.event_date, e.event_id
+"""
+
+
+def cutoff_date(retention_days, today=None):
+    """Events dated before the returned date are archived."""
+    return (today or datetime.date.today()) - datetime.timedelta(days=retention_days)
+
+
+@metrics.track_query
+def events_to_archive(cutoff):
+    """Returns the IDs of events before `cutoff` that still have live rows, oldest first."""
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                cursor.execute(EVENTS_TO_ARCHIVE_QUERY, {'cutoff': cutoff})
+                return [row[0] for row in cursor.fetchall()]
+    except Exception as e:
+        print(f"Error listing events to archive: {e}")
+        return []
+
+
+def _lock_events(cursor, in_list, params):
+    # Registrations and cancellations lock the event row, so none of them can
+    # change the batch while it is being moved.
+    cursor.execute(f"SELECT event_id FROM EVENTS WHERE event_id IN ({in_list}) ORDER BY event_id FOR UPDATE", params)
+
+
+def _move_to_tables(cursor, in_list, params):
+    """Copies a batch of events into the archive tables, then deletes exactly the copied rows."""
+    registration_columns = ", ".join(REGISTRATION_COLUMNS)
+    attendance_columns = ", ".join(ATTENDANCE_COLUMNS)
+    cursor.execute(
+        f"INSERT INTO REGISTRATIONS_ARCHIVE ({registration_columns}) "
+        f"SELECT {registration_columns} FROM REGISTRATIONS WHERE event_id IN ({in_list})",
+        params
+    )
+    cursor.execute(
+        f"INSERT INTO ATTENDANCE_ARCHIVE ({attendance_columns}) "
+        f"SELECT {attendance_columns} FROM ATTENDANCE WHERE event_id IN ({in_list})",
+        params
+    )
+    # Attendance can be marked without locking the event, so delete by the
+    # archived IDs rather than by event.
+    cursor.execute(
+        f"DELETE FROM ATTENDANCE WHERE event_id IN ({in_list}) AND attendance_id IN "
+        f"(SELECT attendance_id FROM ATTENDANCE_ARCHIVE WHERE event_id IN ({in_list}))",
+        params
+    )
+    attendance_rows = cursor.rowcount
+    cursor.execute(
+        f"DELETE FROM REGISTRATIONS WHERE event_id IN ({in_list}) AND reg_id IN "
+        f"(SELECT reg_id FROM REGISTRATIONS_ARCHIVE WHERE event_id IN ({in_list}))",
+        params
+    )
+    return cursor.rowcount, attendance_rows
+
+
+def _move_to_file(cursor, in_list, params, out):
+    """Writes a batch of events to `out` (a text file), then deletes the written rows."""
+    counts = []
+    for table, columns, key in (('REGISTRATIONS', REGISTRATION_COLUMNS, 'reg_id'),
+                                ('ATTENDANCE', ATTENDANCE_COLUMNS, 'attendance_id')):
+        cursor.execute(f"SELECT {', '.join(columns)} FROM {table} WHERE event_id IN ({in_list})", params)
+        ids = []
+        while True:
+            rows = cursor.fetchmany(1000)
+            if not rows:
+                break
+            for row in rows:
+                record = dict(zip(columns, row))
+                record['table'] = table
+                out.write(json.dumps(record, default=str) + "\n")
+                ids.append(row[0])
+        for chunk in db.chunked(ids):
+            id_list, id_params = db.bind_list(chunk)
+            cursor.execute(f"DELETE FROM {table} WHERE {key} IN ({id_list})", id_params)
+        counts.append(len(ids))
+    # The file must hold the rows before their deletion is committed.
+    out.flush()
+    return tuple(counts)
+
+
+@metrics.track_query
+def archive_events(cutoff, batch_events=None, file_path=None):
+    """
+    Archives every event dated before `cutoff`, `batch_events` events per
+    transaction, into the archive tables (or the gzip file `file_path`, which
+    is appended to).
+
+    Returns:
+        dict: 'events', 'registrations' and 'attendance' moved, and 'error'
+              (None, or the message of the error that stopped the run;
+              batches committed before it stay archived and are counted).
+    """
+    batch_events = batch_events or ARCHIVE_CONFIG['batch_events']
+    counts = {'events': 0, 'registrations': 0, 'attendance': 0, 'error': None}
+    event_ids = events_to_archive(cutoff)
+    out = gzip.open(file_path, 'at', encoding='utf-8') if file_path else None
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                for batch in db.chunked(event_ids, batch_events):
+                    in_list, params = db.bind_list(batch)
+                    _lock_events(cursor, in_list, params)
+                    if out is None:
+                        registrations, attendance = _move_to_tables(cursor, in_list, params)
+                    else:
+                        registrations, attendance = _move_to_file(cursor, in_list, params, out)
+                    conn.commit()
+                    counts['events'] += len(batch)
+                    counts['registrations'] += registrations
+                    counts['attendance'] += attendance
+    except Exception as e:
+        print(f"Error archiving events: {e}")
+        counts['error'] = f"An unexpected error occurred: {e}"
+    finally:
+        if out is not None:
+            out.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive the registrations and attendance of past events.")
+    parser.add_argument("--retention-days", type=int, default=ARCHIVE_CONFIG['retention_days'],
+                        help="keep events from the last N days in the live tables")
+    parser.add_argument("--batch-events", type=int, default=ARCHIVE_CONFIG['batch_events'],
+                        help="events moved per transaction")
+    parser.add_argument("--file", help="append rows to this gzip JSON-lines file instead of the archive tables")
+    parser.add_argument("--dry-run", action="store_true", help="only list how many events would be archived")
+    args = parser.parse_args()
+
+    cutoff = cutoff_date(args.retention_days)
+    try:
+        if args.dry_run:
+            print(f"{len(events_to_archive(cutoff)):,} events before {cutoff} would be archived.")
+            return
+        start = time.perf_counter()
+        counts = archive_events(cutoff, args.batch_events, args.file)
+    finally:
+        db.close_pool()
+    print(f"Archived {counts['events']:,} events before {cutoff} in {time.perf_counter() - start:.1f}s: "
+          f"{counts['registrations']:,} registrations, {counts['attendance']:,} attendance records"
+          + (f" to {args.file}" if args.file else ""))
+    if counts['error']:
+        print(counts['error'])
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
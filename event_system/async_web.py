@@ -0,0 +1,165 @@
+# async_web.py
+# asyncio serving mode for the read-heavy pages.
+#
+# The ASGI application below serves GET /events, /attendance and /reports
+# itself: their queries run on python-oracledb's asyncio pool, so while Oracle
+# is working the event loop keeps serving other requests instead of parking a
+# thread per request. (On the SQLite backend they run in a thread pool.) Pages are still rendered by the Flask app (same
+# templates, session cookie, CSRF tokens and flashed messages), and every other
+# route is handed to the regular Flask app running in a thread pool.
+#
+# Run with:
+#   python -m event_system --async --bind 0.0.0.0:8000
+# or point any ASGI server at `event_system.async_web:application`.
+
+import asyncio
+
+from flask import render_template, request, session, redirect, url_for
+from asgiref.wsgi import WsgiToAsgi
+from werkzeug.test import EnvironBuilder
+
+from . import db, events, attendance, reports, analytics, forecast
+from .config import WEB_CONFIG
+from .forms import EventForm, AttendanceForm
+from .web_ui import create_app
+
+
+async def _events_view():
+    if 'username' not in session:
+        return redirect(url_for('login'))
+    all_events = await events.get_all_events_async()
+    return render_template('events.html', events=all_events, role=session.get('role'), form=EventForm())
+
+
+async def _attendance_view():
+    if 'username' not in session or session.get('role') != 'admin':
+        return redirect(url_for('login'))
+    selected_event_id = request.args.get('event_id', type=int)
+    all_events = await events.get_all_events_async()
+    attendance_list = []
+    if selected_event_id:
+        attendance_list = await attendance.get_event_attendance_async(selected_event_id)
+    return render_template('attendance.html', events=all_events, attendance_list=attendance_list,
+                           selected_event_id=selected_event_id, role=session.get('role'), form=AttendanceForm())
+
+
+async def _reports_view():
+    if 'username' not in session:
+        return redirect(url_for('login'))
+    selected_event_id = request.args.get('event_id', type=int)
+    all_events = await events.get_all_events_async()
+    stats = None
+    if selected_event_id:
+        stats = await reports.get_event_statistics_async(selected_event_id, include_archived=True)
+    # Only the first snapshot is computed while waiting; keep that off the event loop.
+    engagement = await asyncio.to_thread(analytics.get_engagement_by_group)
+    capacity = await asyncio.to_thread(forecast.get_forecast)
+    return render_template('reports.html', events=all_events, stats=stats, selected_event_id=selected_event_id,
+                           engagement=engagement, capacity=capacity)
+
+
+# Endpoint names match web_ui, so metrics and url_for() see the same routes.
+ASYNC_ROUTES = {
+    '/events': ('events_page', _events_view),
+    '/attendance': ('attendance_page', _attendance_view),
+    '/reports': ('reports_page', _reports_view),
+}
+
+
+def _environ_from_scope(scope):
+    """Builds a WSGI environ for the Flask request context from an ASGI scope."""
+    headers = [(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope.get('headers', [])]
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    builder = EnvironBuilder(
+        path=scope['path'],
+        base_url=f"{scope.get('scheme', 'http')}://{server[0]}:{server[1]}{scope.get('root_path', '')}",
+        query_string=scope.get('query_string', b'').decode('latin-1'),
+        method=scope['method'],
+        headers=headers,
+        environ_base={'REMOTE_ADDR': client[0]},
+    )
+    try:
+        return builder.get_environ()
+    finally:
+        builder.close()
+
+
+class AsyncWebApp:
+    """ASGI application: async read pages plus the Flask app for everything else."""
+
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.fallback = WsgiToAsgi(flask_app)
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        route = ASYNC_ROUTES.get(scope.get('path')) if scope['type'] == 'http' else None
+        if route is None or scope['method'] not in ('GET', 'HEAD'):
+            await self.fallback(scope, receive, send)
+            return
+        await self._serve(route, scope, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    db.init_async_pool()
+                except Exception as e:
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await db.close_async_pool()
+                db.close_pool()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _serve(self, route, scope, send):
+        _, view = route
+        app = self.flask_app
+        with app.request_context(_environ_from_scope(scope)):
+            response = app.preprocess_request()  # before_request hooks (metrics timer, CSRF)
+            if response is None:
+                try:
+                    response = await view()
+                except Exception as e:
+                    try:
+                        response = app.handle_user_exception(e)
+                    except Exception as unhandled:
+                        response = app.handle_exception(unhandled)
+            response = app.make_response(response)
+            response = app.process_response(response)  # after_request hooks, saves the session
+            body = b"" if scope['method'] == 'HEAD' else response.get_data()
+
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                        for name, value in response.headers.items()],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+def create_asgi_app():
+    """Returns the ASGI application for the async serving mode."""
+    return AsyncWebApp(create_app())
+
+
+application = create_asgi_app()
+
+
+def run(bind=None):
+    """Serves the ASGI application with uvicorn in a single process."""
+    try:
+        import uvicorn
+    except ImportError:
+        print("Error: uvicorn is required for --async mode (pip install uvicorn).")
+        return
+
+    host, _, port = (bind or WEB_CONFIG['bind']).rpartition(':')
+    print(f"Serving (asyncio) on http://{host}:{port}...")
+    uvicorn.run(application, host=host or '127.0.0.1', port=int(port), log_level='info')
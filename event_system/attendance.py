@@ -2,15 +2,18 @@
 # Handles marking and viewing of student attendance for events.
 
 from . import db
+from . import metrics
+from . import live
 import datetime
 
+@metrics.track_query
 def mark_attendance(event_id, student_id, attended_status='Y'):
     """
     Marks or updates a student's attendance for a given event.
     """
     try:
         with db.get_connection() as conn:
-            with conn.cursor() as cursor:
+            with db.cursor(conn) as cursor:
                 # --- Check 1: Event Date vs. Current Date ---
                 cursor.execute("SELECT event_date FROM EVENTS WHERE event_id = :event_id", {'event_id': event_id})
                 result = cursor.fetchone()
@@ -27,7 +30,7 @@ def mark_attendance(event_id, student_id, attended_status='Y'):
 
                 # --- Check 2: Student Registration ---
                 cursor.execute(
-                    "SELECT reg_id FROM REGISTRATIONS WHERE event_id = :event_id AND student_id = :student_id",
+                    "SELECT reg_id FROM REGISTRATIONS WHERE event_id = :event_id AND student_id = :student_id AND status = 'REGISTERED'",
                     {'event_id': event_id, 'student_id': student_id}
                 )
                 if not cursor.fetchone():
@@ -35,10 +38,11 @@ def mark_attendance(event_id, student_id, attended_status='Y'):
 
                 # --- Check 3: Existing Attendance Record ---
                 cursor.execute(
-                    "SELECT attendance_id FROM ATTENDANCE WHERE event_id = :event_id AND student_id = :student_id",
+                    "SELECT attendance_id, attended FROM ATTENDANCE WHERE event_id = :event_id AND student_id = :student_id",
                     {'event_id': event_id, 'student_id': student_id}
                 )
                 attendance_id = cursor.fetchone()
+                previous_status = attendance_id[1] if attendance_id else None
 
                 if attendance_id:
                     # Update existing record
@@ -52,6 +56,7 @@ def mark_attendance(event_id, student_id, attended_status='Y'):
                     message = "Success: Attendance marked."
                 
                 conn.commit()
+                live.publish(event_id, 'attendance', student_id=student_id, attended=attended_status, previous=previous_status)
                 return message
 
     except Exception as e:
@@ -59,30 +64,129 @@ def mark_attendance(event_id, student_id, attended_status='Y'):
         # Rollback is implicitly handled by the database driver on connection release if commit wasn't called
         return f"An unexpected error occurred: {e}"
 
-def get_event_attendance(event_id):
+@metrics.track_query
+def mark_attendance_bulk(event_id, records):
+    """
+    Marks attendance for many students of one event in a single transaction,
+    e.g. a batch of check-ins from a scanner.
+
+    Args:
+        event_id (int): The event.
+        records (iterable): (student_id, attended_status) pairs. A student
+                            listed twice keeps the last status.
+
+    Returns:
+        list: (student_id, message) pairs, using the same messages as
+              mark_attendance().
+    """
+    records = [(student_id, status) for student_id, status in records]
+    if not records:
+        return []
+
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                cursor.execute("SELECT event_date FROM EVENTS WHERE event_id = :event_id", {'event_id': event_id})
+                result = cursor.fetchone()
+                if not result:
+                    return [(student_id, "Error: Event not found.") for student_id, _ in records]
+
+                event_date = result[0]
+                if isinstance(event_date, datetime.datetime):
+                    event_date = event_date.date()
+                if event_date > datetime.date.today():
+                    message = f"Error: Attendance can only be marked on or after the event date ({event_date.strftime('%Y-%m-%d')})."
+                    return [(student_id, message) for student_id, _ in records]
+
+                registered = set()
+                existing = {}
+                for chunk in db.chunked(dict.fromkeys(student_id for student_id, _ in records)):
+                    in_list, params = db.bind_list(chunk)
+                    params['event_id'] = event_id
+                    cursor.execute(
+                        f"SELECT student_id FROM REGISTRATIONS WHERE event_id = :event_id AND status = 'REGISTERED' AND student_id IN ({in_list})",
+                        params
+                    )
+                    registered.update(row[0] for row in cursor.fetchall())
+                    cursor.execute(
+                        f"SELECT student_id, attendance_id, attended FROM ATTENDANCE WHERE event_id = :event_id AND student_id IN ({in_list})",
+                        params
+                    )
+                    existing.update((row[0], (row[1], row[2])) for row in cursor.fetchall())
+
+                results = []
+                updates = {}
+                inserts = {}
+                for student_id, status in records:
+                    if status not in ('Y', 'N'):
+                        results.append((student_id, "Error: Attendance status must be 'Y' or 'N'."))
+                    elif student_id not in registered:
+                        results.append((student_id, "Error: Cannot mark attendance for a student who is not registered for this event."))
+                    elif student_id in existing:
+                        updates[student_id] = {'status': status, 'att_id': existing[student_id][0]}
+                        results.append((student_id, "Success: Attendance record updated."))
+                    else:
+                        inserts[student_id] = {'eid': event_id, 'sid': student_id, 'status': status}
+                        results.append((student_id, "Success: Attendance marked."))
+
+                if updates:
+                    cursor.executemany("UPDATE ATTENDANCE SET attended = :status WHERE attendance_id = :att_id", list(updates.values()))
+                if inserts:
+                    cursor.executemany(
+                        "INSERT INTO ATTENDANCE (event_id, student_id, attended) VALUES (:eid, :sid, :status)",
+                        list(inserts.values())
+                    )
+                conn.commit()
+                for student_id, values in list(updates.items()) + list(inserts.items()):
+                    live.publish(event_id, 'attendance', student_id=student_id,
+                                 attended=values['status'], previous=existing.get(student_id, (None, None))[1])
+                return results
+
+    except Exception as e:
+        print(f"Error marking attendance in bulk: {e}")
+        return [(student_id, f"An unexpected error occurred: {e}") for student_id, _ in records]
+
+EVENT_ATTENDANCE_QUERY = """
+SELECT
+    s.student_id,
+    s.name,
+    COALESCE(a.attended, 'N') AS attendance_status
+FROM REGISTRATIONS r
+JOIN STUDENTS s ON r.student_id = s.student_id
+LEFT JOIN ATTENDANCE a ON r.event_id = a.event_id AND r.student_id = a.student_id
+WHERE r.event_id = :event_id AND r.status = 'REGISTERED'
+ORDER BY s.name, s.student_id
+"""
+
+@metrics.track_query
+def get_event_attendance(event_id, limit=None, offset=0):
     """
     Retrieves the attendance status for all registered students for an event.
+    Pass `limit`/`offset` to fetch a single page.
     """
     try:
         with db.get_connection() as conn:
-            with conn.cursor() as cursor:
-                query = """
-                SELECT
-                    s.student_id,
-                    s.name,
-                    NVL(a.attended, 'N') AS attendance_status
-                FROM REGISTRATIONS r
-                JOIN STUDENTS s ON r.student_id = s.student_id
-                LEFT JOIN ATTENDANCE a ON r.event_id = a.event_id AND r.student_id = a.student_id
-                WHERE r.event_id = :event_id
-                ORDER BY s.name
-                """
-                cursor.execute(query, {'event_id': event_id})
+            with db.cursor(conn) as cursor:
+                cursor.execute(*db.paginate(EVENT_ATTENDANCE_QUERY, {'event_id': event_id}, limit, offset))
                 return cursor.fetchall()
     except Exception as e:
         print(f"Error fetching event attendance: {e}")
         return []
 
+@metrics.track_query
+async def get_event_attendance_async(event_id, limit=None, offset=0):
+    """
+    Async version of get_event_attendance() for the asyncio web tier.
+    """
+    try:
+        async with db.get_async_connection() as conn:
+            with db.async_cursor(conn) as cursor:
+                await cursor.execute(*db.paginate(EVENT_ATTENDANCE_QUERY, {'event_id': event_id}, limit, offset))
+                return await cursor.fetchall()
+    except Exception as e:
+        print(f"Error fetching event attendance: {e}")
+        return []
+
 # Example usage (for testing purposes)
 if __name__ == '__main__':
     # ASSUMPTIONS FOR TESTING:
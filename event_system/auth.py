@@ -3,7 +3,7 @@
 
 import bcrypt
 from . import db
-import oracledb
+from . import metrics
 
 def hash_password(plain_text_password):
     """Hashes a password using bcrypt."""
@@ -15,6 +15,7 @@ def verify_password(plain_text_password, hashed_password):
     """Verifies a plain-text password against a hashed password."""
     return bcrypt.checkpw(plain_text_password.encode('utf-8'), hashed_password.encode('utf-8'))
 
+@metrics.track_query
 def create_web_user(username, password):
     """
     Creates a new user with the 'volunteer' role.
@@ -27,7 +28,7 @@ def create_web_user(username, password):
 
     try:
         with db.get_connection() as conn:
-            with conn.cursor() as cursor:
+            with db.cursor(conn) as cursor:
                 query = """
                 INSERT INTO USERS (username, password, role)
                 VALUES (:username, :password, :role)
@@ -39,15 +40,15 @@ def create_web_user(username, password):
                 })
                 conn.commit()
                 return "Success: User created successfully. Please login."
-    except oracledb.IntegrityError as e:
-        error_obj, = e.args
-        if "UK_USERNAME" in error_obj.message:
+    except db.IntegrityError as e:
+        if db.is_unique_violation(e, "UK_USERNAME", "USERS.username"):
             return f"Error: Username '{username}' already exists."
         else:
             return f"A database integrity error occurred: {e}"
     except Exception as e:
         return f"An unexpected error occurred: {e}"
 
+@metrics.track_query
 def login(username, password):
     """
     Validates user credentials against the USERS table using hashed passwords.
@@ -66,7 +67,7 @@ def login(username, password):
         return None  # Database connection failed
 
     try:
-        with conn.cursor() as cursor:
+        with db.cursor(conn) as cursor:
             # Fetch the hashed password from the database, making username check case-insensitive
             query = "SELECT user_id, username, password, role FROM USERS WHERE LOWER(username) = LOWER(:username)"
             cursor.execute(query, {'username': username})
@@ -0,0 +1,572 @@
+# campaigns.py
+# Email campaigns: sends to an event's registered students, with a delivery
+# record per recipient.
+#
+# Recipients are resolved in the database, with one INSERT ... SELECT from the
+# event's registrations into EMAIL_DELIVERIES:
+#   - addresses are trimmed and lower-cased, and those without an "@" are
+#     left out;
+#   - students sharing an address get one email (the lowest student ID);
+#   - addresses in EMAIL_SUPPRESSION are left out (an anti-join on its key).
+# The sender thread then reads the pending deliveries a page at a time
+# (STREAM_PAGE rows, through IDX_DELIVERIES_STATUS), so no recipient list is
+# built in Python. An address the SMTP server rejects permanently (a 5xx reply
+# to the recipient) is added to EMAIL_SUPPRESSION, so later campaigns and
+# resends skip it without an SMTP round trip.
+#
+# A campaign keeps its subject and body templates and its attachments, so its
+# failed deliveries can be sent again later with the same content. Delivery
+# records are written in bulk, never one statement per message:
+#   - every recipient is inserted as PENDING with one array insert when the
+#     campaign is created;
+#   - the sender thread hands each outcome to a DeliveryLog, which writes them
+#     every FLUSH_SIZE results or FLUSH_SECONDS, one executemany per batch.
+#
+# The same transaction adds the batch to the campaign's sent and failed
+# counters, so a campaign's status is a single-row read however many
+# recipients it has (pending = recipients - sent - failed). Only failed
+# deliveries are listed per recipient, a page at a time through
+# IDX_DELIVERIES_STATUS.
+#
+# The sender also stamps the campaign's heartbeat with each batch. If its
+# process dies mid-send, the deliveries it had not reached stay PENDING; once
+# the heartbeat is STALE_SEND_SECONDS old, resend_failed() marks them FAILED
+# and sends them with the other failures. A delivery is only updated while it
+# is PENDING, so a sender that was merely stalled cannot overwrite a later
+# outcome or count one twice.
+
+import collections
+import datetime
+import time
+
+from . import db
+from . import metrics
+from . import email_utils
+from . import email_templates
+from . import email_builder
+
+# EMAIL_DELIVERIES.status values
+PENDING = 'PENDING'
+SENT = 'SENT'
+FAILED = 'FAILED'
+
+FLUSH_SIZE = 500    # outcomes written per batch
+FLUSH_SECONDS = 2   # longest an outcome waits to be written
+MAX_ERROR = 1000    # length of EMAIL_DELIVERIES.last_error
+STREAM_PAGE = 1000  # pending deliveries read by the sender per query
+STALE_SEND_SECONDS = 600  # heartbeat age after which a send counts as stopped
+
+INSERT_CAMPAIGN = """
+INSERT INTO EMAIL_CAMPAIGNS (event_id, subject, body, attach_invite, agenda_name, agenda_type, agenda,
+                             created_by, created_date, recipients, heartbeat)
+VALUES (:event_id, :subject, :body, :attach_invite, :agenda_name, :agenda_type, :agenda,
+        :created_by, :created_date, :recipients, :created_date)
+"""
+
+# An event's registered students with a deliverable, unsuppressed address,
+# one per address after normalization.
+RECIPIENTS_QUERY = """
+SELECT student_id, email
+FROM (
+    SELECT s.student_id, LOWER(TRIM(s.email)) AS email,
+           ROW_NUMBER() OVER (PARTITION BY LOWER(TRIM(s.email)) ORDER BY s.student_id) AS address_rank
+    FROM REGISTRATIONS r
+    JOIN STUDENTS s ON r.student_id = s.student_id
+    WHERE r.event_id = :event_id AND r.status = 'REGISTERED' AND INSTR(TRIM(s.email), '@') > 1
+) recipients
+WHERE address_rank = 1
+AND NOT EXISTS (SELECT 1 FROM EMAIL_SUPPRESSION x WHERE x.email = recipients.email)
+"""
+
+INSERT_DELIVERIES = f"""
+INSERT INTO EMAIL_DELIVERIES (campaign_id, student_id, email, status)
+SELECT :campaign_id, student_id, email, 'PENDING' FROM ({RECIPIENTS_QUERY}) resolved
+"""
+
+UPDATE_DELIVERY = """
+UPDATE EMAIL_DELIVERIES SET status = :status, last_error = :last_error, updated_date = :updated_date
+WHERE campaign_id = :campaign_id AND student_id = :student_id AND status = 'PENDING'
+"""
+
+# The event name is looked up per campaign row, so listings are driven by
+# EMAIL_CAMPAIGNS (newest first) however many events there are.
+CAMPAIGNS_QUERY = """
+SELECT c.campaign_id, c.event_id, (SELECT e.event_name FROM EVENTS e WHERE e.event_id = c.event_id),
+       c.subject, c.created_date, c.created_by, c.recipients, c.sent, c.failed, c.recipients - c.sent - c.failed,
+       c.heartbeat
+FROM EMAIL_CAMPAIGNS c
+"""
+
+# Deliveries in one state, through IDX_DELIVERIES_STATUS (no sort needed).
+# Students deleted since the send have no name.
+DELIVERIES_QUERY = """
+SELECT d.student_id, s.name, d.email, d.last_error, d.updated_date
+FROM EMAIL_DELIVERIES d
+LEFT JOIN STUDENTS s ON d.student_id = s.student_id
+WHERE d.campaign_id = :campaign_id AND d.status = :status
+ORDER BY d.student_id
+"""
+
+# The sender's next page of recipients, after the student ID `after_id` if
+# given. Students deleted since the campaign started have no name.
+PENDING_RECIPIENTS_QUERY = """
+SELECT d.student_id, s.name, d.email
+FROM EMAIL_DELIVERIES d
+LEFT JOIN STUDENTS s ON d.student_id = s.student_id
+WHERE d.campaign_id = :campaign_id AND d.status = 'PENDING'
+"""
+
+# A resend goes to each failed recipient's current address (the one the
+# campaign used if the student has none now), unless it is suppressed; those
+# deliveries stay FAILED.
+CURRENT_EMAIL = """COALESCE((SELECT LOWER(TRIM(s.email)) FROM STUDENTS s
+                  WHERE s.student_id = EMAIL_DELIVERIES.student_id AND INSTR(TRIM(s.email), '@') > 1),
+                 EMAIL_DELIVERIES.email)"""
+
+RESET_FAILED = f"""
+UPDATE EMAIL_DELIVERIES SET status = 'PENDING', last_error = NULL, email = {CURRENT_EMAIL}
+WHERE campaign_id = :campaign_id AND status = 'FAILED'
+AND NOT EXISTS (SELECT 1 FROM EMAIL_SUPPRESSION x WHERE x.email = {CURRENT_EMAIL})
+"""
+
+FAIL_PENDING = """
+UPDATE EMAIL_DELIVERIES SET status = 'FAILED', last_error = :last_error, updated_date = :updated_date
+WHERE campaign_id = :campaign_id AND status = 'PENDING'
+"""
+
+INSERT_SUPPRESSION = """
+INSERT INTO EMAIL_SUPPRESSION (email, reason, created_date) VALUES (:email, :reason, :created_date)
+"""
+
+
+def normalize_email(email):
+    """Returns an address as the database compares it: trimmed and lower-case."""
+    return (email or '').strip().lower()
+
+
+def is_stalled(campaign, now=None):
+    """
+    True if a campaign row (as in get_campaigns()) has pending deliveries but
+    its sender has not reported for STALE_SEND_SECONDS, so it has stopped.
+    """
+    heartbeat = campaign[10]
+    if not campaign[9]:
+        return False
+    now = now or datetime.datetime.now()
+    return heartbeat is None or heartbeat < now - datetime.timedelta(seconds=STALE_SEND_SECONDS)
+
+
+class DeliveryLog:
+    """
+    Collects the outcome of each message of a send and writes them in
+    batches, with the permanently rejected addresses. Call sending() with
+    each recipient's student ID as their message is handed to the sender;
+    the outcomes come back in the same order. Both are called by the sender
+    thread only; call flush() once the send has finished. A recipient that
+    cannot be sent to at all is recorded with skip() instead.
+    """
+
+    def __init__(self, campaign_id):
+        self.campaign_id = campaign_id
+        self._in_flight = collections.deque()
+        self._pending = []
+        self._bounced = []
+        self._last_flush = time.monotonic()
+
+    def sending(self, student_id):
+        self._in_flight.append(student_id)
+
+    def skip(self, student_id, reason):
+        """Records a recipient as failed without handing a message to the sender."""
+        self._add(student_id, reason)
+
+    def record(self, to_email, error=None):
+        """Use as the on_result callback of email_utils.send_messages()."""
+        now = self._add(self._in_flight.popleft(), error)
+        reply = email_utils.permanent_failure(error)
+        if reply:
+            self._bounced.append({'email': normalize_email(to_email),
+                                  'reason': f"Bounced (campaign {self.campaign_id}): {reply}"[:MAX_ERROR],
+                                  'created_date': now})
+        if len(self._pending) >= FLUSH_SIZE or time.monotonic() - self._last_flush >= FLUSH_SECONDS:
+            self.flush()
+
+    def _add(self, student_id, error):
+        now = datetime.datetime.now()
+        self._pending.append({
+            'campaign_id': self.campaign_id,
+            'student_id': student_id,
+            'status': FAILED if error else SENT,
+            'last_error': str(error)[:MAX_ERROR] if error else None,
+            'updated_date': now,
+        })
+        return now
+
+    def flush(self):
+        """Writes the collected outcomes. If that fails they are kept for the next flush."""
+        rows, self._pending = self._pending, []
+        bounced, self._bounced = self._bounced, []
+        self._last_flush = time.monotonic()
+        if not rows:
+            return
+        try:
+            with db.get_connection() as conn:
+                with db.cursor(conn) as cursor:
+                    # The campaign row first: resend_failed() locks it before the deliveries too.
+                    cursor.execute(
+                        "UPDATE EMAIL_CAMPAIGNS SET heartbeat = :heartbeat WHERE campaign_id = :campaign_id",
+                        {'heartbeat': datetime.datetime.now(), 'campaign_id': self.campaign_id}
+                    )
+                    # Counted by the rows updated: deliveries no longer PENDING (failed
+                    # over by resend_failed() after a stall) are left as they are.
+                    sent = _update_deliveries(cursor, [row for row in rows if row['status'] == SENT])
+                    failed = _update_deliveries(cursor, [row for row in rows if row['status'] == FAILED])
+                    cursor.execute(
+                        "UPDATE EMAIL_CAMPAIGNS SET sent = sent + :sent, failed = failed + :failed "
+                        "WHERE campaign_id = :campaign_id",
+                        {'sent': sent, 'failed': failed, 'campaign_id': self.campaign_id}
+                    )
+                    for row in bounced:
+                        try:
+                            cursor.execute(INSERT_SUPPRESSION, row)
+                        except db.IntegrityError:
+                            pass  # suppressed meanwhile, e.g. by another campaign
+                    conn.commit()
+        except Exception as e:
+            print(f"Error recording email deliveries for campaign {self.campaign_id}: {e}")
+            self._pending = rows + self._pending
+            self._bounced = bounced + self._bounced
+
+
+def _update_deliveries(cursor, rows):
+    """Writes delivery outcomes with one executemany. Returns the number of deliveries updated."""
+    if not rows:
+        return 0
+    cursor.executemany(UPDATE_DELIVERY, rows)
+    return cursor.rowcount
+
+
+def _attachments(event_id, event, attach_invite, agenda):
+    attachments = []
+    if attach_invite:
+        attachments.append(email_builder.calendar_invite(event_id, event))
+    if agenda is not None:
+        attachments.append(agenda)
+    return attachments
+
+
+def _pending_recipients(campaign_id, log, failures):
+    """
+    Yields a campaign's pending (student_id, name, email) recipients, reading
+    STREAM_PAGE rows per query. A query that fails ends the stream, with the
+    error appended to `failures`. A delivery without an address is recorded
+    as failed instead of being yielded; it still counts as handed to the
+    sender (see email_utils.EMAIL_QUEUE_DEPTH).
+    """
+    after_id = None
+    while True:
+        query = PENDING_RECIPIENTS_QUERY
+        params = {'campaign_id': campaign_id}
+        if after_id is not None:
+            query += "AND d.student_id > :after_id\n"
+            params['after_id'] = after_id
+        query += "ORDER BY d.student_id"
+        try:
+            with db.get_connection() as conn:
+                with db.cursor(conn) as cursor:
+                    cursor.execute(*db.paginate(query, params, STREAM_PAGE))
+                    rows = cursor.fetchall()
+        except Exception as e:
+            print(f"Error reading the recipients of campaign {campaign_id}: {e}")
+            failures.append(e)
+            return
+        for student_id, name, email in rows:
+            if not email:
+                log.skip(student_id, "No email address")
+                email_utils.EMAIL_QUEUE_DEPTH.dec()
+                continue
+            log.sending(student_id)
+            yield student_id, name, email
+        if len(rows) < STREAM_PAGE:
+            return
+        after_id = rows[-1][0]
+
+
+def _fail_pending(campaign_id, error):
+    """Marks deliveries left unsent by a failed stream FAILED, so they can be resent."""
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                cursor.execute(FAIL_PENDING, {'last_error': f"Not sent: {error}"[:MAX_ERROR],
+                                              'updated_date': datetime.datetime.now(), 'campaign_id': campaign_id})
+                cursor.execute(
+                    "UPDATE EMAIL_CAMPAIGNS SET failed = failed + :count WHERE campaign_id = :campaign_id",
+                    {'count': cursor.rowcount, 'campaign_id': campaign_id}
+                )
+                conn.commit()
+    except Exception as e:
+        print(f"Error recording the unsent deliveries of campaign {campaign_id}: {e}")
+
+
+def _send(campaign_id, event_id, event, subject, body, attachments, count, completion_callback):
+    """Sends a campaign's `count` pending deliveries in the background, recording each outcome."""
+    log = DeliveryLog(campaign_id)
+    failures = []
+
+    def _finished(counts):
+        log.flush()
+        if failures:
+            _fail_pending(campaign_id, failures[0])
+        if completion_callback:
+            completion_callback(counts)
+
+    return email_utils.send_personalized_emails_in_background(
+        event_id, event, subject, body, _pending_recipients(campaign_id, log, failures), _finished,
+        attachments=attachments, on_result=log.record, count=count
+    )
+
+
+@metrics.track_query
+def count_recipients(event_id):
+    """Returns how many emails a campaign to the event would send (see RECIPIENTS_QUERY)."""
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                cursor.execute(f"SELECT COUNT(*) FROM ({RECIPIENTS_QUERY}) resolved", {'event_id': event_id})
+                return cursor.fetchone()[0]
+    except Exception as e:
+        print(f"Error counting email recipients: {e}")
+        return 0
+
+
+@metrics.track_query
+def start_campaign(event_id, event, subject, body, attach_invite=False, agenda=None, created_by=None,
+                   completion_callback=None):
+    """
+    Records a campaign to the event's registered students and starts sending
+    it in the background.
+
+    `event` is the (event_name, event_date, event_time, venue) row and
+    `agenda` an optional email_builder.Attachment. Raises
+    email_templates.TemplateError for an unknown merge field, before anything
+    is recorded.
+    Returns (campaign_id, recipient count). When nothing was sent,
+    campaign_id is None and the count is 0 if there are no deliverable
+    addresses, or None after a database error.
+    """
+    email_templates.compile_template(subject, event_id, event)
+    email_templates.compile_template(body, event_id, event)
+
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                campaign_id = db.insert_returning_id(cursor, INSERT_CAMPAIGN, {
+                    'event_id': event_id,
+                    'subject': subject,
+                    'body': body,
+                    'attach_invite': 'Y' if attach_invite else 'N',
+                    'agenda_name': agenda.filename if agenda else None,
+                    'agenda_type': agenda.content_type if agenda else None,
+                    'agenda': agenda.data if agenda else None,
+                    'created_by': created_by,
+                    'created_date': datetime.datetime.now(),
+                    'recipients': 0,
+                }, 'campaign_id')
+                cursor.execute(INSERT_DELIVERIES, {'campaign_id': campaign_id, 'event_id': event_id})
+                count = cursor.rowcount
+                if not count:
+                    conn.rollback()
+                    return None, 0
+                cursor.execute(
+                    "UPDATE EMAIL_CAMPAIGNS SET recipients = :count WHERE campaign_id = :campaign_id",
+                    {'count': count, 'campaign_id': campaign_id}
+                )
+                conn.commit()
+    except Exception as e:
+        print(f"Error creating email campaign: {e}")
+        return None, None
+
+    _send(campaign_id, event_id, event, subject, body, _attachments(event_id, event, attach_invite, agenda),
+          count, completion_callback)
+    return campaign_id, count
+
+
+@metrics.track_query
+def resend_failed(campaign_id, completion_callback=None):
+    """
+    Sends a campaign's failed deliveries again, with the campaign's own
+    templates and attachments, to each student's current address. Deliveries
+    to suppressed addresses stay failed. Refused while the campaign is still
+    sending, unless its sender has stopped (see STALE_SEND_SECONDS); then its
+    pending deliveries are failed and sent again too. Returns a result message.
+    """
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                # Locks the campaign, so two resends cannot pick up the same deliveries.
+                cursor.execute("""
+                SELECT event_id, subject, body, attach_invite, agenda_name, agenda_type, agenda,
+                       recipients - sent - failed, failed, heartbeat
+                FROM EMAIL_CAMPAIGNS WHERE campaign_id = :campaign_id FOR UPDATE
+                """, {'campaign_id': campaign_id})
+                campaign = cursor.fetchone()
+                if not campaign:
+                    return "Error: Campaign not found."
+                (event_id, subject, body, attach_invite, agenda_name, agenda_type, agenda,
+                 pending, failed, heartbeat) = campaign
+                now = datetime.datetime.now()
+                if pending and heartbeat is not None and heartbeat > now - datetime.timedelta(seconds=STALE_SEND_SECONDS):
+                    return f"Info: Campaign {campaign_id} is still sending ({pending} pending)."
+                if not failed and not pending:
+                    return f"Info: Campaign {campaign_id} has no failed deliveries."
+
+                cursor.execute(
+                    "SELECT event_name, event_date, event_time, venue FROM EVENTS WHERE event_id = :event_id",
+                    {'event_id': event_id}
+                )
+                event = cursor.fetchone()
+                # Fails here, before any delivery changes, if the templates no longer compile.
+                email_templates.compile_template(subject, event_id, event)
+                email_templates.compile_template(body, event_id, event)
+
+                if pending:
+                    # The sender stopped: what it left PENDING is resent with the failures.
+                    cursor.execute(FAIL_PENDING, {'last_error': "Not sent: the sending process stopped",
+                                                  'updated_date': now, 'campaign_id': campaign_id})
+                    stopped = cursor.rowcount
+                    cursor.execute(
+                        "UPDATE EMAIL_CAMPAIGNS SET failed = failed + :count WHERE campaign_id = :campaign_id",
+                        {'count': stopped, 'campaign_id': campaign_id}
+                    )
+                    failed += stopped
+                cursor.execute(RESET_FAILED, {'campaign_id': campaign_id})
+                count = cursor.rowcount
+                if not count:
+                    conn.commit()
+                    return f"Info: Campaign {campaign_id} has no failed deliveries to unsuppressed addresses."
+                cursor.execute(
+                    "UPDATE EMAIL_CAMPAIGNS SET failed = failed - :count, heartbeat = :now "
+                    "WHERE campaign_id = :campaign_id",
+                    {'count': count, 'now': now, 'campaign_id': campaign_id}
+                )
+                conn.commit()
+    except Exception as e:
+        print(f"Error resending campaign {campaign_id}: {e}")
+        return f"Error: Could not resend campaign {campaign_id}: {e}"
+
+    agenda = email_builder.Attachment(agenda_name, agenda_type, agenda) if agenda_name else None
+    _send(campaign_id, event_id, event, subject, body, _attachments(event_id, event, attach_invite == 'Y', agenda),
+          count, completion_callback)
+    message = f"Success: Resending campaign {campaign_id} to {count} failed recipient(s)."
+    if failed > count:
+        message += f" {failed - count} suppressed address(es) skipped."
+    return message
+
+
+@metrics.track_query
+def get_campaigns(event_id=None, limit=None, offset=0):
+    """
+    Retrieves campaigns, newest first, optionally for one event, as
+    (campaign_id, event_id, event_name, subject, created_date, created_by,
+    recipients, sent, failed, pending, heartbeat) rows.
+    Pass `limit`/`offset` to fetch a single page.
+    """
+    query = CAMPAIGNS_QUERY
+    params = {}
+    if event_id is not None:
+        query += "WHERE c.event_id = :event_id\n"
+        params['event_id'] = event_id
+    query += "ORDER BY c.campaign_id DESC"
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                cursor.execute(*db.paginate(query, params, limit, offset))
+                return cursor.fetchall()
+    except Exception as e:
+        print(f"Error fetching email campaigns: {e}")
+        return []
+
+
+@metrics.track_query
+def get_campaign(campaign_id):
+    """Retrieves one campaign's row (as in get_campaigns()), or None."""
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                cursor.execute(CAMPAIGNS_QUERY + "WHERE c.campaign_id = :campaign_id", {'campaign_id': campaign_id})
+                return cursor.fetchone()
+    except Exception as e:
+        print(f"Error fetching email campaign: {e}")
+        return None
+
+
+@metrics.track_query
+def get_deliveries(campaign_id, status=FAILED, limit=None, offset=0):
+    """
+    Retrieves a campaign's deliveries in one state (failed by default) as
+    (student_id, name, email, last_error, updated_date) rows, by student ID.
+    Pass `limit`/`offset` to fetch a single page.
+    """
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                cursor.execute(*db.paginate(DELIVERIES_QUERY, {'campaign_id': campaign_id, 'status': status},
+                                            limit, offset))
+                return cursor.fetchall()
+    except Exception as e:
+        print(f"Error fetching email deliveries: {e}")
+        return []
+
+
+@metrics.track_query
+def suppress_email(email, reason=None):
+    """Adds an address to the suppression list, so no campaign emails it. Returns a result message."""
+    email = normalize_email(email)
+    if '@' not in email:
+        return "Error: Invalid email address."
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                cursor.execute(INSERT_SUPPRESSION, {'email': email, 'reason': reason[:MAX_ERROR] if reason else None,
+                                                    'created_date': datetime.datetime.now()})
+                conn.commit()
+        return f"Success: {email} will no longer be emailed."
+    except db.IntegrityError:
+        return f"Info: {email} is already suppressed."
+    except Exception as e:
+        print(f"Error suppressing email address: {e}")
+        return f"Error: Could not suppress {email}: {e}"
+
+
+@metrics.track_query
+def unsuppress_email(email):
+    """Removes an address from the suppression list. Returns a result message."""
+    email = normalize_email(email)
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                cursor.execute("DELETE FROM EMAIL_SUPPRESSION WHERE email = :email", {'email': email})
+                conn.commit()
+                if cursor.rowcount == 0:
+                    return f"Error: {email} not found in the suppression list."
+        return f"Success: {email} can be emailed again."
+    except Exception as e:
+        print(f"Error removing suppressed email address: {e}")
+        return f"Error: Could not remove {email}: {e}"
+
+
+@metrics.track_query
+def get_suppressions(limit=None, offset=0):
+    """
+    Retrieves suppressed addresses as (email, reason, created_date) rows, by
+    address. Pass `limit`/`offset` to fetch a single page.
+    """
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                cursor.execute(*db.paginate("SELECT email, reason, created_date FROM EMAIL_SUPPRESSION ORDER BY email",
+                                            {}, limit, offset))
+                return cursor.fetchall()
+    except Exception as e:
+        print(f"Error fetching suppressed email addresses: {e}")
+        return []
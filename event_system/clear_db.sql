@@ -1,9 +1,86 @@
+DELETE FROM EMAIL_SUPPRESSION;
+DELETE FROM SCHEDULER_LEASES;
+DELETE FROM EVENT_REMINDERS;
+DELETE FROM EMAIL_DELIVERIES;
+DELETE FROM EMAIL_CAMPAIGNS;
+DELETE FROM ATTENDANCE_ARCHIVE;
+DELETE FROM REGISTRATIONS_ARCHIVE;
 DELETE FROM ATTENDANCE;
 DELETE FROM REGISTRATIONS;
 DELETE FROM EVENTS;
 DELETE FROM STUDENTS;
 DELETE FROM USERS;
 
+BEGIN
+   EXECUTE IMMEDIATE 'DROP TABLE EMAIL_SUPPRESSION';
+EXCEPTION
+   WHEN OTHERS THEN
+      IF SQLCODE != -942 THEN
+         RAISE;
+      END IF;
+END;
+/
+
+BEGIN
+   EXECUTE IMMEDIATE 'DROP TABLE SCHEDULER_LEASES';
+EXCEPTION
+   WHEN OTHERS THEN
+      IF SQLCODE != -942 THEN
+         RAISE;
+      END IF;
+END;
+/
+
+BEGIN
+   EXECUTE IMMEDIATE 'DROP TABLE EVENT_REMINDERS';
+EXCEPTION
+   WHEN OTHERS THEN
+      IF SQLCODE != -942 THEN
+         RAISE;
+      END IF;
+END;
+/
+
+BEGIN
+   EXECUTE IMMEDIATE 'DROP TABLE EMAIL_DELIVERIES';
+EXCEPTION
+   WHEN OTHERS THEN
+      IF SQLCODE != -942 THEN
+         RAISE;
+      END IF;
+END;
+/
+
+BEGIN
+   EXECUTE IMMEDIATE 'DROP TABLE EMAIL_CAMPAIGNS';
+EXCEPTION
+   WHEN OTHERS THEN
+      IF SQLCODE != -942 THEN
+         RAISE;
+      END IF;
+END;
+/
+
+BEGIN
+   EXECUTE IMMEDIATE 'DROP TABLE ATTENDANCE_ARCHIVE';
+EXCEPTION
+   WHEN OTHERS THEN
+      IF SQLCODE != -942 THEN
+         RAISE;
+      END IF;
+END;
+/
+
+BEGIN
+   EXECUTE IMMEDIATE 'DROP TABLE REGISTRATIONS_ARCHIVE';
+EXCEPTION
+   WHEN OTHERS THEN
+      IF SQLCODE != -942 THEN
+         RAISE;
+      END IF;
+END;
+/
+
 BEGIN
    EXECUTE IMMEDIATE 'DROP TABLE ATTENDANCE';
 EXCEPTION
@@ -94,4 +171,14 @@ EXCEPTION
 END;
 /
 
+BEGIN
+   EXECUTE IMMEDIATE 'DROP SEQUENCE campaign_id_seq';
+EXCEPTION
+   WHEN OTHERS THEN
+      IF SQLCODE != -2289 THEN
+         RAISE;
+      END IF;
+END;
+/
+
 COMMIT;
\ No newline at end of file
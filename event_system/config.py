@@ -20,6 +20,35 @@
 #   - SMTP_PASSWORD: Your email account password or an app-specific password.
 #   - SENDER_EMAIL: The email address that will appear as the sender.
 #
+# Optional settings:
+#   - DB_BACKEND: 'oracle' (default) or 'sqlite'. The SQLite backend stores
+#     everything in a single local file (SQLITE_PATH, default 'event_system.db')
+#     and needs no database server; create its tables with `python setup_db.py`.
+#   - DB_POOL_MIN / DB_POOL_MAX: Connection pool size per process (default 2 / 5).
+#   - SECRET_KEY: Flask session signing key. Required when serving with more
+#     than one worker, otherwise each worker signs sessions with its own key.
+#   - WEB_BIND, WEB_WORKERS, WEB_THREADS: Defaults for `--serve` mode.
+#   - METRICS_TOKEN: Bearer token required by /metrics. Without it the endpoint
+#     is open, so only bind the server to an internal interface.
+#   - DB_ASYNC_POOL_MAX: Connection pool size for the `--async` web tier (default 20).
+#   - SQL_TRACE: Set to '1' to time every SQL statement and log slow ones.
+#   - SLOW_QUERY_MS: Slow-query log threshold in milliseconds (default 200).
+#   - SMTP_STARTTLS: Set to '0' for SMTP servers without TLS (e.g. a local sink).
+#   - CHECK_IN_SECRET: Key for the check-in codes in personalized emails
+#     (default SECRET_KEY); see email_templates.py.
+#   - INTAKE_WORKERS, INTAKE_BATCH_SIZE, INTAKE_HOT_THRESHOLD, INTAKE_MAX_PENDING,
+#     INTAKE_WAIT_SECONDS: Registration queuing for busy events; see intake.py.
+#   - ARCHIVE_RETENTION_DAYS / ARCHIVE_BATCH_EVENTS: Defaults for archiving past
+#     events with `python -m event_system.archive` (default 365 / 50).
+#   - ANALYTICS_SETTLE_DAYS, ANALYTICS_REFRESH_SECONDS, ANALYTICS_FULL_REFRESH_SECONDS:
+#     Engagement analytics caching (default 7 / 60 / 3600); see analytics.py.
+#   - FORECAST_REFRESH_SECONDS, FORECAST_OVERFLOW_RISK, FORECAST_MAX_OVERBOOKING:
+#     Attendance forecasting (default 300 / 0.05 / 1.5); see forecast.py.
+#   - REMINDERS_ENABLED: Set to '1' to email registered students before each
+#     event. REMINDER_HOURS lists how long before (default '24,1');
+#     REMINDER_REFRESH_SECONDS, REMINDER_LEASE_SECONDS (default 300 / 60) and
+#     REMINDER_ATTACH_INVITE (default '1') tune it; see reminders.py.
+#
 # You can set these variables directly in your shell, or use a `.env` file
 # with a library like `python-dotenv` for easier management during development.
 
@@ -31,11 +60,21 @@ from dotenv import load_dotenv
 load_dotenv()
 
 # --- Database Configuration ---
-# Retrieves Oracle database credentials from environment variables.
+# Retrieves the database backend and Oracle credentials from environment variables.
 DB_CONFIG = {
+    'backend': os.environ.get('DB_BACKEND', 'oracle').lower(),
     'user': os.environ.get('DB_USER', 'default_user'),
     'password': os.environ.get('DB_PASSWORD', 'default_password'),
-    'dsn': os.environ.get('DB_DSN', 'localhost:1521/XEPDB1')
+    'dsn': os.environ.get('DB_DSN', 'localhost:1521/XEPDB1'),
+    # Pool size is per process; with --serve every worker gets its own pool.
+    'pool_min': int(os.environ.get('DB_POOL_MIN', 2)),
+    'pool_max': int(os.environ.get('DB_POOL_MAX', 5)),
+    # Used by the asyncio web tier (--async), where a single process serves
+    # many concurrent requests.
+    'async_pool_max': int(os.environ.get('DB_ASYNC_POOL_MAX', 20)),
+    # Only used by the SQLite backend.
+    'sqlite_path': os.environ.get('SQLITE_PATH', 'event_system.db'),
+    'sqlite_busy_timeout_ms': int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
 }
 
 # --- Email Configuration ---
@@ -45,7 +84,80 @@ EMAIL_CONFIG = {
     'smtp_port': int(os.environ.get('SMTP_PORT', 587)),
     'smtp_username': os.environ.get('SMTP_USERNAME', 'user@example.com'),
     'smtp_password': os.environ.get('SMTP_PASSWORD', 'password'),
-    'sender_email': os.environ.get('SENDER_EMAIL', 'noreply@example.com')
+    'sender_email': os.environ.get('SENDER_EMAIL', 'noreply@example.com'),
+    # Set SMTP_STARTTLS=0 and an empty SMTP_USERNAME for a local relay or test
+    # sink that speaks plain SMTP without authentication.
+    'smtp_starttls': os.environ.get('SMTP_STARTTLS', '1').lower() in ('1', 'true', 'yes'),
+    # Signs the check-in codes in personalized emails. Codes already sent stop
+    # verifying when it changes, so keep it stable. Without either variable
+    # each process signs with a random key (see email_templates.py).
+    'check_in_secret': os.environ.get('CHECK_IN_SECRET') or os.environ.get('SECRET_KEY')
+}
+
+# --- Web Server Configuration ---
+# Used by the Flask app and the production server started with `--serve`.
+WEB_CONFIG = {
+    'secret_key': os.environ.get('SECRET_KEY'),
+    'bind': os.environ.get('WEB_BIND', '127.0.0.1:8000'),
+    'workers': int(os.environ.get('WEB_WORKERS', (os.cpu_count() or 1) * 2 + 1)),
+    'threads': int(os.environ.get('WEB_THREADS', 4)),
+    'graceful_timeout': int(os.environ.get('WEB_GRACEFUL_TIMEOUT', 30)),
+    # /metrics labels carry routes, SQL text and timings; see web_ui.py.
+    'metrics_token': os.environ.get('METRICS_TOKEN')
+}
+
+# --- SQL Tracing Configuration ---
+# Statement timing is off by default; see sqltrace.py.
+SQL_TRACE_CONFIG = {
+    'enabled': os.environ.get('SQL_TRACE', '0').lower() in ('1', 'true', 'yes'),
+    'slow_query_ms': float(os.environ.get('SLOW_QUERY_MS', 200))
+}
+
+# --- Registration Intake Configuration ---
+# Requests for an event with `hot_threshold` registrations in flight are queued
+# and committed in batches by `workers` threads (each holding one connection).
+INTAKE_CONFIG = {
+    'workers': int(os.environ.get('INTAKE_WORKERS', 2)),
+    'batch_size': int(os.environ.get('INTAKE_BATCH_SIZE', 50)),
+    'hot_threshold': int(os.environ.get('INTAKE_HOT_THRESHOLD', 2)),
+    'max_pending': int(os.environ.get('INTAKE_MAX_PENDING', 1000)),
+    'wait_seconds': float(os.environ.get('INTAKE_WAIT_SECONDS', 30))
+}
+
+# --- Archive Configuration ---
+# Events older than the retention window are moved out of the live tables.
+ARCHIVE_CONFIG = {
+    'retention_days': int(os.environ.get('ARCHIVE_RETENTION_DAYS', 365)),
+    'batch_events': int(os.environ.get('ARCHIVE_BATCH_EVENTS', 50))
+}
+
+# --- Analytics Configuration ---
+# Engagement totals are cached per process and refreshed incrementally.
+ANALYTICS_CONFIG = {
+    'settle_days': int(os.environ.get('ANALYTICS_SETTLE_DAYS', 7)),
+    'refresh_seconds': float(os.environ.get('ANALYTICS_REFRESH_SECONDS', 60)),
+    'full_refresh_seconds': float(os.environ.get('ANALYTICS_FULL_REFRESH_SECONDS', 3600))
+}
+
+# --- Forecast Configuration ---
+# Refresh interval of the attendance forecast, the accepted chance that more
+# registrants turn up than there are seats, and the largest registration limit
+# it recommends as a multiple of the seats.
+FORECAST_CONFIG = {
+    'refresh_seconds': float(os.environ.get('FORECAST_REFRESH_SECONDS', 300)),
+    'overflow_risk': float(os.environ.get('FORECAST_OVERFLOW_RISK', 0.05)),
+    'max_overbooking': float(os.environ.get('FORECAST_MAX_OVERBOOKING', 1.5))
+}
+
+# --- Reminder Configuration ---
+# Reminder campaigns `hours` before each event, sent by whichever process
+# holds the scheduler lease (see reminders.py).
+REMINDER_CONFIG = {
+    'enabled': os.environ.get('REMINDERS_ENABLED', '0') == '1',
+    'hours': [float(hours) for hours in os.environ.get('REMINDER_HOURS', '24,1').split(',') if hours.strip()],
+    'refresh_seconds': float(os.environ.get('REMINDER_REFRESH_SECONDS', 300)),
+    'lease_seconds': float(os.environ.get('REMINDER_LEASE_SECONDS', 60)),
+    'attach_invite': os.environ.get('REMINDER_ATTACH_INVITE', '1') == '1'
 }
 
 # --- Validation and Feedback ---
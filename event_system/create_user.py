@@ -3,7 +3,6 @@
 
 import getpass
 from event_system import db, auth
-import oracledb # Import the oracledb library to catch specific exceptions
 
 def create_user():
     """
@@ -31,7 +30,7 @@ def create_user():
         print("Database connection failed.")
         return
 
-    cursor = conn.cursor()
+    cursor = db.cursor(conn)
     try:
         query = """
         INSERT INTO USERS (username, password, role)
@@ -44,10 +43,9 @@ def create_user():
         })
         conn.commit()
         print(f"Successfully created user: {username} with role: {role}")
-    except oracledb.IntegrityError as e:
-        error_obj, = e.args
+    except db.IntegrityError as e:
         # Check if the error is a unique constraint violation for the username
-        if "UK_USERNAME" in error_obj.message:
+        if db.is_unique_violation(e, "UK_USERNAME", "USERS.username"):
             print(f"Error: Username '{username}' already exists.")
         else:
             print(f"An integrity error occurred: {e}")
@@ -1,3 +1,10 @@
+EXECUTE IMMEDIATE 'DROP TABLE EMAIL_SUPPRESSION';
+EXECUTE IMMEDIATE 'DROP TABLE SCHEDULER_LEASES';
+EXECUTE IMMEDIATE 'DROP TABLE EVENT_REMINDERS';
+EXECUTE IMMEDIATE 'DROP TABLE EMAIL_DELIVERIES';
+EXECUTE IMMEDIATE 'DROP TABLE EMAIL_CAMPAIGNS';
+EXECUTE IMMEDIATE 'DROP TABLE ATTENDANCE_ARCHIVE';
+EXECUTE IMMEDIATE 'DROP TABLE REGISTRATIONS_ARCHIVE';
 EXECUTE IMMEDIATE 'DROP TABLE ATTENDANCE';
 EXECUTE IMMEDIATE 'DROP TABLE REGISTRATIONS';
 EXECUTE IMMEDIATE 'DROP TABLE EVENTS';
@@ -7,11 +14,13 @@ EXECUTE IMMEDIATE 'DROP SEQUENCE event_id_seq';
 EXECUTE IMMEDIATE 'DROP SEQUENCE reg_id_seq';
 EXECUTE IMMEDIATE 'DROP SEQUENCE attendance_id_seq';
 EXECUTE IMMEDIATE 'DROP SEQUENCE user_id_seq';
+EXECUTE IMMEDIATE 'DROP SEQUENCE campaign_id_seq';
 
 CREATE SEQUENCE user_id_seq START WITH 1 INCREMENT BY 1;
 CREATE SEQUENCE event_id_seq START WITH 1 INCREMENT BY 1;
 CREATE SEQUENCE reg_id_seq START WITH 1 INCREMENT BY 1;
 CREATE SEQUENCE attendance_id_seq START WITH 1 INCREMENT BY 1;
+CREATE SEQUENCE campaign_id_seq START WITH 1 INCREMENT BY 1;
 
 CREATE TABLE EVENTS (
     event_id NUMBER DEFAULT event_id_seq.NEXTVAL NOT NULL,
@@ -23,6 +32,8 @@ CREATE TABLE EVENTS (
     CONSTRAINT pk_events PRIMARY KEY (event_id)
 );
 
+CREATE INDEX idx_events_date ON EVENTS (event_date, event_id);
+
 CREATE TABLE STUDENTS (
     student_id VARCHAR2(255) NOT NULL,
     name VARCHAR2(255) NOT NULL,
@@ -32,6 +43,8 @@ CREATE TABLE STUDENTS (
     CONSTRAINT pk_students PRIMARY KEY (student_id)
 );
 
+CREATE INDEX idx_students_name ON STUDENTS (name, student_id);
+
 CREATE TABLE REGISTRATIONS (
     reg_id NUMBER DEFAULT reg_id_seq.NEXTVAL NOT NULL,
     event_id NUMBER NOT NULL,
@@ -41,9 +54,14 @@ CREATE TABLE REGISTRATIONS (
     CONSTRAINT pk_registrations PRIMARY KEY (reg_id),
     CONSTRAINT fk_reg_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
     CONSTRAINT fk_reg_students FOREIGN KEY (student_id) REFERENCES STUDENTS(student_id),
-    CONSTRAINT uk_event_student UNIQUE (event_id, student_id)
+    CONSTRAINT uk_event_student UNIQUE (event_id, student_id),
+    CONSTRAINT chk_reg_status CHECK (status IN ('REGISTERED', 'WAITLISTED'))
 );
 
+-- Serves capacity counts and the head of each event's waitlist (promotion order).
+CREATE INDEX idx_reg_waitlist ON REGISTRATIONS (event_id, status, reg_date, reg_id);
+CREATE INDEX idx_reg_student ON REGISTRATIONS (student_id);
+
 CREATE TABLE ATTENDANCE (
     attendance_id NUMBER DEFAULT attendance_id_seq.NEXTVAL NOT NULL,
     event_id NUMBER NOT NULL,
@@ -56,6 +74,38 @@ CREATE TABLE ATTENDANCE (
     CONSTRAINT chk_attended CHECK (attended IN ('Y', 'N'))
 );
 
+CREATE INDEX idx_att_student ON ATTENDANCE (student_id);
+
+-- Registrations and attendance of past events, moved out of the live tables
+-- by archive.py. Rows keep their original IDs.
+CREATE TABLE REGISTRATIONS_ARCHIVE (
+    reg_id NUMBER NOT NULL,
+    event_id NUMBER NOT NULL,
+    student_id VARCHAR2(255) NOT NULL,
+    reg_date DATE,
+    status VARCHAR2(50),
+    archived_date DATE DEFAULT SYSDATE,
+    CONSTRAINT pk_registrations_archive PRIMARY KEY (reg_id),
+    CONSTRAINT fk_reg_arch_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+    CONSTRAINT fk_reg_arch_students FOREIGN KEY (student_id) REFERENCES STUDENTS(student_id)
+);
+
+CREATE INDEX idx_reg_archive_event ON REGISTRATIONS_ARCHIVE (event_id);
+CREATE INDEX idx_reg_archive_student ON REGISTRATIONS_ARCHIVE (student_id);
+
+CREATE TABLE ATTENDANCE_ARCHIVE (
+    attendance_id NUMBER NOT NULL,
+    event_id NUMBER NOT NULL,
+    student_id VARCHAR2(255) NOT NULL,
+    attended CHAR(1) NOT NULL,
+    archived_date DATE DEFAULT SYSDATE,
+    CONSTRAINT pk_attendance_archive PRIMARY KEY (attendance_id),
+    CONSTRAINT fk_att_arch_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+    CONSTRAINT fk_att_arch_students FOREIGN KEY (student_id) REFERENCES STUDENTS(student_id)
+);
+
+CREATE INDEX idx_att_archive_event ON ATTENDANCE_ARCHIVE (event_id);
+
 CREATE TABLE USERS (
     user_id NUMBER DEFAULT user_id_seq.NEXTVAL NOT NULL,
     username VARCHAR2(255) NOT NULL,
@@ -65,3 +115,74 @@ CREATE TABLE USERS (
     CONSTRAINT uk_username UNIQUE (username),
     CONSTRAINT chk_role CHECK (role IN ('admin', 'volunteer'))
 );
+
+-- Email sends to an event's registered students (campaigns.py). sent and
+-- failed count the recorded deliveries, so a campaign's status is read from
+-- its own row.
+CREATE TABLE EMAIL_CAMPAIGNS (
+    campaign_id NUMBER DEFAULT campaign_id_seq.NEXTVAL NOT NULL,
+    event_id NUMBER NOT NULL,
+    subject VARCHAR2(1000) NOT NULL,
+    body CLOB NOT NULL,
+    attach_invite CHAR(1) DEFAULT 'N' NOT NULL,
+    agenda_name VARCHAR2(255),
+    agenda_type VARCHAR2(255),
+    agenda BLOB,
+    created_by VARCHAR2(255),
+    created_date DATE DEFAULT SYSDATE,
+    recipients NUMBER DEFAULT 0 NOT NULL,
+    sent NUMBER DEFAULT 0 NOT NULL,
+    failed NUMBER DEFAULT 0 NOT NULL,
+    heartbeat DATE,
+    CONSTRAINT pk_email_campaigns PRIMARY KEY (campaign_id),
+    CONSTRAINT fk_campaign_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+    CONSTRAINT chk_campaign_invite CHECK (attach_invite IN ('Y', 'N'))
+);
+
+CREATE INDEX idx_campaigns_event ON EMAIL_CAMPAIGNS (event_id, campaign_id);
+
+-- One row per recipient of a campaign. student_id is deliberately not a
+-- foreign key: the record of a send outlives the student.
+CREATE TABLE EMAIL_DELIVERIES (
+    campaign_id NUMBER NOT NULL,
+    student_id VARCHAR2(255) NOT NULL,
+    email VARCHAR2(255) NOT NULL,
+    status VARCHAR2(20) DEFAULT 'PENDING' NOT NULL,
+    last_error VARCHAR2(1000),
+    updated_date DATE,
+    CONSTRAINT pk_email_deliveries PRIMARY KEY (campaign_id, student_id),
+    CONSTRAINT fk_delivery_campaigns FOREIGN KEY (campaign_id) REFERENCES EMAIL_CAMPAIGNS(campaign_id),
+    CONSTRAINT chk_delivery_status CHECK (status IN ('PENDING', 'SENT', 'FAILED'))
+);
+
+-- Serves the failed (or pending) recipients of a campaign, in student order.
+CREATE INDEX idx_deliveries_status ON EMAIL_DELIVERIES (campaign_id, status, student_id);
+
+-- Reminder campaigns sent (or skipped) per event and lead time, by the
+-- reminder scheduler (reminders.py). The key makes each one happen once.
+CREATE TABLE EVENT_REMINDERS (
+    event_id NUMBER NOT NULL,
+    minutes_before NUMBER NOT NULL,
+    campaign_id NUMBER,
+    created_date DATE DEFAULT SYSDATE,
+    CONSTRAINT pk_event_reminders PRIMARY KEY (event_id, minutes_before),
+    CONSTRAINT fk_reminder_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+    CONSTRAINT fk_reminder_campaigns FOREIGN KEY (campaign_id) REFERENCES EMAIL_CAMPAIGNS(campaign_id)
+);
+
+-- Leases electing the one process that runs a scheduler (reminders.py).
+CREATE TABLE SCHEDULER_LEASES (
+    name VARCHAR2(100) NOT NULL,
+    holder VARCHAR2(255) NOT NULL,
+    expires_at DATE NOT NULL,
+    CONSTRAINT pk_scheduler_leases PRIMARY KEY (name)
+);
+
+-- Addresses never to email, stored trimmed and lower-case: permanent
+-- bounces recorded by the sender, and addresses added by an admin.
+CREATE TABLE EMAIL_SUPPRESSION (
+    email VARCHAR2(255) NOT NULL,
+    reason VARCHAR2(1000),
+    created_date DATE DEFAULT SYSDATE,
+    CONSTRAINT pk_email_suppression PRIMARY KEY (email)
+);
@@ -0,0 +1,174 @@
+-- SQLite version of database_setup.sql, used when DB_BACKEND=sqlite.
+-- Same tables, columns and constraints. Oracle sequences become
+-- AUTOINCREMENT keys, which likewise never reuse an ID.
+
+DROP TABLE IF EXISTS EMAIL_SUPPRESSION;
+DROP TABLE IF EXISTS SCHEDULER_LEASES;
+DROP TABLE IF EXISTS EVENT_REMINDERS;
+DROP TABLE IF EXISTS EMAIL_DELIVERIES;
+DROP TABLE IF EXISTS EMAIL_CAMPAIGNS;
+DROP TABLE IF EXISTS ATTENDANCE_ARCHIVE;
+DROP TABLE IF EXISTS REGISTRATIONS_ARCHIVE;
+DROP TABLE IF EXISTS ATTENDANCE;
+DROP TABLE IF EXISTS REGISTRATIONS;
+DROP TABLE IF EXISTS EVENTS;
+DROP TABLE IF EXISTS STUDENTS;
+DROP TABLE IF EXISTS USERS;
+
+CREATE TABLE EVENTS (
+    event_id INTEGER CONSTRAINT pk_events PRIMARY KEY AUTOINCREMENT,
+    event_name TEXT NOT NULL,
+    event_date DATE NOT NULL,
+    event_time TEXT NOT NULL,
+    venue TEXT NOT NULL,
+    total_slots INTEGER NOT NULL
+);
+
+CREATE INDEX idx_events_date ON EVENTS (event_date, event_id);
+
+CREATE TABLE STUDENTS (
+    student_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    email TEXT NOT NULL UNIQUE,
+    course TEXT,
+    year INTEGER,
+    CONSTRAINT pk_students PRIMARY KEY (student_id)
+);
+
+CREATE INDEX idx_students_name ON STUDENTS (name, student_id);
+
+CREATE TABLE REGISTRATIONS (
+    reg_id INTEGER CONSTRAINT pk_registrations PRIMARY KEY AUTOINCREMENT,
+    event_id INTEGER NOT NULL,
+    student_id TEXT NOT NULL,
+    reg_date DATE DEFAULT CURRENT_TIMESTAMP,
+    status TEXT DEFAULT 'REGISTERED',
+    CONSTRAINT fk_reg_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+    CONSTRAINT fk_reg_students FOREIGN KEY (student_id) REFERENCES STUDENTS(student_id),
+    CONSTRAINT uk_event_student UNIQUE (event_id, student_id),
+    CONSTRAINT chk_reg_status CHECK (status IN ('REGISTERED', 'WAITLISTED'))
+);
+
+-- Serves capacity counts and the head of each event's waitlist (promotion order).
+CREATE INDEX idx_reg_waitlist ON REGISTRATIONS (event_id, status, reg_date, reg_id);
+CREATE INDEX idx_reg_student ON REGISTRATIONS (student_id);
+
+CREATE TABLE ATTENDANCE (
+    attendance_id INTEGER CONSTRAINT pk_attendance PRIMARY KEY AUTOINCREMENT,
+    event_id INTEGER NOT NULL,
+    student_id TEXT NOT NULL,
+    attended TEXT DEFAULT 'N' NOT NULL,
+    CONSTRAINT fk_att_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+    CONSTRAINT fk_att_students FOREIGN KEY (student_id) REFERENCES STUDENTS(student_id),
+    CONSTRAINT uk_att_event_student UNIQUE (event_id, student_id),
+    CONSTRAINT chk_attended CHECK (attended IN ('Y', 'N'))
+);
+
+CREATE INDEX idx_att_student ON ATTENDANCE (student_id);
+
+-- Registrations and attendance of past events, moved out of the live tables
+-- by archive.py. Rows keep their original IDs.
+CREATE TABLE REGISTRATIONS_ARCHIVE (
+    reg_id INTEGER CONSTRAINT pk_registrations_archive PRIMARY KEY,
+    event_id INTEGER NOT NULL,
+    student_id TEXT NOT NULL,
+    reg_date DATE,
+    status TEXT,
+    archived_date DATE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_reg_arch_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+    CONSTRAINT fk_reg_arch_students FOREIGN KEY (student_id) REFERENCES STUDENTS(student_id)
+);
+
+CREATE INDEX idx_reg_archive_event ON REGISTRATIONS_ARCHIVE (event_id);
+CREATE INDEX idx_reg_archive_student ON REGISTRATIONS_ARCHIVE (student_id);
+
+CREATE TABLE ATTENDANCE_ARCHIVE (
+    attendance_id INTEGER CONSTRAINT pk_attendance_archive PRIMARY KEY,
+    event_id INTEGER NOT NULL,
+    student_id TEXT NOT NULL,
+    attended TEXT NOT NULL,
+    archived_date DATE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT fk_att_arch_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+    CONSTRAINT fk_att_arch_students FOREIGN KEY (student_id) REFERENCES STUDENTS(student_id)
+);
+
+CREATE INDEX idx_att_archive_event ON ATTENDANCE_ARCHIVE (event_id);
+
+CREATE TABLE USERS (
+    user_id INTEGER CONSTRAINT pk_users PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL,
+    password TEXT NOT NULL,
+    role TEXT NOT NULL,
+    CONSTRAINT uk_username UNIQUE (username),
+    CONSTRAINT chk_role CHECK (role IN ('admin', 'volunteer'))
+);
+
+-- Email sends to an event's registered students (campaigns.py). sent and
+-- failed count the recorded deliveries, so a campaign's status is read from
+-- its own row.
+CREATE TABLE EMAIL_CAMPAIGNS (
+    campaign_id INTEGER CONSTRAINT pk_email_campaigns PRIMARY KEY AUTOINCREMENT,
+    event_id INTEGER NOT NULL,
+    subject TEXT NOT NULL,
+    body TEXT NOT NULL,
+    attach_invite TEXT DEFAULT 'N' NOT NULL,
+    agenda_name TEXT,
+    agenda_type TEXT,
+    agenda BLOB,
+    created_by TEXT,
+    created_date DATE DEFAULT CURRENT_TIMESTAMP,
+    recipients INTEGER DEFAULT 0 NOT NULL,
+    sent INTEGER DEFAULT 0 NOT NULL,
+    failed INTEGER DEFAULT 0 NOT NULL,
+    heartbeat DATE,
+    CONSTRAINT fk_campaign_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+    CONSTRAINT chk_campaign_invite CHECK (attach_invite IN ('Y', 'N'))
+);
+
+CREATE INDEX idx_campaigns_event ON EMAIL_CAMPAIGNS (event_id, campaign_id);
+
+-- One row per recipient of a campaign. student_id is deliberately not a
+-- foreign key: the record of a send outlives the student.
+CREATE TABLE EMAIL_DELIVERIES (
+    campaign_id INTEGER NOT NULL,
+    student_id TEXT NOT NULL,
+    email TEXT NOT NULL,
+    status TEXT DEFAULT 'PENDING' NOT NULL,
+    last_error TEXT,
+    updated_date DATE,
+    CONSTRAINT pk_email_deliveries PRIMARY KEY (campaign_id, student_id),
+    CONSTRAINT fk_delivery_campaigns FOREIGN KEY (campaign_id) REFERENCES EMAIL_CAMPAIGNS(campaign_id),
+    CONSTRAINT chk_delivery_status CHECK (status IN ('PENDING', 'SENT', 'FAILED'))
+);
+
+-- Serves the failed (or pending) recipients of a campaign, in student order.
+CREATE INDEX idx_deliveries_status ON EMAIL_DELIVERIES (campaign_id, status, student_id);
+
+-- Reminder campaigns sent (or skipped) per event and lead time, by the
+-- reminder scheduler (reminders.py). The key makes each one happen once.
+CREATE TABLE EVENT_REMINDERS (
+    event_id INTEGER NOT NULL,
+    minutes_before INTEGER NOT NULL,
+    campaign_id INTEGER,
+    created_date DATE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT pk_event_reminders PRIMARY KEY (event_id, minutes_before),
+    CONSTRAINT fk_reminder_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+    CONSTRAINT fk_reminder_campaigns FOREIGN KEY (campaign_id) REFERENCES EMAIL_CAMPAIGNS(campaign_id)
+);
+
+-- Leases electing the one process that runs a scheduler (reminders.py).
+CREATE TABLE SCHEDULER_LEASES (
+    name TEXT NOT NULL,
+    holder TEXT NOT NULL,
+    expires_at DATE NOT NULL,
+    CONSTRAINT pk_scheduler_leases PRIMARY KEY (name)
+);
+
+-- Addresses never to email, stored trimmed and lower-case: permanent
+-- bounces recorded by the sender, and addresses added by an admin.
+CREATE TABLE EMAIL_SUPPRESSION (
+    email TEXT NOT NULL,
+    reason TEXT,
+    created_date DATE DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT pk_email_suppression PRIMARY KEY (email)
+);
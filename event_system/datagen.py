@@ -0,0 +1,269 @@
+# datagen.py
+# Synthetic data generator for scale testing.
+#
+# Bulk-loads students, events, registrations and attendance at realistic
+# volumes and with realistic skew:
+#   - a few "hot" events take a large share of all registrations and are
+#     booked to capacity; the others follow a long-tailed popularity curve;
+#   - attendance is only recorded for past events, and depends on both the
+#     student (some students reliably show up, others rarely do) and the event.
+#
+# Everything is derived from --seed, so the same arguments always produce the
+# same rows and benchmark runs can be compared over time. Event dates are
+# offsets from --anchor-date (default: today); pass it explicitly for
+# byte-identical data on different days.
+#
+# Rows are inserted with array DML (executemany) in batches of --batch-size,
+# in primary-key order, committing after each batch, with the backend's bulk
+# insert hint (direct-path APPEND_VALUES on Oracle where allowed).
+#
+# Usage (from the project root):
+#   python -m event_system.datagen --students 200000 --events 5000 --registrations 5000000
+#   python -m event_system.datagen --students 2000 --events 50 --registrations 20000 --clear
+
+import argparse
+import datetime
+import random
+import time
+
+from . import db
+
+FIRST_NAMES = ("Aarav", "Aditi", "Arjun", "Diya", "Ishaan", "Kavya", "Meera", "Nikhil", "Priya", "Rahul",
+               "Riya", "Rohan", "Saanvi", "Sneha", "Tanvi", "Varun", "Vikram", "Zara", "Ananya", "Kabir")
+LAST_NAMES = ("Sharma", "Patel", "Iyer", "Reddy", "Nair", "Gupta", "Singh", "Menon", "Das", "Joshi",
+              "Kulkarni", "Rao", "Mehta", "Bose", "Chopra", "Pillai")
+COURSES = ("Computer Science", "Electronics", "Mechanical", "Civil", "Electrical", "Chemical",
+           "Biotechnology", "Mathematics", "Physics", "Business Administration")
+VENUES = ("Main Auditorium", "Seminar Hall A", "Seminar Hall B", "Open Air Theatre", "Library Hall",
+          "Sports Complex", "Lab Block 3", "Conference Room 1")
+EVENT_KINDS = ("Workshop", "Seminar", "Hackathon", "Guest Lecture", "Cultural Night", "Career Fair",
+               "Tech Talk", "Quiz", "Tournament", "Bootcamp")
+TIME_SLOTS = ("09:00 AM", "10:30 AM", "12:00 PM", "02:00 PM", "04:00 PM", "06:00 PM")
+
+TABLES = ("STUDENTS", "EVENTS", "REGISTRATIONS", "ATTENDANCE")
+
+
+class Plan:
+    """
+    The generated data set, described by its parameters. Row generators draw
+    from one seeded random stream per table, so each table's contents depend
+    only on the seed and the parameters, not on the order of loading.
+    """
+
+    def __init__(self, seed, students, events, registrations, hot_events, hot_share,
+                 attendance_rate, days_back, days_ahead, anchor_date, prefix):
+        self.seed = seed
+        self.students = students
+        self.events = events
+        self.registrations = registrations
+        self.hot_events = min(hot_events, events)
+        self.hot_share = hot_share
+        self.attendance_rate = attendance_rate
+        self.days_back = days_back
+        self.days_ahead = days_ahead
+        self.anchor_date = anchor_date
+        self.prefix = prefix
+        self._event_plan = None
+
+    def _rng(self, table):
+        return random.Random(f"{self.seed}:{table}")
+
+    def student_id(self, index):
+        return f"{self.prefix}{index:07d}"
+
+    def event_name(self, index):
+        return f"{self.prefix} {EVENT_KINDS[index % len(EVENT_KINDS)]} {index:05d}"
+
+    def student_rows(self):
+        rng = self._rng("students")
+        for i in range(self.students):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            yield (self.student_id(i), f"{first} {last}", f"{self.prefix.lower()}{i}@example.edu",
+                   rng.choice(COURSES), rng.randint(1, 4))
+
+    def event_plan(self):
+        """
+        Per event: (date, time, venue, registrations, total_slots, show_factor).
+        Hot events split hot_share of all registrations and are booked full;
+        the rest follow a log-normal popularity curve.
+        """
+        if self._event_plan is not None:
+            return self._event_plan
+        rng = self._rng("events")
+        hot = set(rng.sample(range(self.events), self.hot_events))
+        weights = [0.0 if i in hot else rng.lognormvariate(0, 1.2) for i in range(self.events)]
+        cold_total = sum(weights) or 1.0
+        hot_registrations = self.registrations * self.hot_share if hot else 0
+        cold_registrations = self.registrations - hot_registrations
+
+        plan = []
+        for i in range(self.events):
+            if i in hot:
+                count = hot_registrations / len(hot)
+            else:
+                count = cold_registrations * weights[i] / cold_total
+            count = min(int(round(count)), self.students)
+            if i in hot:
+                slots = max(count, 1)
+            else:
+                slots = count + rng.randint(5, max(10, count // 2))
+            date = self.anchor_date + datetime.timedelta(days=rng.randint(-self.days_back, self.days_ahead))
+            # Popular events see more no-shows; small ones are mostly committed attendees.
+            show_factor = rng.uniform(0.7, 0.9) if i in hot else rng.uniform(0.85, 1.15)
+            plan.append((date, rng.choice(TIME_SLOTS), rng.choice(VENUES), count, slots, show_factor))
+        self._event_plan = plan
+        return plan
+
+    def event_rows(self):
+        for i, (date, time_slot, venue, _, slots, _) in enumerate(self.event_plan()):
+            yield (self.event_name(i), date, time_slot, venue, slots)
+
+    def registration_rows(self, event_ids):
+        """(event_id, student_id, reg_date) for every event, in event order."""
+        rng = self._rng("registrations")
+        for i, (date, _, _, count, _, _) in enumerate(self.event_plan()):
+            event_id = event_ids[i]
+            event_start = datetime.datetime.combine(date, datetime.time(9))
+            for student in sorted(rng.sample(range(self.students), count)):
+                reg_date = event_start - datetime.timedelta(days=rng.randint(1, 45), seconds=rng.randint(0, 86399))
+                yield (event_id, self.student_id(student), reg_date)
+
+    def attendance_rows(self, event_ids):
+        """
+        (event_id, student_id, attended) for past events. Mirrors the
+        registration stream, so it must see the same random draws.
+        """
+        reliability_rng = self._rng("reliability")
+        # Per-student likelihood of turning up: most students usually come,
+        # a minority rarely does.
+        reliability = [reliability_rng.betavariate(5, 2) for _ in range(self.students)]
+        mean_reliability = 5 / 7
+        rng = self._rng("registrations")
+        decide = self._rng("attendance")
+        for i, (date, _, _, count, _, show_factor) in enumerate(self.event_plan()):
+            students = sorted(rng.sample(range(self.students), count))
+            for _ in students:
+                rng.randint(1, 45), rng.randint(0, 86399)  # keep in step with registration_rows
+            if date >= self.anchor_date:
+                continue
+            event_id = event_ids[i]
+            for student in students:
+                probability = self.attendance_rate * show_factor * reliability[student] / mean_reliability
+                if decide.random() < probability:
+                    yield (event_id, self.student_id(student), 'Y')
+                elif decide.random() < 0.1:
+                    # Volunteers sometimes record a no-show explicitly.
+                    yield (event_id, self.student_id(student), 'N')
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def load(conn, table, statement, rows, batch_size):
+    """Inserts `rows` with executemany in committed batches. Returns the row count."""
+    hint = db.backend.BULK_INSERT_HINT
+    statement = statement.replace("INSERT INTO", f"INSERT {hint} INTO", 1) if hint else statement
+    total = 0
+    start = time.perf_counter()
+    with db.cursor(conn) as cursor:
+        for batch in _batches(rows, batch_size):
+            cursor.executemany(statement, batch)
+            conn.commit()
+            total += len(batch)
+            elapsed = time.perf_counter() - start
+            print(f"\r{table}: {total:,} rows ({total / elapsed if elapsed else 0:,.0f} rows/s)", end="", flush=True)
+    print(f"\r{table}: {total:,} rows in {time.perf_counter() - start:.1f}s" + " " * 20)
+    return total
+
+
+def clear(conn, plan):
+    """Deletes rows previously generated with the same prefix."""
+    pattern = f"{plan.prefix}%"
+    with db.cursor(conn) as cursor:
+        cursor.execute("DELETE FROM ATTENDANCE_ARCHIVE WHERE student_id LIKE :pattern", {'pattern': pattern})
+        cursor.execute("DELETE FROM REGISTRATIONS_ARCHIVE WHERE student_id LIKE :pattern", {'pattern': pattern})
+        cursor.execute("DELETE FROM ATTENDANCE WHERE student_id LIKE :pattern", {'pattern': pattern})
+        cursor.execute("DELETE FROM REGISTRATIONS WHERE student_id LIKE :pattern", {'pattern': pattern})
+        generated_events = "SELECT event_id FROM EVENTS WHERE event_name LIKE :pattern"
+        cursor.execute(f"DELETE FROM EVENT_REMINDERS WHERE event_id IN ({generated_events})",
+                       {'pattern': f"{plan.prefix} %"})
+        cursor.execute("DELETE FROM EMAIL_DELIVERIES WHERE campaign_id IN "
+                       f"(SELECT campaign_id FROM EMAIL_CAMPAIGNS WHERE event_id IN ({generated_events}))",
+                       {'pattern': f"{plan.prefix} %"})
+        cursor.execute(f"DELETE FROM EMAIL_CAMPAIGNS WHERE event_id IN ({generated_events})",
+                       {'pattern': f"{plan.prefix} %"})
+        cursor.execute("DELETE FROM EVENTS WHERE event_name LIKE :pattern", {'pattern': f"{plan.prefix} %"})
+        cursor.execute("DELETE FROM STUDENTS WHERE student_id LIKE :pattern", {'pattern': pattern})
+    conn.commit()
+
+
+def event_ids_by_index(conn, plan):
+    """Maps generated event index -> event_id assigned by the database."""
+    with db.cursor(conn) as cursor:
+        cursor.execute("SELECT event_id, event_name FROM EVENTS WHERE event_name LIKE :pattern",
+                       {'pattern': f"{plan.prefix} %"})
+        by_name = {name: event_id for event_id, name in cursor.fetchall()}
+    return [by_name[plan.event_name(i)] for i in range(plan.events)]
+
+
+def generate(plan, batch_size=10000, clear_first=False):
+    """Loads the whole plan. Returns {table: rows inserted}."""
+    counts = {}
+    with db.get_connection() as conn:
+        if clear_first:
+            clear(conn, plan)
+        counts['STUDENTS'] = load(conn, 'STUDENTS', """
+            INSERT INTO STUDENTS (student_id, name, email, course, year)
+            VALUES (:1, :2, :3, :4, :5)""", plan.student_rows(), batch_size)
+        counts['EVENTS'] = load(conn, 'EVENTS', """
+            INSERT INTO EVENTS (event_name, event_date, event_time, venue, total_slots)
+            VALUES (:1, :2, :3, :4, :5)""", plan.event_rows(), batch_size)
+        event_ids = event_ids_by_index(conn, plan)
+        counts['REGISTRATIONS'] = load(conn, 'REGISTRATIONS', """
+            INSERT INTO REGISTRATIONS (event_id, student_id, reg_date)
+            VALUES (:1, :2, :3)""", plan.registration_rows(event_ids), batch_size)
+        counts['ATTENDANCE'] = load(conn, 'ATTENDANCE', """
+            INSERT INTO ATTENDANCE (event_id, student_id, attended)
+            VALUES (:1, :2, :3)""", plan.attendance_rows(event_ids), batch_size)
+        db.backend.gather_statistics(conn, TABLES)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bulk-load deterministic synthetic data for scale testing.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--students", type=int, default=200000)
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument("--registrations", type=int, default=5000000, help="approximate total")
+    parser.add_argument("--hot-events", type=int, default=10, help="events booked to capacity")
+    parser.add_argument("--hot-share", type=float, default=0.2, help="share of registrations for hot events")
+    parser.add_argument("--attendance-rate", type=float, default=0.7, help="average show-up rate")
+    parser.add_argument("--days-back", type=int, default=365, help="oldest event, days before the anchor date")
+    parser.add_argument("--days-ahead", type=int, default=90, help="latest event, days after the anchor date")
+    parser.add_argument("--anchor-date", type=datetime.date.fromisoformat, default=datetime.date.today())
+    parser.add_argument("--prefix", default="SYN", help="student ID / event name prefix of generated rows")
+    parser.add_argument("--batch-size", type=int, default=10000, help="rows per executemany and commit")
+    parser.add_argument("--clear", action="store_true", help="delete rows generated earlier with the same prefix")
+    args = parser.parse_args()
+
+    plan = Plan(args.seed, args.students, args.events, args.registrations, args.hot_events, args.hot_share,
+                args.attendance_rate, args.days_back, args.days_ahead, args.anchor_date, args.prefix)
+    print(f"Generating data set (seed {args.seed}, anchor date {args.anchor_date}, backend {db.backend.name})...")
+    start = time.perf_counter()
+    try:
+        counts = generate(plan, args.batch_size, args.clear)
+    finally:
+        db.close_pool()
+    print(f"Done in {time.perf_counter() - start:.1f}s: " + ", ".join(f"{t} {n:,}" for t, n in counts.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,31 +1,77 @@
 # db.py
-# Handles the connection to the Oracle database using a connection pool.
+# Handles the connection to the database using a connection pool.
+#
+# The storage engine is pluggable (DB_BACKEND in config.py): oracle_backend.py
+# or sqlite_backend.py provides the pool, the exception types and the few bits
+# of SQL that differ. Data-access modules only use this module, so they run
+# unchanged on either backend.
 
-import oracledb
+import importlib
+import os
 import threading
 from .config import DB_CONFIG
+from . import metrics
+from . import sqltrace
+
+BACKENDS = {
+    'oracle': 'oracle_backend',
+    'sqlite': 'sqlite_backend',
+}
+
+def _load_backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown DB_BACKEND '{name}'. Choose one of: {', '.join(BACKENDS)}.")
+    return importlib.import_module(f".{BACKENDS[name]}", __package__)
+
+# The active backend module, and its exception types for `except db.IntegrityError:`.
+backend = _load_backend(DB_CONFIG['backend'])
+DatabaseError = backend.DatabaseError
+IntegrityError = backend.IntegrityError
 
 # Global variable to hold the connection pool
 pool = None
+# PID of the process that created `pool`. A forked worker inherits the parent's
+# pool object, but the underlying sockets must not be shared between processes.
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+# Connection pool for the asyncio web tier (see async_web.py). It belongs to the
+# event loop that created it and is only used by the *_async read functions.
+async_pool = None
+
+def _pool_stats():
+    """Reports the pool's connection counts for the /metrics endpoint."""
+    current = pool
+    if current is None:
+        return None
+    return [
+        ({'state': 'busy'}, current.busy),
+        ({'state': 'open'}, current.opened),
+        ({'state': 'max'}, current.max),
+    ]
+
+metrics.REGISTRY.gauge(
+    "event_system_db_pool_connections",
+    "Connections in the database pool by state (busy, open, max).",
+    ("state",),
+    function=_pool_stats
+)
 
 def init_pool():
     """
     Initializes the connection pool.
     This should be called once when the application starts.
     """
-    global pool
+    global pool, _pool_pid
     try:
-        pool = oracledb.create_pool(
-            user=DB_CONFIG["user"],
-            password=DB_CONFIG["password"],
-            dsn=DB_CONFIG["dsn"],
-            min=2,  # Minimum number of connections in the pool
-            max=5,  # Maximum number of connections in the pool
-            increment=1  # How many connections to create when more are needed
-        )
-        print("Connection pool created successfully.")
-
-    except oracledb.DatabaseError as e:
+        with _pool_lock:
+            if pool is not None and _pool_pid == os.getpid():
+                return  # Another thread got here first
+            pool = backend.create_pool(DB_CONFIG, DB_CONFIG["pool_min"], DB_CONFIG["pool_max"])
+            _pool_pid = os.getpid()
+        print(f"Connection pool created successfully ({backend.name}, pid {_pool_pid}).")
+
+    except backend.DatabaseError as e:
         print(f"Error creating the connection pool: {e}")
         # The application should not proceed without a database connection
         raise
@@ -35,6 +81,12 @@ def get_connection():
     Acquires a connection from the pool.
     """
     global pool
+    if pool and _pool_pid != os.getpid():
+        # We are in a forked worker that inherited the parent's pool. Drop the
+        # reference without closing it (that would log out the parent's
+        # sessions) and build a pool of our own.
+        print("Discarding connection pool inherited from the parent process.")
+        pool = None
     if not pool:
         print("Pool is not initialized. Call init_pool() first.")
         # Depending on the app's design, you might want to auto-initialize here,
@@ -44,19 +96,123 @@ def get_connection():
     try:
         connection = pool.acquire()
         return connection
-    except oracledb.DatabaseError as e:
+    except backend.DatabaseError as e:
         print(f"Error acquiring connection from pool: {e}")
         return None
 
+def init_async_pool():
+    """
+    Initializes the asyncio connection pool. Must be called from the event
+    loop that will use it (async_web.py does this at ASGI startup).
+    """
+    global async_pool
+    try:
+        # One event loop can keep many queries in flight, hence the larger pool.
+        async_pool = backend.create_pool_async(DB_CONFIG, DB_CONFIG["pool_min"], DB_CONFIG["async_pool_max"])
+        print("Async connection pool created successfully.")
+    except backend.DatabaseError as e:
+        print(f"Error creating the async connection pool: {e}")
+        raise
+
+def get_async_connection():
+    """
+    Acquires a connection from the asyncio pool. Use it as
+    `async with db.get_async_connection() as conn:`.
+    """
+    if not async_pool:
+        init_async_pool()
+    return async_pool.acquire()
+
+async def close_async_pool():
+    """Closes the asyncio connection pool."""
+    global async_pool
+    if async_pool:
+        await async_pool.close(force=True)
+        print("Async connection pool closed.")
+    async_pool = None
+
+def cursor(connection):
+    """
+    Opens a cursor on `connection`. All data-access modules go through this so
+    that statements are timed when SQL tracing is enabled (see sqltrace.py).
+    """
+    raw_cursor = connection.cursor()
+    if sqltrace.enabled:
+        return sqltrace.TracedCursor(raw_cursor)
+    return raw_cursor
+
+def async_cursor(connection):
+    """Like cursor(), for a connection from the asyncio pool (get_async_connection())."""
+    raw_cursor = connection.cursor()
+    if sqltrace.enabled:
+        return sqltrace.AsyncTracedCursor(raw_cursor)
+    return raw_cursor
+
+def paginate(query, params=None, limit=None, offset=0):
+    """
+    Appends the backend's paging clause (OFFSET/FETCH on Oracle) to an ordered
+    query when `limit` is given. Returns the (query, params) pair to execute.
+    """
+    params = dict(params or {})
+    if limit is None:
+        return query, params
+    params['page_offset'] = max(int(offset or 0), 0)
+    params['page_limit'] = max(int(limit), 0)
+    return query + backend.PAGINATE_CLAUSE, params
+
+# Oracle allows at most 1000 expressions in an IN list.
+IN_LIST_CHUNK_SIZE = 500
+
+def chunked(values, size=IN_LIST_CHUNK_SIZE):
+    """Yields successive lists of at most `size` items from `values`."""
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+def bind_list(values, prefix="b"):
+    """
+    Builds the placeholder list for an IN clause.
+    Returns (":b0, :b1, ...", {'b0': ..., 'b1': ...}).
+    """
+    names = [f"{prefix}{i}" for i in range(len(values))]
+    return ", ".join(f":{name}" for name in names), dict(zip(names, values))
+
 def close_pool():
     """
     Closes the connection pool.
     This should be called when the application is shutting down.
     """
     global pool
-    if pool:
+    if pool and _pool_pid == os.getpid():
         # The busy_timeout forces connections to be returned to the pool,
         # which is useful if some threads failed to release their connections.
         pool.close(force=True)
         print("Connection pool closed.")
-        pool = None
+    pool = None
+
+def is_unique_violation(error, constraint, column):
+    """
+    True if `error` violated the unique constraint `constraint` on `column`
+    ("TABLE.column"). Oracle reports the constraint name, SQLite the column.
+    """
+    return backend.is_unique_violation(error, constraint, column)
+
+def insert_returning_id(cursor, statement, parameters, column):
+    """
+    Runs an INSERT into a table with a generated key and returns the key of
+    the new row (`column`, e.g. "campaign_id").
+    """
+    return backend.insert_returning_id(cursor, statement, parameters, column)
+
+def use_backend(name):
+    """
+    Switches this process to another backend (e.g. 'sqlite' for a benchmark).
+    Closes the current pools; the next get_connection() opens a new one.
+    """
+    global backend, DatabaseError, IntegrityError, async_pool
+    close_pool()
+    async_pool = None
+    DB_CONFIG['backend'] = name
+    backend = _load_backend(name)
+    DatabaseError = backend.DatabaseError
+    IntegrityError = backend.IntegrityError
@@ -0,0 +1,184 @@
+# email_builder.py
+# Builds the wire bytes of outgoing emails for bulk sends.
+#
+# A send to a whole event used to build a MIMEMultipart per recipient through
+# the email package: a tree of objects, each part encoded again and the whole
+# thing serialized by a generator. Every recipient of a send gets the same
+# attachments, though, and often the same body. MessageBuilder encodes the
+# parts a send shares once and reuses the bytes:
+#   - attachments (agendas, the calendar invite) are base64-encoded when the
+#     builder is created;
+#   - the body is encoded once for as long as it stays the same, so only
+#     personalized bodies are encoded per recipient;
+#   - per message, only the headers (To, Subject, Date, Message-ID) are new.
+#
+# Messages without attachments are a single text/plain part; with attachments
+# they are multipart/mixed with the text first. Bodies are 7bit when they are
+# ASCII with short lines, otherwise base64 UTF-8. The bytes use CRLF line
+# endings, as smtplib.sendmail() expects.
+
+import base64
+import datetime
+import email.utils
+import secrets
+from email.header import Header
+
+from .config import EMAIL_CONFIG
+from .events import start_datetime
+
+EVENT_HOURS = 2  # length of an event in calendar invites; events have no end time
+MAX_LINE = 998   # longest line SMTP allows
+
+
+class Attachment:
+    """A file to attach: its name, MIME type (e.g. "application/pdf") and content bytes."""
+
+    def __init__(self, filename, content_type, data):
+        self.filename = filename
+        self.content_type = content_type
+        self.data = data
+
+
+def calendar_invite(event_id, event):
+    """
+    Returns an .ics Attachment for an (event_name, event_date, event_time,
+    venue) row. Times are local ("floating"); an event_time that cannot be
+    read gives an all-day entry.
+    """
+    event_name, event_date, event_time, venue = event
+    sender = EMAIL_CONFIG['sender_email']
+    start = start_datetime(event_date, event_time)
+    if start is not None:
+        end = start + datetime.timedelta(hours=EVENT_HOURS)
+        when = [f"DTSTART:{start:%Y%m%dT%H%M%S}", f"DTEND:{end:%Y%m%dT%H%M%S}"]
+    else:
+        day = event_date.date() if isinstance(event_date, datetime.datetime) else event_date
+        when = [f"DTSTART;VALUE=DATE:{day:%Y%m%d}",
+                f"DTEND;VALUE=DATE:{day + datetime.timedelta(days=1):%Y%m%d}"]
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//Event Management System//EN",
+        "METHOD:PUBLISH",
+        "BEGIN:VEVENT",
+        f"UID:event-{event_id}@{_domain(sender)}",
+        f"DTSTAMP:{datetime.datetime.now(datetime.timezone.utc):%Y%m%dT%H%M%SZ}",
+        *when,
+        f"SUMMARY:{_ics_text(event_name)}",
+        f"LOCATION:{_ics_text(venue)}",
+        "END:VEVENT",
+        "END:VCALENDAR",
+    ]
+    data = "".join(_ics_fold(line) + "\r\n" for line in lines).encode('utf-8')
+    return Attachment("invite.ics", "text/calendar; charset=utf-8; method=PUBLISH", data)
+
+
+def _ics_text(value):
+    return str(value).replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+
+
+def _ics_fold(line):
+    """Folds a content line at 75 octets (RFC 5545), without splitting a UTF-8 character."""
+    data = line.encode('utf-8')
+    if len(data) <= 75:
+        return line
+    pieces = []
+    limit = 75
+    while len(data) > limit:
+        cut = limit
+        while cut and (data[cut] & 0xC0) == 0x80:
+            cut -= 1
+        pieces.append(data[:cut].decode('utf-8'))
+        data = data[cut:]
+        limit = 74  # continuation lines start with a space
+    pieces.append(data.decode('utf-8'))
+    return "\r\n ".join(pieces)
+
+
+def _domain(address):
+    return address.rpartition('@')[2] or 'localhost'
+
+
+def _header_value(value):
+    """
+    Encodes a header value (RFC 2047 when it is not ASCII); line breaks are
+    removed. Long encoded values are folded with CRLF, like the rest of the
+    message.
+    """
+    value = " ".join(str(value).splitlines())
+    try:
+        return value.encode('ascii')
+    except UnicodeEncodeError:
+        return Header(value, 'utf-8').encode(linesep='\r\n').encode('ascii')
+
+
+def _base64_lines(data):
+    return base64.encodebytes(data).replace(b"\n", b"\r\n")
+
+
+def _encode_text(body):
+    """Returns the encoded text/plain part: its headers and body."""
+    text = body.replace("\r\n", "\n").replace("\r", "\n")
+    try:
+        data = text.encode('ascii')
+    except UnicodeEncodeError:
+        data = None
+    if data is not None and all(len(line) <= MAX_LINE for line in data.split(b"\n")):
+        return (b'Content-Type: text/plain; charset="us-ascii"\r\n'
+                b"Content-Transfer-Encoding: 7bit\r\n\r\n" + data.replace(b"\n", b"\r\n") + b"\r\n")
+    return (b'Content-Type: text/plain; charset="utf-8"\r\n'
+            b"Content-Transfer-Encoding: base64\r\n\r\n" + _base64_lines(text.encode('utf-8')))
+
+
+def _encode_attachment(attachment):
+    filename = attachment.filename.replace("\\", "").replace('"', "")
+    try:
+        filename.encode('ascii')
+        disposition = f'attachment; filename="{filename}"'
+    except UnicodeEncodeError:
+        disposition = "attachment; filename*=" + email.utils.encode_rfc2231(filename, 'utf-8')
+    return (f"Content-Type: {attachment.content_type}\r\n"
+            f"Content-Transfer-Encoding: base64\r\n"
+            f"Content-Disposition: {disposition}\r\n\r\n").encode('ascii') + _base64_lines(attachment.data)
+
+
+class MessageBuilder:
+    """
+    Builds messages from one sender with the same attachments. Create one
+    per send and call build() for each recipient; it is not thread-safe.
+    """
+
+    def __init__(self, attachments=(), sender=None):
+        self.sender = sender or EMAIL_CONFIG['sender_email']
+        self._domain = _domain(self.sender)
+        self._from = b"From: " + _header_value(self.sender) + b"\r\n"
+        self._body = None
+        self._encoded_body = None
+        if attachments:
+            boundary = f"=_{secrets.token_hex(16)}"  # "=_" cannot occur in base64 parts
+            self._delimiter = f"--{boundary}\r\n".encode('ascii')
+            self._content_type = (b"MIME-Version: 1.0\r\n"
+                                  b'Content-Type: multipart/mixed; boundary="' + boundary.encode('ascii') + b'"\r\n\r\n')
+            self._shared = b"".join(b"\r\n" + self._delimiter + _encode_attachment(attachment)
+                                    for attachment in attachments) + f"\r\n--{boundary}--\r\n".encode('ascii')
+        else:
+            self._delimiter = None
+            self._content_type = b"MIME-Version: 1.0\r\n"
+            self._shared = b""
+
+    def build(self, to_email, subject, body):
+        """Returns the message for one recipient as bytes."""
+        if body is not self._body and body != self._body:
+            self._body = body
+            self._encoded_body = _encode_text(body)
+        headers = b"".join((
+            self._from,
+            b"To: " + _header_value(to_email) + b"\r\n",
+            b"Subject: " + _header_value(subject) + b"\r\n",
+            b"Date: " + email.utils.formatdate(localtime=True).encode('ascii') + b"\r\n",
+            b"Message-ID: " + email.utils.make_msgid(domain=self._domain).encode('ascii') + b"\r\n",
+            self._content_type,
+        ))
+        if self._delimiter is None:
+            return headers + self._encoded_body
+        return headers + self._delimiter + self._encoded_body + self._shared
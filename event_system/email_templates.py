@@ -0,0 +1,143 @@
+# email_templates.py
+# Personalized email text with merge fields.
+#
+# Templates are plain text with {{ field }} placeholders. The event fields
+# (event_name, event_date, event_time, venue) are filled in once, when a
+# template is compiled for an event. Rendering a recipient's copy then only
+# substitutes the recipient fields:
+#   name, first_name, student_id, email   from the recipient's STUDENTS row
+#   check_in_code                         the recipient's code for this event
+#
+# compile_template() turns the text into a single str.format() string with
+# the literal braces doubled, so render() is one format_map() call. Unknown
+# fields are reported once, when compiling, instead of once per recipient.
+#
+# Check-in codes are an HMAC of the event and student under CHECK_IN_SECRET
+# (default SECRET_KEY). Nothing is stored: verify_check_in_code() recomputes
+# the code, so a scanner can check a student in with the student ID and the
+# code from their email. Without a configured secret, codes are signed with a
+# random key made when this module is imported: they only verify in the same
+# process (and, under --serve, its workers), and not after a restart.
+
+import base64
+import hashlib
+import hmac
+import logging
+import re
+import secrets
+
+from .config import EMAIL_CONFIG
+
+EVENT_FIELDS = ('event_name', 'event_date', 'event_time', 'venue')
+RECIPIENT_FIELDS = ('name', 'first_name', 'student_id', 'email', 'check_in_code')
+MERGE_FIELDS = EVENT_FIELDS + RECIPIENT_FIELDS
+
+if EMAIL_CONFIG['check_in_secret']:
+    _check_in_key = EMAIL_CONFIG['check_in_secret'].encode()
+else:
+    _check_in_key = secrets.token_bytes(32)
+    logging.warning("Neither CHECK_IN_SECRET nor SECRET_KEY is set: check-in codes are signed with a random "
+                    "key and stop verifying when the application restarts.")
+
+_FIELD = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+# The standard event notification, before and after the custom message. The
+# custom message is template text as well, so it may use merge fields.
+NOTIFICATION_HEADER = """Dear {{ name }},
+
+This is a notification regarding the upcoming event: **{{ event_name }}**.
+
+Date: {{ event_date }}
+Time: {{ event_time }}
+Location: {{ venue }}"""
+
+NOTIFICATION_FOOTER = """Your check-in code: {{ check_in_code }}
+
+We look forward to seeing you there!
+
+Best regards,
+The Event Management Team"""
+
+
+class TemplateError(ValueError):
+    """A template uses a field that does not exist."""
+
+
+def notification_template(custom_message=""):
+    """Returns the standard notification template with `custom_message` in the middle."""
+    parts = (NOTIFICATION_HEADER, custom_message.strip(), NOTIFICATION_FOOTER)
+    return "\n\n".join(part for part in parts if part)
+
+
+def check_in_code(event_id, student_id):
+    """Returns the student's check-in code for the event, e.g. "K7QM-2XBD"."""
+    digest = hmac.new(_check_in_key, f"{event_id}:{student_id}".encode(), hashlib.sha256).digest()
+    code = base64.b32encode(digest[:5]).decode()
+    return f"{code[:4]}-{code[4:]}"
+
+
+def verify_check_in_code(event_id, student_id, code):
+    """True if `code` (case, spaces and dashes ignored) is the student's code for the event."""
+    normalized = re.sub(r"[\s-]", "", str(code or "")).upper()
+    return hmac.compare_digest(normalized, check_in_code(event_id, student_id).replace("-", ""))
+
+
+class CompiledTemplate:
+    """A template with its event fields filled in, ready to render per recipient."""
+
+    def __init__(self, event_id, format_string, fields):
+        self.event_id = event_id
+        self.fields = fields
+        self._format = format_string
+        self._needs_code = 'check_in_code' in fields
+
+    def render(self, student_id, name, email):
+        """Returns the text for one recipient."""
+        name = name or ''
+        values = {
+            'name': name,
+            'first_name': name.split(' ', 1)[0],
+            'student_id': student_id,
+            'email': email,
+        }
+        if self._needs_code:
+            values['check_in_code'] = check_in_code(self.event_id, student_id)
+        return self._format.format_map(values)
+
+
+def compile_template(text, event_id, event):
+    """
+    Compiles `text` for one event; `event` is an (event_name, event_date,
+    event_time, venue) row. Raises TemplateError for unknown fields.
+    """
+    event_name, event_date, event_time, venue = event
+    event_values = {
+        'event_name': event_name,
+        'event_date': event_date.strftime("%Y-%m-%d") if hasattr(event_date, 'strftime') else event_date,
+        'event_time': event_time,
+        'venue': venue,
+    }
+    parts = []
+    fields = set()
+    unknown = []
+    position = 0
+    for match in _FIELD.finditer(text):
+        parts.append(_escape(text[position:match.start()]))
+        field = match.group(1)
+        if field in event_values:
+            parts.append(_escape(str(event_values[field])))
+        elif field in RECIPIENT_FIELDS:
+            parts.append("{" + field + "}")
+            fields.add(field)
+        else:
+            unknown.append(field)
+        position = match.end()
+    parts.append(_escape(text[position:]))
+    if unknown:
+        raise TemplateError(f"Unknown merge field(s): {', '.join(sorted(set(unknown)))}. "
+                            f"Available: {', '.join(MERGE_FIELDS)}.")
+    return CompiledTemplate(event_id, "".join(parts), frozenset(fields))
+
+
+def _escape(text):
+    return text.replace("{", "{{").replace("}", "}}")
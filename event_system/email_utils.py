@@ -1,6 +1,4 @@
 import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import ssl
 import threading
 import logging
@@ -9,37 +7,133 @@ import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 from .config import EMAIL_CONFIG
+from . import metrics
+from . import email_templates
+from .email_builder import MessageBuilder
 
-def send_email(to_email, subject, body):
-    msg = MIMEMultipart()
-    msg['From'] = EMAIL_CONFIG["sender_email"]
-    msg['To'] = to_email
-    msg['Subject'] = subject
+# --- Metrics ---
+EMAILS_SENT = metrics.REGISTRY.counter("event_system_emails_sent_total", "Emails accepted by the SMTP server.")
+EMAILS_FAILED = metrics.REGISTRY.counter("event_system_emails_failed_total", "Emails that could not be sent.")
+EMAIL_QUEUE_DEPTH = metrics.REGISTRY.gauge(
+    "event_system_email_queue_depth",
+    "Emails handed to background senders that have not been attempted yet."
+)
 
-    msg.attach(MIMEText(body, 'plain'))
+def send_email(to_email, subject, body, attachments=()):
+    if _deliver(to_email, subject, body, attachments):
+        EMAILS_SENT.inc()
+        return True
+    EMAILS_FAILED.inc()
+    return False
 
+def _connect():
+    server = smtplib.SMTP(EMAIL_CONFIG["smtp_server"], EMAIL_CONFIG["smtp_port"])
     try:
-        # Create a default SSL context
-        context = ssl.create_default_context()
-        with smtplib.SMTP(EMAIL_CONFIG["smtp_server"], EMAIL_CONFIG["smtp_port"]) as server:
+        if EMAIL_CONFIG["smtp_starttls"]:
+            # Create a default SSL context
+            context = ssl.create_default_context()
             server.starttls(context=context)  # Secure the connection
+        if EMAIL_CONFIG["smtp_username"]:
             server.login(EMAIL_CONFIG["smtp_username"], EMAIL_CONFIG["smtp_password"])
-            server.send_message(msg)
-        logging.info(f"Email sent successfully to {to_email} for subject: {subject}")
-        return True
-    except smtplib.SMTPAuthenticationError as e:
+    except Exception:
+        server.close()
+        raise
+    return server
+
+def _log_failure(to_email, e):
+    if isinstance(e, smtplib.SMTPAuthenticationError):
         logging.error(f"Failed to send email to {to_email} - Authentication Error: {e}. Check SMTP username/password.")
-        return False
-    except smtplib.SMTPServerDisconnected as e:
+    elif isinstance(e, smtplib.SMTPServerDisconnected):
         logging.error(f"Failed to send email to {to_email} - Server Disconnected: {e}. Check SMTP server/port.")
-        return False
-    except smtplib.SMTPException as e:
+    elif isinstance(e, smtplib.SMTPException):
         logging.error(f"Failed to send email to {to_email} - SMTP Error: {e}")
-        return False
-    except Exception as e:
+    else:
         logging.error(f"Failed to send email to {to_email} - General Error: {e}", exc_info=True)
+
+def permanent_failure(error):
+    """
+    Returns the server's reply ("550 No such user") when `error` is a
+    permanent rejection of the recipient (a 5xx reply to RCPT TO), or None.
+    Other failures may succeed on a later attempt.
+    """
+    if not isinstance(error, smtplib.SMTPRecipientsRefused) or not error.recipients:
+        return None
+    replies = list(error.recipients.values())
+    if not all(code >= 500 for code, _ in replies):
+        return None
+    code, message = replies[0]
+    if isinstance(message, bytes):
+        message = message.decode('utf-8', 'replace')
+    return f"{code} {message}"
+
+def _deliver(to_email, subject, body, attachments=()):
+    builder = MessageBuilder(attachments)
+    try:
+        with _connect() as server:
+            server.sendmail(builder.sender, [to_email], builder.build(to_email, subject, body))
+        logging.info(f"Email sent successfully to {to_email} for subject: {subject}")
+        return True
+    except Exception as e:
+        _log_failure(to_email, e)
         return False
 
+def send_messages(builder, messages, on_result=None):
+    """
+    Sends (to_email, subject, body) messages built by `builder` (see
+    email_builder.py) over one SMTP connection. Each message is taken from
+    the iterable and built only when it is about to be sent. After a failed
+    message the connection is reopened for the next one.
+    `on_result(to_email, error)`, if given, is called after each attempt,
+    with error None when the message was sent.
+    Returns {'success_count': ..., 'fail_count': ...}.
+    """
+    success_count = 0
+    fail_count = 0
+    server = None
+    try:
+        for to_email, subject, body in messages:
+            try:
+                if server is None:
+                    server = _connect()
+                server.sendmail(builder.sender, [to_email], builder.build(to_email, subject, body))
+                logging.info(f"Email sent successfully to {to_email} for subject: {subject}")
+                EMAILS_SENT.inc()
+                success_count += 1
+                error = None
+            except Exception as e:
+                _log_failure(to_email, e)
+                EMAILS_FAILED.inc()
+                fail_count += 1
+                error = e
+                if not isinstance(e, smtplib.SMTPRecipientsRefused):
+                    server = _close(server)
+            if on_result:
+                on_result(to_email, error)
+            EMAIL_QUEUE_DEPTH.dec()
+    finally:
+        _close(server)
+    return {'success_count': success_count, 'fail_count': fail_count}
+
+def _close(server):
+    if server is not None:
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+    return None
+
+def personalized_messages(subject_template, body_template, recipients):
+    """
+    Yields (to_email, subject, body) for each (student_id, name, email) in
+    `recipients`, rendering compiled templates (see email_templates.py). Each
+    message is rendered as it is requested, so only the one being sent is in
+    memory however many recipients there are.
+    """
+    for student_id, name, email in recipients:
+        if not email:
+            continue
+        yield email, subject_template.render(student_id, name, email), body_template.render(student_id, name, email)
+
 def create_event_notification_email_body(event_name, event_date, event_time, event_location, custom_message=""):
     """
     Creates the body of an event notification email.
@@ -62,7 +156,7 @@ The Event Management Team
 """
     return body.strip() # Remove leading/trailing whitespace
 
-def send_emails_in_background(recipients, subject, body, completion_callback=None):
+def send_emails_in_background(recipients, subject, body, completion_callback=None, attachments=()):
     """
     Sends multiple emails in a separate thread to avoid blocking the main UI thread.
 
@@ -74,23 +168,64 @@ def send_emails_in_background(recipients, subject, body, completion_callback=Non
                                                    have been attempted to send.
                                                    It will receive a dictionary with
                                                    'success_count' and 'fail_count'.
+        attachments (list, optional): email_builder.Attachment objects sent with every email.
     """
+    # The body and attachments are encoded once for all recipients.
+    builder = MessageBuilder(attachments)
+
     def _send_emails_task():
-        success_count = 0
-        fail_count = 0
-        for recipient in recipients:
-            if send_email(recipient, subject, body):
-                success_count += 1
-            else:
-                fail_count += 1
+        counts = send_messages(builder, ((recipient, subject, body) for recipient in recipients))
         if completion_callback:
-            completion_callback({'success_count': success_count, 'fail_count': fail_count})
+            completion_callback(counts)
+
+    EMAIL_QUEUE_DEPTH.inc(len(recipients))
 
     # Start the email sending in a new thread
     thread = threading.Thread(target=_send_emails_task)
     thread.daemon = True # Allow the main program to exit even if thread is running
     thread.start()
 
+def send_personalized_emails_in_background(event_id, event, subject, body, recipients, completion_callback=None,
+                                           attachments=(), on_result=None, count=None):
+    """
+    Sends each recipient their own copy of an email in a separate thread.
+
+    Args:
+        event_id (int): The event the email is about.
+        event (tuple): (event_name, event_date, event_time, venue) of the event.
+        subject (str): Subject template; see email_templates.py for merge fields.
+        body (str): Body template.
+        recipients (iterable): (student_id, name, email) rows.
+        completion_callback (callable, optional): Called like the one of
+                                                   send_emails_in_background.
+        attachments (list, optional): email_builder.Attachment objects sent with every email.
+        on_result (callable, optional): Called after each message; see send_messages().
+        count (int, optional): The number of recipients, when `recipients` is
+                               an iterator to be read by the sender thread as
+                               it goes (e.g. rows streamed from the database).
+
+    The templates are compiled before the thread starts, so a template with an
+    unknown merge field raises email_templates.TemplateError here.
+    """
+    subject_template = email_templates.compile_template(subject, event_id, event)
+    body_template = email_templates.compile_template(body, event_id, event)
+    if count is None:
+        recipients = [recipient for recipient in recipients if recipient[2]]
+        count = len(recipients)
+    builder = MessageBuilder(attachments)
+
+    def _send_emails_task():
+        counts = send_messages(builder, personalized_messages(subject_template, body_template, recipients), on_result)
+        if completion_callback:
+            completion_callback(counts)
+
+    EMAIL_QUEUE_DEPTH.inc(count)
+
+    thread = threading.Thread(target=_send_emails_task)
+    thread.daemon = True
+    thread.start()
+    return count
+
 if __name__ == "__main__":
     # Example usage (for testing purposes)
     # Replace with actual recipient and SMTP details
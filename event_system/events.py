@@ -2,9 +2,42 @@
 # Handles event creation and listing.
 
 from . import db
+from . import metrics
 from . import auth
 import datetime
+import re
 
+# --- Event times ---
+# event_time is free text ("2:00 PM", "14:00", "After lunch"). Code that needs
+# the clock time (forecast slots, calendar invites, reminders) reads it here.
+
+_TIME = re.compile(r"^\s*(\d{1,2})(?:[:.](\d{2}))?\s*([AaPp])\.?\s*[Mm]?\.?\s*$|^\s*(\d{1,2})[:.](\d{2})\s*$")
+
+def time_slot(event_time):
+    """Normalizes a free-text event_time ("2:00 PM", "14:00") to "HH:MM"; other text is kept as is."""
+    text = (event_time or '').strip()
+    match = _TIME.match(text)
+    if not match:
+        return text
+    if match.group(1):
+        hour, minute = int(match.group(1)) % 12, int(match.group(2) or 0)
+        if match.group(3).upper() == 'P':
+            hour += 12
+    else:
+        hour, minute = int(match.group(4)), int(match.group(5))
+    if hour > 23 or minute > 59:
+        return text
+    return f"{hour:02d}:{minute:02d}"
+
+def start_datetime(event_date, event_time):
+    """Returns the start of an event as a datetime, or None when event_time is not a clock time."""
+    slot = time_slot(event_time)
+    if len(slot) != 5 or slot[2] != ':':
+        return None
+    day = event_date.date() if isinstance(event_date, datetime.datetime) else event_date
+    return datetime.datetime.combine(day, datetime.time(int(slot[:2]), int(slot[3:])))
+
+@metrics.track_query
 def create_event(event_name, event_date, event_time, venue, total_slots):
     """
     Creates a new event and saves it to the database.
@@ -22,7 +55,7 @@ def create_event(event_name, event_date, event_time, venue, total_slots):
 
     try:
         with db.get_connection() as conn:
-            with conn.cursor() as cursor:
+            with db.cursor(conn) as cursor:
                 query = """
                 INSERT INTO EVENTS (event_name, event_date, event_time, venue, total_slots)
                 VALUES (:event_name, :event_date, :event_time, :venue, :total_slots)
@@ -42,27 +75,45 @@ def create_event(event_name, event_date, event_time, venue, total_slots):
         # Rollback is handled by the connection pool/transaction manager if an error occurs
         return f"An unexpected error occurred: {e}"
 
-def get_all_events():
+ALL_EVENTS_QUERY = "SELECT event_id, event_name, event_date, event_time, venue, total_slots FROM EVENTS ORDER BY event_date DESC, event_id DESC"
+
+@metrics.track_query
+def get_all_events(limit=None, offset=0):
     """
-    Retrieves a list of all events from the database.
+    Retrieves a list of all events from the database, newest first.
+    Pass `limit`/`offset` to fetch a single page.
     """
     try:
         with db.get_connection() as conn:
-            with conn.cursor() as cursor:
-                query = "SELECT event_id, event_name, event_date, event_time, venue, total_slots FROM EVENTS ORDER BY event_date DESC"
-                cursor.execute(query)
+            with db.cursor(conn) as cursor:
+                cursor.execute(*db.paginate(ALL_EVENTS_QUERY, limit=limit, offset=offset))
                 return cursor.fetchall()
     except Exception as e:
         print(f"Error fetching events: {e}")
         return []
 
+@metrics.track_query
+async def get_all_events_async(limit=None, offset=0):
+    """
+    Async version of get_all_events() for the asyncio web tier.
+    """
+    try:
+        async with db.get_async_connection() as conn:
+            with db.async_cursor(conn) as cursor:
+                await cursor.execute(*db.paginate(ALL_EVENTS_QUERY, limit=limit, offset=offset))
+                return await cursor.fetchall()
+    except Exception as e:
+        print(f"Error fetching events: {e}")
+        return []
+
+@metrics.track_query
 def get_event_details(event_id):
     """
     Retrieves details for a single event from the database.
     """
     try:
         with db.get_connection() as conn:
-            with conn.cursor() as cursor:
+            with db.cursor(conn) as cursor:
                 query = "SELECT event_id, event_name, event_date, event_time, venue, total_slots FROM EVENTS WHERE event_id = :event_id"
                 cursor.execute(query, {'event_id': event_id})
                 return cursor.fetchone()
@@ -0,0 +1,307 @@
+# forecast.py
+# Attendance forecasting for capacity planning.
+#
+# Only a fraction of registrants turn up, so an event's total_slots can be
+# booked beyond its seats. This module fits show-up rates from past events and
+# recommends a registration limit for each upcoming one.
+#
+# Model: the chance that a registrant attends is
+#
+#     base_rate * venue_factor * slot_factor * course_factor
+#
+# where the time slot is the event_time normalized to 24-hour "HH:MM". The
+# factors are fitted by iterative proportional fitting: each pass rescales a
+# factor so the fitted attendance of its registrants matches the attendance
+# they actually had. A prior of PRIOR_WEIGHT attendees at factor 1 keeps
+# categories with little history close to the average. Events whose
+# attendance was never taken (no one attended) are left out of the fit.
+#
+# The database aggregates the history to one row per (event, course). The fit
+# and the per-event forecasts run on those rows as NumPy arrays: categories are
+# coded once, and every per-category or per-event sum is an np.bincount, so
+# the whole history fits in well under a second. The SQL aggregate is the slow part, and it is
+# cached the way analytics.py caches engagement: events settled more than
+# SETTLE_DAYS ago are aggregated once, the recent days on every refresh, and
+# everything again every FULL_REFRESH_SECONDS.
+#
+# Recommended limit: with N registrants who each attend with probability p,
+# attendance is about normal with mean N*p and variance N*p*(1-p). The limit
+# is the largest N whose attendance exceeds the seats with probability at most
+# OVERFLOW_RISK, capped at MAX_OVERBOOKING times the seats, and never below
+# the seats.
+#
+# NumPy is optional: without it the forecast reports an error and the rest of
+# the application works as before.
+
+import datetime
+import time
+from statistics import NormalDist
+
+from . import db
+from . import metrics
+from .analytics import BATCH_SIZE, FIRST_DATE, CachedSnapshot
+from .events import time_slot
+from .config import ANALYTICS_CONFIG, FORECAST_CONFIG
+
+PRIOR_WEIGHT = 50.0   # pseudo-attendees pulling each factor towards 1
+FIT_ITERATIONS = 20
+MIN_SHOW_RATE = 0.05  # keeps limits finite for categories that almost never attend
+FACTORS = ('venue', 'slot', 'course')
+
+# Registrations and attendance per (event, course) of the events dated in
+# [date_from, date_to). Archived events are aggregated against the archive
+# tables, which always hold an event's registrations and attendance together.
+HISTORY_QUERY = """
+SELECT e.event_id, e.venue, e.event_time, s.course, COUNT(*),
+       SUM(CASE WHEN a.attended = 'Y' THEN 1 ELSE 0 END)
+FROM EVENTS e
+JOIN REGISTRATIONS r ON r.event_id = e.event_id
+JOIN STUDENTS s ON s.student_id = r.student_id
+LEFT JOIN ATTENDANCE a ON a.event_id = r.event_id AND a.student_id = r.student_id
+WHERE e.event_date >= :date_from AND e.event_date < :date_to AND r.status = 'REGISTERED'
+GROUP BY e.event_id, e.venue, e.event_time, s.course
+UNION ALL
+SELECT e.event_id, e.venue, e.event_time, s.course, COUNT(*),
+       SUM(CASE WHEN a.attended = 'Y' THEN 1 ELSE 0 END)
+FROM EVENTS e
+JOIN REGISTRATIONS_ARCHIVE r ON r.event_id = e.event_id
+JOIN STUDENTS s ON s.student_id = r.student_id
+LEFT JOIN ATTENDANCE_ARCHIVE a ON a.event_id = r.event_id AND a.student_id = r.student_id
+WHERE e.event_date >= :date_from AND e.event_date < :date_to AND r.status = 'REGISTERED'
+GROUP BY e.event_id, e.venue, e.event_time, s.course
+"""
+
+# Upcoming events with their current registrations per course; events without
+# registrations come back once with a NULL course and a count of 0.
+UPCOMING_QUERY = """
+SELECT e.event_id, e.event_name, e.event_date, e.event_time, e.venue, e.total_slots, s.course,
+       COUNT(r.student_id)
+FROM EVENTS e
+LEFT JOIN REGISTRATIONS r ON r.event_id = e.event_id AND r.status = 'REGISTERED'
+LEFT JOIN STUDENTS s ON s.student_id = r.student_id
+WHERE e.event_date >= :today
+GROUP BY e.event_id, e.event_name, e.event_date, e.event_time, e.venue, e.total_slots, s.course
+ORDER BY e.event_date, e.event_id
+"""
+
+def _import_numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError("numpy is required for attendance forecasting (pip install numpy)")
+    return numpy
+
+
+def _encode(np, labels):
+    """Returns (sorted distinct labels, code of each label) without sorting every label."""
+    index = {}
+    codes = np.fromiter((index.setdefault(label, len(index)) for label in labels), dtype=np.int64, count=len(labels))
+    names = sorted(index)
+    recode = np.empty(len(names), dtype=np.int64)
+    recode[[index[name] for name in names]] = np.arange(len(names))
+    return np.array(names, dtype=object), recode[codes]
+
+
+class Forecast:
+    """
+    One refresh of the model: base_rate, the fitted `factors` per category,
+    and the per-event forecast `columns` for upcoming events.
+    """
+
+    COLUMNS = ('event_id', 'event_name', 'event_date', 'venue', 'slot', 'total_slots', 'registered',
+               'predicted_show_rate', 'expected_attendance', 'recommended_limit')
+
+    def __init__(self, base_rate, history_events, factors, columns, refreshed_at):
+        self.base_rate = base_rate
+        self.history_events = history_events
+        self.factors = factors
+        self.columns = columns
+        self.refreshed_at = refreshed_at
+        self.size = len(columns['event_id'])
+
+    def rows(self, limit=None, offset=0):
+        """Returns one tuple per upcoming event, in COLUMNS order."""
+        end = self.size if limit is None else offset + limit
+        return list(zip(*(self.columns[name][offset:end] for name in self.COLUMNS)))
+
+
+class Forecaster(CachedSnapshot):
+    """The show-rate model, refitted from cached history once per refresh."""
+
+    name = "forecast"
+
+    def __init__(self, settle_days, refresh_seconds, full_refresh_seconds, overflow_risk, max_overbooking):
+        super().__init__(refresh_seconds)
+        self.settle_days = settle_days
+        self.full_refresh_seconds = full_refresh_seconds
+        self.overflow_risk = overflow_risk
+        self.max_overbooking = max_overbooking
+        self._full_refreshed = None
+        self._settled = None  # history rows of events before _settled_before
+        self._settled_before = None
+
+    def _compute(self):
+        np = _import_numpy()
+        now = time.monotonic()
+        today = datetime.date.today()
+        settle_before = today - datetime.timedelta(days=self.settle_days)
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                if self._settled is None or now - self._full_refreshed >= self.full_refresh_seconds:
+                    self._settled = self._history(cursor, FIRST_DATE, settle_before)
+                    self._full_refreshed = now
+                elif settle_before > self._settled_before:
+                    self._settled.extend(self._history(cursor, self._settled_before, settle_before))
+                self._settled_before = settle_before
+                history = self._settled + self._history(cursor, settle_before, today)
+                cursor.execute(UPCOMING_QUERY, {'today': today})
+                upcoming = cursor.fetchall()
+        return self._fit(np, history, upcoming)
+
+    @staticmethod
+    def _history(cursor, date_from, date_to):
+        cursor.execute(HISTORY_QUERY, {'date_from': date_from, 'date_to': date_to})
+        rows = []
+        while True:
+            batch = cursor.fetchmany(BATCH_SIZE)
+            if not batch:
+                return rows
+            rows.extend(batch)
+
+    def _fit(self, np, history, upcoming):
+        # Category codes shared by the history rows and the upcoming rows;
+        # categories with no history keep a factor of 1.
+        n_history = len(history)
+        events = np.array([row[0] for row in history] + [row[0] for row in upcoming], dtype=np.int64)
+        slots = {}
+        for row in history:
+            slots.setdefault(row[2], None)
+        for row in upcoming:
+            slots.setdefault(row[3], None)
+        slots = {event_time: time_slot(event_time) for event_time in slots}
+        labels = {
+            'venue': [row[1] for row in history] + [row[4] for row in upcoming],
+            'slot': [slots[row[2]] for row in history] + [slots[row[3]] for row in upcoming],
+            'course': [row[3] or '' for row in history] + [row[6] or '' for row in upcoming],
+        }
+        names, codes = {}, {}
+        for factor in FACTORS:
+            names[factor], codes[factor] = _encode(np, labels[factor])
+        registered = np.array([row[4] for row in history], dtype=np.float64).reshape(-1)
+        attended = np.array([row[5] or 0 for row in history], dtype=np.float64).reshape(-1)
+
+        # Leave out events whose attendance was never taken.
+        history_events, event_codes = np.unique(events[:n_history], return_inverse=True)
+        taken = np.bincount(event_codes, weights=attended, minlength=len(history_events)) > 0
+        keep = taken[event_codes]
+        registered, attended = registered[keep], attended[keep]
+        history_codes = {factor: codes[factor][:n_history][keep] for factor in FACTORS}
+
+        total = registered.sum()
+        base_rate = attended.sum() / total if total else 1.0
+        fitted = {factor: np.ones(len(names[factor])) for factor in FACTORS}
+        observed = {factor: np.bincount(history_codes[factor], weights=attended, minlength=len(names[factor]))
+                    for factor in FACTORS}
+        for _ in range(FIT_ITERATIONS):
+            for factor in FACTORS:
+                predicted = registered * self._rate(np, base_rate, fitted, history_codes)
+                expected = np.bincount(history_codes[factor], weights=predicted, minlength=len(names[factor]))
+                fitted[factor] *= (observed[factor] + PRIOR_WEIGHT) / (expected + PRIOR_WEIGHT)
+
+        factors = {}
+        for factor in FACTORS:
+            counts = np.bincount(history_codes[factor], weights=registered, minlength=len(names[factor]))
+            # Averaged over the categories' own registrants, not the whole history.
+            rate = np.clip(base_rate * fitted[factor], 0.0, 1.0)
+            factors[factor] = {
+                factor: names[factor].tolist(),
+                'registrations': counts.astype(np.int64).tolist(),
+                'observed_show_rate': np.round(np.divide(observed[factor], counts, out=np.zeros_like(counts),
+                                                         where=counts > 0), 4).tolist(),
+                'factor': np.round(fitted[factor], 4).tolist(),
+                'no_show_rate': np.round(1.0 - rate, 4).tolist(),
+            }
+
+        columns = self._forecast_events(np, upcoming, slots, base_rate, fitted,
+                                        {factor: codes[factor][n_history:] for factor in FACTORS},
+                                        np.bincount(history_codes['course'], weights=registered,
+                                                    minlength=len(names['course'])))
+        return Forecast(round(float(base_rate), 4), int(taken.sum()), factors, columns, datetime.datetime.now())
+
+    @staticmethod
+    def _rate(np, base_rate, fitted, codes):
+        rate = base_rate
+        for factor in FACTORS:
+            rate = rate * fitted[factor][codes[factor]]
+        return np.clip(rate, MIN_SHOW_RATE, 1.0)
+
+    def _forecast_events(self, np, upcoming, slots, base_rate, fitted, codes, course_registrations):
+        columns = {name: [] for name in Forecast.COLUMNS}
+        if not upcoming:
+            return columns
+        event_ids, positions, event_codes = np.unique(np.array([row[0] for row in upcoming], dtype=np.int64),
+                                                      return_index=True, return_inverse=True)
+        # Keep the query's date order.
+        order = np.argsort(positions, kind='stable')
+        event_codes = event_codes.reshape(-1)
+        registered = np.array([row[7] for row in upcoming], dtype=np.float64)
+        rate = self._rate(np, base_rate, fitted, codes)
+        totals = np.bincount(event_codes, weights=registered, minlength=len(event_ids))
+        expected = np.bincount(event_codes, weights=registered * rate, minlength=len(event_ids))
+        # Events without registrants yet: the registration-weighted average course.
+        course_weights = course_registrations.sum()
+        average_course = ((fitted['course'] * course_registrations).sum() / course_weights) if course_weights else 1.0
+        empty_rate = np.clip(base_rate * fitted['venue'][codes['venue'][positions]]
+                             * fitted['slot'][codes['slot'][positions]] * average_course, MIN_SHOW_RATE, 1.0)
+        show_rate = np.where(totals > 0, np.divide(expected, totals, out=np.zeros_like(totals), where=totals > 0),
+                             empty_rate)
+
+        seats = np.array([upcoming[i][5] for i in positions], dtype=np.float64)
+        limits = self.recommended_limits(np, seats, show_rate)
+        first = [upcoming[i] for i in positions]
+        for i in order.tolist():
+            row = first[i]
+            columns['event_id'].append(row[0])
+            columns['event_name'].append(row[1])
+            columns['event_date'].append(row[2])
+            columns['venue'].append(row[4])
+            columns['slot'].append(slots[row[3]])
+            columns['total_slots'].append(row[5])
+            columns['registered'].append(int(totals[i]))
+            columns['predicted_show_rate'].append(round(float(show_rate[i]), 4))
+            columns['expected_attendance'].append(round(float(expected[i]), 1))
+            columns['recommended_limit'].append(int(limits[i]))
+        return columns
+
+    def recommended_limits(self, np, seats, show_rate):
+        """
+        The largest N per event with N*p + z*sqrt(N*p*(1-p)) <= seats, solved
+        as a quadratic in sqrt(N); z is the one-sided normal quantile of the
+        overflow risk.
+        """
+        z = NormalDist().inv_cdf(1.0 - self.overflow_risk)
+        p = show_rate
+        spread = z * np.sqrt(p * (1.0 - p))
+        root = (-spread + np.sqrt(spread * spread + 4.0 * p * seats)) / (2.0 * p)
+        limits = np.floor(root * root + 1e-9)
+        return np.clip(limits, seats, np.floor(seats * self.max_overbooking)).astype(np.int64)
+
+
+# The process-wide forecast cache.
+forecaster = Forecaster(
+    ANALYTICS_CONFIG['settle_days'],
+    FORECAST_CONFIG['refresh_seconds'],
+    ANALYTICS_CONFIG['full_refresh_seconds'],
+    FORECAST_CONFIG['overflow_risk'],
+    FORECAST_CONFIG['max_overbooking']
+)
+
+
+@metrics.track_query
+def get_forecast(refresh=False):
+    """Returns the current Forecast, or None if it could not be computed."""
+    try:
+        return forecaster.snapshot(refresh)
+    except Exception as e:
+        print(f"Error computing attendance forecast: {e}")
+        return None
@@ -1,5 +1,6 @@
 from flask_wtf import FlaskForm
-from wtforms import StringField, PasswordField, SubmitField, IntegerField, DateField, TimeField, SelectField
+from flask_wtf.file import FileField, FileSize
+from wtforms import StringField, PasswordField, SubmitField, IntegerField, DateField, TimeField, SelectField, BooleanField
 from wtforms.validators import DataRequired, EqualTo, Email, NumberRange, Optional
 from datetime import date
 
@@ -51,9 +52,15 @@ class EmailForm(FlaskForm):
     event_id = SelectField('Event', coerce=int, validators=[DataRequired()])
     subject = StringField('Subject', validators=[DataRequired()])
     body = StringField('Body', validators=[DataRequired()])
+    attach_invite = BooleanField('Attach calendar invite (.ics)')
+    agenda = FileField('Agenda (optional)', validators=[FileSize(max_size=10 * 1024 * 1024)])
     send_emails = SubmitField('Send Emails')
     send_test = SubmitField('Send Test Email')
 
     def __init__(self, *args, **kwargs):
         super(EmailForm, self).__init__(*args, **kwargs)
         self.event_id.choices = [(event[0], event[1]) for event in kwargs.get('events', [])]
+
+class ResendCampaignForm(FlaskForm):
+    campaign_id = IntegerField('Campaign ID', validators=[DataRequired()])
+    submit = SubmitField('Resend to Failed')
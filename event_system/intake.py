@@ -0,0 +1,191 @@
+# intake.py
+# Admission control for registrations when a popular event opens.
+#
+# Every registration locks its event row (SELECT ... FOR UPDATE), so a crowd
+# registering for the same event at once queues up inside the database, each
+# request holding a pooled connection while it waits. A handful of such
+# requests is enough to take every connection and stall unrelated pages.
+#
+# register() sends a request straight to registrations.register_student_for_event()
+# while its event is quiet. Once an event has HOT_THRESHOLD registrations in
+# flight, further requests for it join that event's in-process queue instead.
+# A small, fixed set of intake workers drains the queues: each takes up to
+# BATCH_SIZE requests for one event and registers them with
+# register_students_for_event(), i.e. one row lock and one commit per batch.
+# Events with queued requests take turns, so one hot event cannot starve
+# another, and intake never holds more than `workers` connections.
+#
+# Queues are per process. With several --serve workers, each process admits
+# its own share of the crowd; the row lock still keeps capacity exact.
+
+import collections
+import os
+import threading
+
+from . import metrics
+from . import registrations
+from .config import INTAKE_CONFIG
+
+QUEUE_FULL_MESSAGE = "Error: Too many registration requests for this event right now. Please try again shortly."
+# Seconds a client turned away with QUEUE_FULL_MESSAGE is asked to wait (the
+# API's Retry-After header).
+QUEUE_FULL_RETRY_SECONDS = 5
+
+INTAKE_QUEUED = metrics.REGISTRY.counter(
+    "event_system_intake_queued_total",
+    "Registration requests that were queued because their event was busy."
+)
+INTAKE_REJECTED = metrics.REGISTRY.counter(
+    "event_system_intake_rejected_total",
+    "Registration requests turned away because their event's queue was full."
+)
+INTAKE_BATCH_SIZE = metrics.REGISTRY.histogram(
+    "event_system_intake_batch_size",
+    "Queued registrations committed together in one transaction.",
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250)
+)
+
+
+class Ticket:
+    """A queued registration; `position` is its place in the event's queue (1 = next)."""
+
+    def __init__(self, event_id, student_id, position):
+        self.event_id = event_id
+        self.student_id = student_id
+        self.position = position
+        self.message = None
+        self._done = threading.Event()
+
+    def resolve(self, message):
+        self.message = message
+        self._done.set()
+
+    def wait(self, timeout=None):
+        """Returns the registration message, or None if still queued after `timeout`."""
+        self._done.wait(timeout)
+        return self.message
+
+
+class Intake:
+    """Per-event registration queues drained in batches by a fixed set of workers."""
+
+    def __init__(self, workers, batch_size, hot_threshold, max_pending):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.hot_threshold = hot_threshold
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        self._in_flight = collections.Counter()  # direct registrations per event
+        self._pending = {}                       # event_id -> deque of Tickets
+        self._turns = collections.deque()        # events with pending tickets, in turn order
+        self._pid = None
+
+    def register(self, event_id, student_id, timeout=None):
+        """
+        Registers a student, queuing the request if the event is busy.
+
+        Returns:
+            tuple: (message, position). `position` is None when the request
+                   was not queued. If the request is still queued after
+                   `timeout` seconds, the message says so; it will still be
+                   processed.
+        """
+        with self._lock:
+            pending = self._pending.get(event_id)
+            if pending is None and self._in_flight[event_id] < self.hot_threshold:
+                self._in_flight[event_id] += 1
+                ticket = None
+            else:
+                ticket = self._enqueue(event_id, student_id)
+                if ticket is None:
+                    INTAKE_REJECTED.inc()
+                    return QUEUE_FULL_MESSAGE, None
+
+        if ticket is None:
+            try:
+                return registrations.register_student_for_event(event_id, student_id), None
+            finally:
+                with self._lock:
+                    self._in_flight[event_id] -= 1
+                    if not self._in_flight[event_id]:
+                        del self._in_flight[event_id]
+
+        INTAKE_QUEUED.inc()
+        message = ticket.wait(timeout)
+        if message is None:
+            message = f"Info: Registration request is queued (position {ticket.position}). Check the roster shortly."
+        return message, ticket.position
+
+    def _enqueue(self, event_id, student_id):
+        # Called with the lock held.
+        self._start_workers()
+        pending = self._pending.get(event_id)
+        if pending is None:
+            pending = self._pending[event_id] = collections.deque()
+            self._turns.append(event_id)
+            self._ready.notify()
+        elif len(pending) >= self.max_pending:
+            return None
+        ticket = Ticket(event_id, student_id, len(pending) + 1)
+        pending.append(ticket)
+        return ticket
+
+    def _start_workers(self):
+        # Threads do not survive a fork, so pre-fork workers start their own.
+        pid = os.getpid()
+        if self._pid == pid:
+            return
+        self._pid = pid
+        for number in range(self.workers):
+            threading.Thread(target=self._work, name=f"registration-intake-{number}", daemon=True).start()
+
+    def _take_batch(self):
+        with self._lock:
+            while not self._turns:
+                self._ready.wait()
+            event_id = self._turns.popleft()
+            pending = self._pending[event_id]
+            batch = [pending.popleft() for _ in range(min(self.batch_size, len(pending)))]
+            if pending:
+                self._turns.append(event_id)
+                self._ready.notify()
+            else:
+                # Later requests for this event go straight through again.
+                del self._pending[event_id]
+            return event_id, batch
+
+    def _work(self):
+        while True:
+            event_id, batch = self._take_batch()
+            INTAKE_BATCH_SIZE.observe(len(batch))
+            try:
+                results = registrations.register_students_for_event(event_id, [t.student_id for t in batch])
+            except Exception as e:
+                results = [(t.student_id, f"An unexpected error occurred: {e}") for t in batch]
+            for ticket, (_, message) in zip(batch, results):
+                ticket.resolve(message)
+
+    def queued(self):
+        with self._lock:
+            return sum(len(pending) for pending in self._pending.values())
+
+
+# The process-wide intake.
+intake = Intake(
+    INTAKE_CONFIG['workers'],
+    INTAKE_CONFIG['batch_size'],
+    INTAKE_CONFIG['hot_threshold'],
+    INTAKE_CONFIG['max_pending']
+)
+
+metrics.REGISTRY.gauge(
+    "event_system_intake_queue_depth",
+    "Registration requests waiting in the intake queues of this process.",
+    function=intake.queued
+)
+
+
+def register(event_id, student_id):
+    """Registers a student through the process-wide intake; returns (message, position)."""
+    return intake.register(event_id, student_id, INTAKE_CONFIG['wait_seconds'])
@@ -0,0 +1,193 @@
+# live.py
+# In-process fan-out of registration and attendance changes, streamed to
+# browsers as Server-Sent Events.
+#
+# The data-access functions call publish() right after they commit, passing
+# the change they just made. One Publisher holds the subscriber queues for each
+# event and copies every change into them, so the database does the same work
+# whether one coordinator or fifty are watching a roster.
+#
+# Changes are only seen by subscribers in the same process, so with several
+# --serve workers a viewer would miss the changes committed by the others.
+# serve.py calls configure() before forking: live streams are then turned off
+# (the stream route answers 204, which tells EventSource not to reconnect, and
+# pages keep their server-rendered data). With a single worker each stream
+# holds one of its request threads for up to MAX_STREAM_SECONDS, so at most
+# half of the threads serve streams; further viewers are told to retry later.
+
+import collections
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+
+from . import metrics
+
+HISTORY_SIZE = 256      # recent changes kept per event for Last-Event-ID resume
+QUEUE_SIZE = 1024       # changes buffered per subscriber before it must resync
+HEARTBEAT_SECONDS = 15  # keeps proxies from closing idle streams
+MAX_STREAM_SECONDS = 300  # streams end periodically; EventSource reconnects on its own
+BUSY_RETRY_MS = 30000   # reconnect delay given to viewers over the stream limit
+
+# Set by configure(); the development server streams without a limit.
+enabled = True
+max_streams = None
+
+
+class Subscription:
+    """A single subscriber's queue of (sequence, kind, data) messages."""
+
+    def __init__(self, event_id):
+        self.event_id = event_id
+        self.queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.overflowed = False
+
+    def put(self, message):
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            # A stalled client must never block the publisher; it is told to
+            # reload instead.
+            self.overflowed = True
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class Publisher:
+    """Fans out per-event changes to every subscriber of that event."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = collections.defaultdict(set)
+        self._history = {}
+        self._sequence = itertools.count(1)
+
+    def publish(self, event_id, kind, data):
+        with self._lock:
+            message = (next(self._sequence), kind, data)
+            history = self._history.get(event_id)
+            if history is None:
+                history = self._history[event_id] = collections.deque(maxlen=HISTORY_SIZE)
+            history.append(message)
+            subscribers = list(self._subscribers.get(event_id, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+
+    def subscribe(self, event_id, last_sequence=None, limit=None):
+        """
+        Registers a subscriber. With `last_sequence` (from the Last-Event-ID
+        header), changes the client missed while reconnecting are replayed
+        first; if some of them have already left the history, the
+        subscription starts out asking the client to resync. Returns None if
+        `limit` subscribers are already registered.
+        """
+        subscription = Subscription(event_id)
+        with self._lock:
+            if limit is not None and sum(len(s) for s in self._subscribers.values()) >= limit:
+                return None
+            if last_sequence is not None:
+                history = self._history.get(event_id, ())
+                if last_sequence < 0 or (len(history) == HISTORY_SIZE and history[0][0] > last_sequence):
+                    subscription.overflowed = True
+                for message in history:
+                    if message[0] > last_sequence:
+                        subscription.put(message)
+            self._subscribers[event_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.event_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.event_id]
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(subscribers) for subscribers in self._subscribers.values())
+
+
+# The process-wide publisher.
+publisher = Publisher()
+
+metrics.REGISTRY.gauge(
+    "event_system_live_subscribers",
+    "Open Server-Sent Event streams in this process.",
+    function=publisher.subscriber_count
+)
+
+def configure(workers, threads):
+    """
+    Sets up live streams for a server with `workers` processes of `threads`
+    request threads each (see the top of this module).
+    """
+    global enabled, max_streams
+    enabled = workers == 1
+    max_streams = max(threads // 2, 1)
+
+
+# Event IDs sent to clients are "<epoch>.<sequence>". The epoch changes with
+# every process, so a client reconnecting to a restarted (or different) worker
+# is asked to resync instead of silently missing changes. It is derived lazily
+# because pre-fork workers import this module in the parent process.
+_epoch = (None, None)
+
+
+def epoch():
+    global _epoch
+    pid = os.getpid()
+    if _epoch[0] != pid:
+        _epoch = (pid, f"{pid:x}{time.time_ns():x}")
+    return _epoch[1]
+
+
+def parse_last_event_id(value):
+    """
+    Returns the sequence number from a Last-Event-ID header, None when there
+    is no header, or -1 when it came from another process.
+    """
+    if not value:
+        return None
+    epoch_id, _, sequence = value.partition('.')
+    if epoch_id != epoch() or not sequence.isdigit():
+        return -1
+    return int(sequence)
+
+
+def publish(event_id, kind, **data):
+    """Publishes a change for `event_id`. Never raises into the caller."""
+    try:
+        publisher.publish(int(event_id), kind, data)
+    except Exception as e:
+        print(f"Error publishing live update for event {event_id}: {e}")
+
+
+def busy():
+    """An SSE body that asks the client to reconnect after BUSY_RETRY_MS and ends."""
+    yield f"retry: {BUSY_RETRY_MS}\n\n"
+
+
+def stream(subscription, max_seconds=MAX_STREAM_SECONDS):
+    """Yields Server-Sent Events for a subscription until it times out."""
+    deadline = time.monotonic() + max_seconds
+    try:
+        yield "retry: 2000\n\n"
+        while time.monotonic() < deadline:
+            if subscription.overflowed:
+                yield "event: resync\ndata: {}\n\n"
+                return
+            message = subscription.get(timeout=HEARTBEAT_SECONDS)
+            if message is None:
+                yield ": heartbeat\n\n"
+                continue
+            sequence, kind, data = message
+            yield f"id: {epoch()}.{sequence}\nevent: {kind}\ndata: {json.dumps(data, default=str)}\n\n"
+    finally:
+        publisher.unsubscribe(subscription)
@@ -0,0 +1,313 @@
+# metrics.py
+# Lightweight in-process metrics with Prometheus text exposition.
+#
+# Counters, gauges and histograms keep one shard per thread, so the hot path
+# (an increment or an observation) only touches a dictionary owned by the
+# calling thread and never takes a lock. Shards are merged when /metrics is
+# scraped. Shards left behind by finished threads are folded into a single
+# "retired" shard at scrape time so short-lived request threads do not leak.
+
+import bisect
+import functools
+import inspect
+import threading
+import time
+
+# Default latency buckets (seconds), suitable for both HTTP requests and queries.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _ShardedMetric:
+    """
+    Base class holding per-thread shards. Each shard maps a label-value tuple
+    to the metric's per-thread state.
+    """
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        self._shards = []  # list of (thread, shard dict)
+        self._retired = {}
+        self._shards_lock = threading.Lock()  # only taken on first use per thread and on scrape
+
+    def _key(self, labels):
+        if not self.labelnames:
+            return ()
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = {}
+            with self._shards_lock:
+                self._shards.append((threading.current_thread(), shard))
+            self._local.shard = shard
+        return shard
+
+    def _merge_into(self, target, key, state):
+        raise NotImplementedError
+
+    def _collect_states(self):
+        """Returns a merged {labels: state} mapping across all shards."""
+        with self._shards_lock:
+            live = []
+            for thread, shard in self._shards:
+                if thread.is_alive():
+                    live.append((thread, shard))
+                else:
+                    # A finished thread can no longer write to its shard.
+                    for key, state in shard.items():
+                        self._merge_into(self._retired, key, state)
+            self._shards = live
+            merged = {}
+            for key, state in self._retired.items():
+                self._merge_into(merged, key, state)
+            for _, shard in live:
+                for key, state in list(shard.items()):
+                    self._merge_into(merged, key, state)
+        return merged
+
+    def samples(self):
+        raise NotImplementedError
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        for suffix, labelvalues, extra, value in self.samples():
+            labels = _format_labels(self.labelnames, labelvalues, extra)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(_ShardedMetric):
+    """A monotonically increasing counter."""
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def _merge_into(self, target, key, state):
+        target[key] = target.get(key, 0) + state
+
+    def value(self, **labels):
+        return self._collect_states().get(self._key(labels), 0)
+
+    def samples(self):
+        for key, value in sorted(self._collect_states().items()):
+            yield "", key, None, value
+
+
+class Gauge(_ShardedMetric):
+    """
+    A value that can go up and down. Gauges are either maintained with
+    inc()/dec() (summed across threads) or read from a callback at scrape time.
+    """
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), function=None):
+        super().__init__(name, documentation, labelnames)
+        self._function = function
+
+    def set_function(self, function):
+        """
+        Reads the gauge from `function` at scrape time. The function returns
+        either a single number or an iterable of (labels dict, value) pairs.
+        """
+        self._function = function
+
+    def inc(self, amount=1, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def _merge_into(self, target, key, state):
+        target[key] = target.get(key, 0) + state
+
+    def value(self, **labels):
+        return self._collect_states().get(self._key(labels), 0)
+
+    def samples(self):
+        if self._function is None:
+            for key, value in sorted(self._collect_states().items()):
+                yield "", key, None, value
+            return
+        try:
+            result = self._function()
+        except Exception:
+            return  # A failing callback must never break the whole scrape
+        if result is None:
+            return
+        if isinstance(result, (int, float)):
+            yield "", (), None, result
+            return
+        for labels, value in result:
+            yield "", self._key(labels), None, value
+
+
+class Histogram(_ShardedMetric):
+    """A histogram of observed values with fixed upper bounds."""
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        shard = self._shard()
+        key = self._key(labels)
+        state = shard.get(key)
+        if state is None:
+            # Per-bucket (non-cumulative) counts, then +Inf, then sum and count.
+            state = shard[key] = [0] * (len(self.buckets) + 3)
+        state[bisect.bisect_left(self.buckets, value)] += 1
+        state[-2] += value
+        state[-1] += 1
+
+    def _merge_into(self, target, key, state):
+        existing = target.get(key)
+        if existing is None:
+            target[key] = list(state)
+        else:
+            for i, count in enumerate(state):
+                existing[i] += count
+
+    def samples(self):
+        bounds = self.buckets + (float('inf'),)
+        for key, state in sorted(self._collect_states().items()):
+            cumulative = 0
+            for bound, count in zip(bounds, state):
+                cumulative += count
+                yield "_bucket", key, f'le="{_format_value(float(bound))}"', cumulative
+            yield "_sum", key, None, state[-2]
+            yield "_count", key, None, state[-1]
+
+
+class Registry:
+    """A collection of metrics rendered together on /metrics."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=(), function=None):
+        return self._register(Gauge(name, documentation, labelnames, function))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name):
+        return self._metrics.get(name)
+
+    def expose(self):
+        """Renders every registered metric in the Prometheus text format (0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
+
+
+# The process-wide registry used by the application.
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# --- Shared application metrics ---
+QUERY_DURATION = REGISTRY.histogram(
+    "event_system_db_query_duration_seconds",
+    "Time spent in data-access functions, including connection acquisition.",
+    ("query",)
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    "event_system_cache_requests_total",
+    "Cache lookups by cache name and result (hit or miss).",
+    ("cache", "result")
+)
+
+
+def _cache_hit_ratios():
+    totals = {}
+    for (cache, result), count in CACHE_REQUESTS._collect_states().items():
+        hits, lookups = totals.get(cache, (0, 0))
+        totals[cache] = (hits + (count if result == "hit" else 0), lookups + count)
+    return [({'cache': cache}, hits / lookups) for cache, (hits, lookups) in sorted(totals.items()) if lookups]
+
+
+REGISTRY.gauge(
+    "event_system_cache_hit_ratio",
+    "Fraction of cache lookups served from the cache since process start.",
+    ("cache",),
+    function=_cache_hit_ratios
+)
+
+
+def record_cache(cache_name, hit):
+    """Records a single cache lookup for the hit-ratio metrics."""
+    CACHE_REQUESTS.inc(cache=cache_name, result="hit" if hit else "miss")
+
+
+def track_query(func):
+    """
+    Decorator that times a data-access function and records it under
+    `<module>.<function>` in the query duration histogram.
+    """
+    label = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                QUERY_DURATION.observe(time.perf_counter() - start, query=label)
+
+        return async_wrapper
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            QUERY_DURATION.observe(time.perf_counter() - start, query=label)
+
+    return wrapper
@@ -0,0 +1,424 @@
+# migrations.py
+# Versioned schema changes for existing databases.
+#
+# database_setup.sql (and its SQLite twin) always describe the current schema,
+# but running them drops every table. Databases that already hold data are
+# brought up to date here instead: each Migration has a version number and a
+# list of operations, and SCHEMA_MIGRATIONS records the versions applied.
+# Operations check the catalog before changing anything, so a migration can be
+# re-run safely (after a failure half-way, or on a database created from a
+# newer schema script, where every operation is already in place). apply()
+# returns True if it changed the schema, False if the change was already in
+# place and None if the backend cannot make it.
+#
+# Usage:
+#   python -m event_system.migrations            # apply pending migrations
+#   python -m event_system.migrations --status   # list applied and pending versions
+#   python -m event_system.migrations --dry-run  # show what would be applied
+#
+# To change the schema, update both schema scripts and append a Migration
+# with the next version number; never edit one that has been released.
+
+import argparse
+
+from . import db
+
+HISTORY_TABLE = {
+    'oracle': """
+    CREATE TABLE SCHEMA_MIGRATIONS (
+        version NUMBER NOT NULL,
+        description VARCHAR2(255) NOT NULL,
+        applied_on DATE DEFAULT SYSDATE,
+        CONSTRAINT pk_schema_migrations PRIMARY KEY (version)
+    )""",
+    'sqlite': """
+    CREATE TABLE SCHEMA_MIGRATIONS (
+        version INTEGER CONSTRAINT pk_schema_migrations PRIMARY KEY,
+        description TEXT NOT NULL,
+        applied_on DATE DEFAULT CURRENT_TIMESTAMP
+    )""",
+}
+
+
+class CreateTable:
+    """Creates a table from per-backend DDL unless it exists."""
+
+    def __init__(self, name, ddl):
+        self.name = name
+        self.ddl = ddl
+
+    def describe(self):
+        return f"create table {self.name}"
+
+    def apply(self, cursor):
+        if db.backend.object_exists(cursor, 'table', self.name):
+            return False
+        cursor.execute(self.ddl[db.backend.name])
+        return True
+
+
+class CreateIndex:
+    """Creates an index unless one with the same name exists."""
+
+    def __init__(self, name, table, columns):
+        self.name = name
+        self.table = table
+        self.columns = columns
+
+    def describe(self):
+        return f"create index {self.name} on {self.table} ({', '.join(self.columns)})"
+
+    def apply(self, cursor):
+        if db.backend.object_exists(cursor, 'index', self.name):
+            return False
+        cursor.execute(f"CREATE INDEX {self.name} ON {self.table} ({', '.join(self.columns)})")
+        return True
+
+
+class CreateSequence:
+    """Creates a sequence unless it exists (skipped where keys are AUTOINCREMENT)."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def describe(self):
+        return f"create sequence {self.name}"
+
+    def apply(self, cursor):
+        if not db.backend.USES_SEQUENCES:
+            return None
+        if db.backend.object_exists(cursor, 'sequence', self.name):
+            return False
+        cursor.execute(f"CREATE SEQUENCE {self.name} START WITH 1 INCREMENT BY 1")
+        return True
+
+
+class AddConstraint:
+    """Adds a constraint to an existing table (skipped where the backend cannot)."""
+
+    def __init__(self, table, name, definition):
+        self.table = table
+        self.name = name
+        self.definition = definition
+
+    def describe(self):
+        return f"add constraint {self.name} to {self.table}"
+
+    def apply(self, cursor):
+        if not db.backend.SUPPORTS_ADD_CONSTRAINT:
+            return None
+        if db.backend.object_exists(cursor, 'constraint', self.name):
+            return False
+        cursor.execute(f"ALTER TABLE {self.table} ADD CONSTRAINT {self.name} {self.definition}")
+        return True
+
+
+class AddColumn:
+    """Adds a nullable column to an existing table unless it exists."""
+
+    def __init__(self, table, column, types):
+        self.table = table
+        self.column = column
+        self.types = types
+
+    def describe(self):
+        return f"add column {self.column} to {self.table}"
+
+    def apply(self, cursor):
+        if db.backend.object_exists(cursor, 'column', f"{self.table}.{self.column}"):
+            return False
+        cursor.execute(f"ALTER TABLE {self.table} ADD {self.column} {self.types[db.backend.name]}")
+        return True
+
+
+class Migration:
+    def __init__(self, version, description, operations):
+        self.version = version
+        self.description = description
+        self.operations = operations
+
+
+MIGRATIONS = [
+    Migration(1, "Waitlist ordering index and registration status check", [
+        CreateIndex('idx_reg_waitlist', 'REGISTRATIONS', ('event_id', 'status', 'reg_date', 'reg_id')),
+        AddConstraint('REGISTRATIONS', 'chk_reg_status', "CHECK (status IN ('REGISTERED', 'WAITLISTED'))"),
+    ]),
+    Migration(2, "Archive tables for past events", [
+        CreateTable('REGISTRATIONS_ARCHIVE', {
+            'oracle': """
+            CREATE TABLE REGISTRATIONS_ARCHIVE (
+                reg_id NUMBER NOT NULL,
+                event_id NUMBER NOT NULL,
+                student_id VARCHAR2(255) NOT NULL,
+                reg_date DATE,
+                status VARCHAR2(50),
+                archived_date DATE DEFAULT SYSDATE,
+                CONSTRAINT pk_registrations_archive PRIMARY KEY (reg_id),
+                CONSTRAINT fk_reg_arch_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+                CONSTRAINT fk_reg_arch_students FOREIGN KEY (student_id) REFERENCES STUDENTS(student_id)
+            )""",
+            'sqlite': """
+            CREATE TABLE REGISTRATIONS_ARCHIVE (
+                reg_id INTEGER CONSTRAINT pk_registrations_archive PRIMARY KEY,
+                event_id INTEGER NOT NULL,
+                student_id TEXT NOT NULL,
+                reg_date DATE,
+                status TEXT,
+                archived_date DATE DEFAULT CURRENT_TIMESTAMP,
+                CONSTRAINT fk_reg_arch_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+                CONSTRAINT fk_reg_arch_students FOREIGN KEY (student_id) REFERENCES STUDENTS(student_id)
+            )""",
+        }),
+        CreateIndex('idx_reg_archive_event', 'REGISTRATIONS_ARCHIVE', ('event_id',)),
+        CreateTable('ATTENDANCE_ARCHIVE', {
+            'oracle': """
+            CREATE TABLE ATTENDANCE_ARCHIVE (
+                attendance_id NUMBER NOT NULL,
+                event_id NUMBER NOT NULL,
+                student_id VARCHAR2(255) NOT NULL,
+                attended CHAR(1) NOT NULL,
+                archived_date DATE DEFAULT SYSDATE,
+                CONSTRAINT pk_attendance_archive PRIMARY KEY (attendance_id),
+                CONSTRAINT fk_att_arch_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+                CONSTRAINT fk_att_arch_students FOREIGN KEY (student_id) REFERENCES STUDENTS(student_id)
+            )""",
+            'sqlite': """
+            CREATE TABLE ATTENDANCE_ARCHIVE (
+                attendance_id INTEGER CONSTRAINT pk_attendance_archive PRIMARY KEY,
+                event_id INTEGER NOT NULL,
+                student_id TEXT NOT NULL,
+                attended TEXT NOT NULL,
+                archived_date DATE DEFAULT CURRENT_TIMESTAMP,
+                CONSTRAINT fk_att_arch_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+                CONSTRAINT fk_att_arch_students FOREIGN KEY (student_id) REFERENCES STUDENTS(student_id)
+            )""",
+        }),
+        CreateIndex('idx_att_archive_event', 'ATTENDANCE_ARCHIVE', ('event_id',)),
+    ]),
+    Migration(3, "Lookup indexes for foreign keys, event dates and student names", [
+        # Foreign-key checks when deleting students, and per-student lookups
+        CreateIndex('idx_reg_student', 'REGISTRATIONS', ('student_id',)),
+        CreateIndex('idx_att_student', 'ATTENDANCE', ('student_id',)),
+        # get_all_events() ordering and archive.py's date cut-off
+        CreateIndex('idx_events_date', 'EVENTS', ('event_date', 'event_id')),
+        # Student lists and rosters ordered by name
+        CreateIndex('idx_students_name', 'STUDENTS', ('name', 'student_id')),
+    ]),
+    Migration(4, "Archived registrations by student for student timelines", [
+        CreateIndex('idx_reg_archive_student', 'REGISTRATIONS_ARCHIVE', ('student_id',)),
+    ]),
+    Migration(5, "Email campaigns and per-recipient delivery records", [
+        CreateSequence('campaign_id_seq'),
+        CreateTable('EMAIL_CAMPAIGNS', {
+            'oracle': """
+            CREATE TABLE EMAIL_CAMPAIGNS (
+                campaign_id NUMBER DEFAULT campaign_id_seq.NEXTVAL NOT NULL,
+                event_id NUMBER NOT NULL,
+                subject VARCHAR2(1000) NOT NULL,
+                body CLOB NOT NULL,
+                attach_invite CHAR(1) DEFAULT 'N' NOT NULL,
+                agenda_name VARCHAR2(255),
+                agenda_type VARCHAR2(255),
+                agenda BLOB,
+                created_by VARCHAR2(255),
+                created_date DATE DEFAULT SYSDATE,
+                recipients NUMBER DEFAULT 0 NOT NULL,
+                sent NUMBER DEFAULT 0 NOT NULL,
+                failed NUMBER DEFAULT 0 NOT NULL,
+                CONSTRAINT pk_email_campaigns PRIMARY KEY (campaign_id),
+                CONSTRAINT fk_campaign_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+                CONSTRAINT chk_campaign_invite CHECK (attach_invite IN ('Y', 'N'))
+            )""",
+            'sqlite': """
+            CREATE TABLE EMAIL_CAMPAIGNS (
+                campaign_id INTEGER CONSTRAINT pk_email_campaigns PRIMARY KEY AUTOINCREMENT,
+                event_id INTEGER NOT NULL,
+                subject TEXT NOT NULL,
+                body TEXT NOT NULL,
+                attach_invite TEXT DEFAULT 'N' NOT NULL,
+                agenda_name TEXT,
+                agenda_type TEXT,
+                agenda BLOB,
+                created_by TEXT,
+                created_date DATE DEFAULT CURRENT_TIMESTAMP,
+                recipients INTEGER DEFAULT 0 NOT NULL,
+                sent INTEGER DEFAULT 0 NOT NULL,
+                failed INTEGER DEFAULT 0 NOT NULL,
+                CONSTRAINT fk_campaign_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+                CONSTRAINT chk_campaign_invite CHECK (attach_invite IN ('Y', 'N'))
+            )""",
+        }),
+        CreateIndex('idx_campaigns_event', 'EMAIL_CAMPAIGNS', ('event_id', 'campaign_id')),
+        CreateTable('EMAIL_DELIVERIES', {
+            'oracle': """
+            CREATE TABLE EMAIL_DELIVERIES (
+                campaign_id NUMBER NOT NULL,
+                student_id VARCHAR2(255) NOT NULL,
+                email VARCHAR2(255) NOT NULL,
+                status VARCHAR2(20) DEFAULT 'PENDING' NOT NULL,
+                last_error VARCHAR2(1000),
+                updated_date DATE,
+                CONSTRAINT pk_email_deliveries PRIMARY KEY (campaign_id, student_id),
+                CONSTRAINT fk_delivery_campaigns FOREIGN KEY (campaign_id) REFERENCES EMAIL_CAMPAIGNS(campaign_id),
+                CONSTRAINT chk_delivery_status CHECK (status IN ('PENDING', 'SENT', 'FAILED'))
+            )""",
+            'sqlite': """
+            CREATE TABLE EMAIL_DELIVERIES (
+                campaign_id INTEGER NOT NULL,
+                student_id TEXT NOT NULL,
+                email TEXT NOT NULL,
+                status TEXT DEFAULT 'PENDING' NOT NULL,
+                last_error TEXT,
+                updated_date DATE,
+                CONSTRAINT pk_email_deliveries PRIMARY KEY (campaign_id, student_id),
+                CONSTRAINT fk_delivery_campaigns FOREIGN KEY (campaign_id) REFERENCES EMAIL_CAMPAIGNS(campaign_id),
+                CONSTRAINT chk_delivery_status CHECK (status IN ('PENDING', 'SENT', 'FAILED'))
+            )""",
+        }),
+        CreateIndex('idx_deliveries_status', 'EMAIL_DELIVERIES', ('campaign_id', 'status', 'student_id')),
+    ]),
+    Migration(6, "Reminder scheduler: reminders sent per event and the scheduler lease", [
+        CreateTable('EVENT_REMINDERS', {
+            'oracle': """
+            CREATE TABLE EVENT_REMINDERS (
+                event_id NUMBER NOT NULL,
+                minutes_before NUMBER NOT NULL,
+                campaign_id NUMBER,
+                created_date DATE DEFAULT SYSDATE,
+                CONSTRAINT pk_event_reminders PRIMARY KEY (event_id, minutes_before),
+                CONSTRAINT fk_reminder_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+                CONSTRAINT fk_reminder_campaigns FOREIGN KEY (campaign_id) REFERENCES EMAIL_CAMPAIGNS(campaign_id)
+            )""",
+            'sqlite': """
+            CREATE TABLE EVENT_REMINDERS (
+                event_id INTEGER NOT NULL,
+                minutes_before INTEGER NOT NULL,
+                campaign_id INTEGER,
+                created_date DATE DEFAULT CURRENT_TIMESTAMP,
+                CONSTRAINT pk_event_reminders PRIMARY KEY (event_id, minutes_before),
+                CONSTRAINT fk_reminder_events FOREIGN KEY (event_id) REFERENCES EVENTS(event_id),
+                CONSTRAINT fk_reminder_campaigns FOREIGN KEY (campaign_id) REFERENCES EMAIL_CAMPAIGNS(campaign_id)
+            )""",
+        }),
+        CreateTable('SCHEDULER_LEASES', {
+            'oracle': """
+            CREATE TABLE SCHEDULER_LEASES (
+                name VARCHAR2(100) NOT NULL,
+                holder VARCHAR2(255) NOT NULL,
+                expires_at DATE NOT NULL,
+                CONSTRAINT pk_scheduler_leases PRIMARY KEY (name)
+            )""",
+            'sqlite': """
+            CREATE TABLE SCHEDULER_LEASES (
+                name TEXT NOT NULL,
+                holder TEXT NOT NULL,
+                expires_at DATE NOT NULL,
+                CONSTRAINT pk_scheduler_leases PRIMARY KEY (name)
+            )""",
+        }),
+    ]),
+    Migration(7, "Email suppression list: addresses never to email", [
+        CreateTable('EMAIL_SUPPRESSION', {
+            'oracle': """
+            CREATE TABLE EMAIL_SUPPRESSION (
+                email VARCHAR2(255) NOT NULL,
+                reason VARCHAR2(1000),
+                created_date DATE DEFAULT SYSDATE,
+                CONSTRAINT pk_email_suppression PRIMARY KEY (email)
+            )""",
+            'sqlite': """
+            CREATE TABLE EMAIL_SUPPRESSION (
+                email TEXT NOT NULL,
+                reason TEXT,
+                created_date DATE DEFAULT CURRENT_TIMESTAMP,
+                CONSTRAINT pk_email_suppression PRIMARY KEY (email)
+            )""",
+        }),
+    ]),
+    Migration(8, "Campaign heartbeat, to recover sends whose process stopped", [
+        AddColumn('EMAIL_CAMPAIGNS', 'heartbeat', {'oracle': 'DATE', 'sqlite': 'DATE'}),
+    ]),
+]
+
+
+def _ensure_history_table(cursor):
+    if not db.backend.object_exists(cursor, 'table', 'SCHEMA_MIGRATIONS'):
+        cursor.execute(HISTORY_TABLE[db.backend.name])
+
+
+def applied_versions():
+    """Returns {version: applied_on} for the migrations recorded in the database."""
+    with db.get_connection() as conn:
+        with db.cursor(conn) as cursor:
+            _ensure_history_table(cursor)
+            cursor.execute("SELECT version, applied_on FROM SCHEMA_MIGRATIONS")
+            versions = {int(row[0]): row[1] for row in cursor.fetchall()}
+        conn.commit()
+    return versions
+
+
+def pending_migrations(target=None):
+    applied = applied_versions()
+    return [m for m in MIGRATIONS
+            if m.version not in applied and (target is None or m.version <= target)]
+
+
+def migrate(target=None, dry_run=False):
+    """
+    Applies the pending migrations in version order, up to `target`.
+    Each migration is recorded once all its operations have succeeded.
+    Returns the versions applied (or, with dry_run, that would be).
+    """
+    pending = pending_migrations(target)
+    if dry_run:
+        for migration in pending:
+            print(f"Would apply {migration.version:04d}: {migration.description}")
+            for operation in migration.operations:
+                print(f"  {operation.describe()}")
+        return [m.version for m in pending]
+
+    applied = []
+    with db.get_connection() as conn:
+        with db.cursor(conn) as cursor:
+            for migration in pending:
+                print(f"Applying {migration.version:04d}: {migration.description}")
+                for operation in migration.operations:
+                    changed = operation.apply(cursor)
+                    note = {True: "", False: " (already in place)", None: f" (not supported on {db.backend.name}; skipped)"}[changed]
+                    print(f"  {operation.describe()}{note}")
+                try:
+                    cursor.execute(
+                        "INSERT INTO SCHEMA_MIGRATIONS (version, description) VALUES (:version, :description)",
+                        {'version': migration.version, 'description': migration.description}
+                    )
+                except db.IntegrityError:
+                    # Another process recorded it first; its operations are in place.
+                    pass
+                conn.commit()
+                applied.append(migration.version)
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations without losing data.")
+    parser.add_argument("--status", action="store_true", help="list applied and pending migrations")
+    parser.add_argument("--dry-run", action="store_true", help="show pending operations without applying them")
+    parser.add_argument("--target", type=int, help="stop after this version")
+    args = parser.parse_args()
+
+    try:
+        if args.status:
+            applied = applied_versions()
+            for migration in MIGRATIONS:
+                state = f"applied {applied[migration.version]}" if migration.version in applied else "pending"
+                print(f"{migration.version:04d}  {state:<30}  {migration.description}")
+            return
+        versions = migrate(args.target, args.dry_run)
+    finally:
+        db.close_pool()
+    if not args.dry_run:
+        print(f"Applied {len(versions)} migration(s)." if versions else "The schema is up to date.")
+
+
+if __name__ == '__main__':
+    main()
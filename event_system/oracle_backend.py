@@ -0,0 +1,125 @@
+# oracle_backend.py
+# Storage backend for Oracle Database, using python-oracledb.
+#
+# db.py loads one backend module (see DB_BACKEND in config.py) and uses the
+# names below; the data-access modules only ever talk to db.py.
+
+import uuid
+
+import oracledb
+
+name = 'oracle'
+
+DatabaseError = oracledb.DatabaseError
+IntegrityError = oracledb.IntegrityError
+
+# Schema script for setup_db.py, relative to the event_system package.
+SCHEMA_FILE = 'database_setup.sql'
+
+# Appended by db.paginate() to an ordered query.
+PAGINATE_CLAUSE = " OFFSET :page_offset ROWS FETCH NEXT :page_limit ROWS ONLY"
+
+# Hint for array (executemany) inserts in bulk loads: direct-path insert above
+# the high-water mark. Oracle silently uses a conventional insert instead on
+# tables with enabled foreign keys, and a direct-path insert must be committed
+# before the table is read again in the same transaction.
+BULK_INSERT_HINT = "/*+ APPEND_VALUES */"
+
+# Email campaign bodies (CLOB) and agendas (BLOB) are fetched as str and
+# bytes, like SQLite returns them, instead of as LOB locators.
+oracledb.defaults.fetch_lobs = False
+
+
+def create_pool(config, min, max):
+    """Creates a connection pool."""
+    return oracledb.create_pool(
+        user=config["user"],
+        password=config["password"],
+        dsn=config["dsn"],
+        min=min,  # Minimum number of connections in the pool
+        max=max,  # Maximum number of connections in the pool
+        increment=1  # How many connections to create when more are needed
+    )
+
+
+def create_pool_async(config, min, max):
+    """Creates a connection pool for asyncio code."""
+    return oracledb.create_pool_async(
+        user=config["user"],
+        password=config["password"],
+        dsn=config["dsn"],
+        min=min,
+        max=max,
+        increment=1
+    )
+
+
+def connect(config):
+    """Opens a standalone connection (used by setup scripts)."""
+    return oracledb.connect(user=config["user"], password=config["password"], dsn=config["dsn"])
+
+
+def gather_statistics(connection, tables):
+    """Refreshes optimizer statistics after a bulk load."""
+    with connection.cursor() as cursor:
+        for table in tables:
+            cursor.execute("BEGIN DBMS_STATS.GATHER_TABLE_STATS(USER, :table_name); END;", {'table_name': table})
+
+
+def is_unique_violation(error, constraint, column):
+    """True if `error` is ORA-00001 for the named unique constraint."""
+    return constraint.upper() in str(error).upper()
+
+
+# Data dictionary views for object_exists(), by kind of schema object.
+_CATALOG_QUERIES = {
+    'table': "SELECT COUNT(*) FROM USER_TABLES WHERE table_name = :name",
+    'index': "SELECT COUNT(*) FROM USER_INDEXES WHERE index_name = :name",
+    'constraint': "SELECT COUNT(*) FROM USER_CONSTRAINTS WHERE constraint_name = :name",
+    'sequence': "SELECT COUNT(*) FROM USER_SEQUENCES WHERE sequence_name = :name",
+    'column': "SELECT COUNT(*) FROM USER_TAB_COLUMNS WHERE table_name || '.' || column_name = :name",
+}
+
+# Oracle can add constraints to existing tables (used by migrations.py).
+SUPPORTS_ADD_CONSTRAINT = True
+
+# Generated keys come from sequences (see database_setup.sql).
+USES_SEQUENCES = True
+
+
+def object_exists(cursor, kind, name):
+    """
+    True if the current schema has a table, index, constraint or sequence
+    called `name`, or a column `name` ("TABLE.column").
+    """
+    cursor.execute(_CATALOG_QUERIES[kind], {'name': name.upper()})
+    return cursor.fetchone()[0] > 0
+
+
+def insert_returning_id(cursor, statement, parameters, column):
+    """Runs an INSERT and returns the value the new row got for `column` (its sequence-generated key)."""
+    new_id = cursor.var(int)
+    cursor.execute(f"{statement} RETURNING {column} INTO :new_id", {**parameters, 'new_id': new_id})
+    return new_id.getvalue()[0]
+
+
+def explain(cursor, statement, parameters=None):
+    """
+    Returns the optimizer's plan for `statement` as (step, table) pairs, one
+    per plan line; `table` is set for full table scans. Uses PLAN_TABLE and
+    removes its rows again. EXPLAIN PLAN does not take bind values, so
+    `parameters` is ignored (binds are planned without peeking).
+    """
+    statement_id = uuid.uuid4().hex[:30]
+    cursor.execute(f"EXPLAIN PLAN SET STATEMENT_ID = '{statement_id}' FOR {statement}")
+    cursor.execute(
+        "SELECT depth, operation, options, object_name FROM PLAN_TABLE WHERE statement_id = :statement_id ORDER BY id",
+        {'statement_id': statement_id}
+    )
+    steps = []
+    for depth, operation, options, object_name in cursor.fetchall():
+        step = "  " * depth + " ".join(part for part in (operation, options, object_name) if part)
+        full_scan = operation == 'TABLE ACCESS' and options == 'FULL'
+        steps.append((step, object_name if full_scan else None))
+    cursor.execute("DELETE FROM PLAN_TABLE WHERE statement_id = :statement_id", {'statement_id': statement_id})
+    return steps
@@ -2,8 +2,38 @@
 # Handles student registrations for events, including capacity checks.
 
 from . import db
+from . import metrics
+from . import live
+from . import email_utils
 import datetime
+import threading
 
+# REGISTRATIONS.status values. Registrations beyond an event's capacity join
+# its waitlist, ordered by join time (reg_date, then reg_id), and the first
+# waitlisted student is promoted whenever a registered student cancels.
+REGISTERED = 'REGISTERED'
+WAITLISTED = 'WAITLISTED'
+
+REGISTERED_COUNT_QUERY = "SELECT COUNT(*) FROM REGISTRATIONS WHERE event_id = :event_id AND status = 'REGISTERED'"
+WAITLISTED_COUNT_QUERY = "SELECT COUNT(*) FROM REGISTRATIONS WHERE event_id = :event_id AND status = 'WAITLISTED'"
+
+# Reads only the head of the waitlist through IDX_REG_WAITLIST, so promotion
+# costs the same however long the waitlist is.
+WAITLIST_HEAD_QUERY = """
+SELECT r.reg_id, r.student_id, s.name, s.email
+FROM REGISTRATIONS r
+JOIN STUDENTS s ON r.student_id = s.student_id
+WHERE r.event_id = :event_id AND r.status = 'WAITLISTED'
+ORDER BY r.reg_date, r.reg_id
+"""
+
+WAITLISTED_MESSAGE = "Info: Event is full. Student added to the waitlist (position {position})."
+ALREADY_WAITLISTED_MESSAGE = "Info: Student is already on the waitlist for this event."
+
+# Promotions within this many seconds are emailed together, one batch per event.
+PROMOTION_NOTICE_DELAY = 5
+
+@metrics.track_query
 def register_student_for_event(event_id, student_id):
     """
     Registers a student for a specific event, handling all business rules
@@ -13,7 +43,7 @@ def register_student_for_event(event_id, student_id):
         with db.get_connection() as conn:
             # Using a transaction context manager ensures atomicity.
             # It will automatically commit if the block succeeds, or rollback if it fails.
-            with conn.cursor() as cursor:
+            with db.cursor(conn) as cursor:
                 # --- Check 1: Event Capacity and Existence (with row lock) ---
                 cursor.execute("SELECT total_slots FROM EVENTS WHERE event_id = :event_id FOR UPDATE", {'event_id': event_id})
                 event_result = cursor.fetchone()
@@ -23,36 +53,47 @@ def register_student_for_event(event_id, student_id):
 
                 # --- Check 2: Student Existence ---
                 cursor.execute("SELECT name FROM STUDENTS WHERE student_id = :student_id", {'student_id': student_id})
-                if not cursor.fetchone():
+                student_result = cursor.fetchone()
+                if not student_result:
                     return "Error: Student not found."
 
-                # --- Check 3: Already Registered ---
+                # --- Check 3: Already Registered or Waitlisted ---
                 cursor.execute(
-                    "SELECT reg_id FROM REGISTRATIONS WHERE event_id = :event_id AND student_id = :student_id",
+                    "SELECT status FROM REGISTRATIONS WHERE event_id = :event_id AND student_id = :student_id",
                     {'event_id': event_id, 'student_id': student_id}
                 )
-                if cursor.fetchone():
+                existing = cursor.fetchone()
+                if existing:
+                    if existing[0] == WAITLISTED:
+                        return ALREADY_WAITLISTED_MESSAGE
                     return "Info: Student is already registered for this event."
 
-                # --- Check 4: Capacity Check ---
-                cursor.execute("SELECT COUNT(*) FROM REGISTRATIONS WHERE event_id = :event_id", {'event_id': event_id})
+                # --- Check 4: Capacity Check (a full event puts the student on the waitlist) ---
+                cursor.execute(REGISTERED_COUNT_QUERY, {'event_id': event_id})
                 registered_count = cursor.fetchone()[0]
-                
+                status = REGISTERED
                 if registered_count >= total_slots:
-                    return "Error: Event is full. Cannot register."
+                    status = WAITLISTED
+                    cursor.execute(WAITLISTED_COUNT_QUERY, {'event_id': event_id})
+                    position = cursor.fetchone()[0] + 1
 
                 # --- If all checks pass, proceed with registration ---
                 insert_query = """
-                INSERT INTO REGISTRATIONS (event_id, student_id, reg_date)
-                VALUES (:event_id, :student_id, :reg_date)
+                INSERT INTO REGISTRATIONS (event_id, student_id, reg_date, status)
+                VALUES (:event_id, :student_id, :reg_date, :status)
                 """
+                reg_date = datetime.datetime.now()
                 cursor.execute(insert_query, {
                     'event_id': event_id,
                     'student_id': student_id,
-                    'reg_date': datetime.datetime.now()
+                    'reg_date': reg_date,
+                    'status': status
                 })
                 
                 conn.commit()
+                if status == WAITLISTED:
+                    return WAITLISTED_MESSAGE.format(position=position)
+                live.publish(event_id, 'registered', student_id=student_id, name=student_result[0], reg_date=reg_date)
                 return "Success: Student registered successfully."
 
     except Exception as e:
@@ -60,34 +101,180 @@ def register_student_for_event(event_id, student_id):
         # The transaction is automatically rolled back by the 'with' statement on exception
         return f"An unexpected error occurred: {e}"
 
-def get_registered_students(event_id):
+@metrics.track_query
+def register_students_for_event(event_id, student_ids):
+    """
+    Registers several students for one event in a single transaction.
+
+    The event row is locked once and the existence, duplicate and capacity
+    checks run as one query per chunk of IDs rather than once per student.
+    Students are registered in the order given until the event is full; the
+    rest join the waitlist in that order.
+
+    Returns:
+        list: (student_id, message) pairs, using the same messages as
+              register_student_for_event().
+    """
+    student_ids = list(student_ids)
+    if not student_ids:
+        return []
+
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                cursor.execute("SELECT total_slots FROM EVENTS WHERE event_id = :event_id FOR UPDATE", {'event_id': event_id})
+                event_result = cursor.fetchone()
+                if not event_result:
+                    return [(student_id, "Error: Event not found.") for student_id in student_ids]
+                total_slots = event_result[0]
+
+                cursor.execute(REGISTERED_COUNT_QUERY, {'event_id': event_id})
+                registered_count = cursor.fetchone()[0]
+                waitlisted_count = None
+
+                known_students = {}
+                already_registered = {}
+                for chunk in db.chunked(dict.fromkeys(student_ids)):
+                    in_list, params = db.bind_list(chunk)
+                    cursor.execute(f"SELECT student_id, name FROM STUDENTS WHERE student_id IN ({in_list})", params)
+                    known_students.update(cursor.fetchall())
+                    params['event_id'] = event_id
+                    cursor.execute(
+                        f"SELECT student_id, status FROM REGISTRATIONS WHERE event_id = :event_id AND student_id IN ({in_list})",
+                        params
+                    )
+                    already_registered.update(cursor.fetchall())
+
+                results = []
+                new_rows = []
+                reg_date = datetime.datetime.now()
+                for student_id in student_ids:
+                    if student_id not in known_students:
+                        results.append((student_id, "Error: Student not found."))
+                    elif already_registered.get(student_id) == WAITLISTED:
+                        results.append((student_id, ALREADY_WAITLISTED_MESSAGE))
+                    elif student_id in already_registered:
+                        results.append((student_id, "Info: Student is already registered for this event."))
+                    elif registered_count >= total_slots:
+                        if waitlisted_count is None:
+                            cursor.execute(WAITLISTED_COUNT_QUERY, {'event_id': event_id})
+                            waitlisted_count = cursor.fetchone()[0]
+                        new_rows.append({'event_id': event_id, 'student_id': student_id, 'reg_date': reg_date, 'status': WAITLISTED})
+                        already_registered[student_id] = WAITLISTED
+                        waitlisted_count += 1
+                        results.append((student_id, WAITLISTED_MESSAGE.format(position=waitlisted_count)))
+                    else:
+                        new_rows.append({'event_id': event_id, 'student_id': student_id, 'reg_date': reg_date, 'status': REGISTERED})
+                        already_registered[student_id] = REGISTERED
+                        registered_count += 1
+                        results.append((student_id, "Success: Student registered successfully."))
+
+                if new_rows:
+                    cursor.executemany("""
+                    INSERT INTO REGISTRATIONS (event_id, student_id, reg_date, status)
+                    VALUES (:event_id, :student_id, :reg_date, :status)
+                    """, new_rows)
+                conn.commit()
+                for row in new_rows:
+                    if row['status'] == REGISTERED:
+                        live.publish(event_id, 'registered', student_id=row['student_id'],
+                                     name=known_students[row['student_id']], reg_date=reg_date)
+                return results
+
+    except Exception as e:
+        print(f"Error during bulk registration: {e}")
+        return [(student_id, f"An unexpected error occurred: {e}") for student_id in student_ids]
+
+REGISTERED_STUDENTS_QUERY = """
+SELECT s.student_id, s.name, s.email, r.reg_date
+FROM STUDENTS s
+JOIN REGISTRATIONS r ON s.student_id = r.student_id
+WHERE r.event_id = :event_id AND r.status = 'REGISTERED'
+ORDER BY s.name, s.student_id
+"""
+
+WAITLIST_QUERY = """
+SELECT s.student_id, s.name, s.email, r.reg_date
+FROM REGISTRATIONS r
+JOIN STUDENTS s ON r.student_id = s.student_id
+WHERE r.event_id = :event_id AND r.status = 'WAITLISTED'
+ORDER BY r.reg_date, r.reg_id
+"""
+
+@metrics.track_query
+def get_registered_students(event_id, limit=None, offset=0):
     """
     Retrieves a list of students registered for a given event.
+    Pass `limit`/`offset` to fetch a single page.
     """
     try:
         with db.get_connection() as conn:
-            with conn.cursor() as cursor:
-                query = """
-                SELECT s.student_id, s.name, s.email, r.reg_date
-                FROM STUDENTS s
-                JOIN REGISTRATIONS r ON s.student_id = r.student_id
-                WHERE r.event_id = :event_id
-                ORDER BY s.name
-                """
-                cursor.execute(query, {'event_id': event_id})
+            with db.cursor(conn) as cursor:
+                cursor.execute(*db.paginate(REGISTERED_STUDENTS_QUERY, {'event_id': event_id}, limit, offset))
                 return cursor.fetchall()
     except Exception as e:
         print(f"Error fetching registered students: {e}")
         return []
 
+@metrics.track_query
+async def get_registered_students_async(event_id, limit=None, offset=0):
+    """
+    Async version of get_registered_students() for the asyncio web tier.
+    """
+    try:
+        async with db.get_async_connection() as conn:
+            with db.async_cursor(conn) as cursor:
+                await cursor.execute(*db.paginate(REGISTERED_STUDENTS_QUERY, {'event_id': event_id}, limit, offset))
+                return await cursor.fetchall()
+    except Exception as e:
+        print(f"Error fetching registered students: {e}")
+        return []
+
+@metrics.track_query
+def get_waitlist(event_id, limit=None, offset=0):
+    """
+    Retrieves the waitlist for an event in promotion order.
+    Pass `limit`/`offset` to fetch a single page.
+    """
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                cursor.execute(*db.paginate(WAITLIST_QUERY, {'event_id': event_id}, limit, offset))
+                return cursor.fetchall()
+    except Exception as e:
+        print(f"Error fetching waitlist: {e}")
+        return []
+
+@metrics.track_query
 def cancel_registration(event_id, student_id):
     """
     Cancels a student's registration for an event and deletes any associated
-    attendance records.
+    attendance records. If a registered student cancels, the first student on
+    the waitlist takes the place in the same transaction and is emailed.
     """
     try:
         with db.get_connection() as conn:
-            with conn.cursor() as cursor:
+            with db.cursor(conn) as cursor:
+                # Lock the event so promotion cannot race a new registration
+                cursor.execute(
+                    "SELECT event_name, event_date, event_time, venue FROM EVENTS WHERE event_id = :event_id FOR UPDATE",
+                    {'event_id': event_id}
+                )
+                event = cursor.fetchone()
+
+                cursor.execute(
+                    "SELECT status FROM REGISTRATIONS WHERE event_id = :1 AND student_id = :2",
+                    [event_id, student_id]
+                )
+                registration = cursor.fetchone()
+
+                # Remember the attendance status so live viewers can adjust their counts
+                cursor.execute(
+                    "SELECT attended FROM ATTENDANCE WHERE event_id = :1 AND student_id = :2",
+                    [event_id, student_id]
+                )
+                attendance_result = cursor.fetchone()
+
                 # First, delete any attendance records for this registration
                 cursor.execute(
                     "DELETE FROM ATTENDANCE WHERE event_id = :1 AND student_id = :2",
@@ -99,9 +286,245 @@ def cancel_registration(event_id, student_id):
                     "DELETE FROM REGISTRATIONS WHERE event_id = :1 AND student_id = :2",
                     [event_id, student_id]
                 )
+                canceled = cursor.rowcount > 0 and registration[0] != WAITLISTED
+
+                # A place opened up: promote the head of the waitlist
+                promoted = _promote_from_waitlist(cursor, event_id, 1) if canceled else []
                 
                 conn.commit()
+                if canceled:
+                    live.publish(event_id, 'canceled', student_id=student_id,
+                                 attended=attendance_result[0] if attendance_result else None)
+                if promoted:
+                    _announce_promotions(event_id, event, promoted)
+                    return f"Success: Registration canceled successfully. {promoted[0][2]} was moved from the waitlist."
                 return "Success: Registration canceled successfully."
     except Exception as e:
         print(f"Error canceling registration: {e}")
         return f"An unexpected error occurred: {e}"
+
+def _promote_from_waitlist(cursor, event_id, places):
+    """
+    Moves up to `places` students from the head of the event's waitlist to
+    REGISTERED. Must run in the transaction that freed the places, with the
+    event row locked. Returns (reg_id, student_id, name, email, reg_date) rows.
+    """
+    if places <= 0:
+        return []
+    cursor.execute(*db.paginate(WAITLIST_HEAD_QUERY, {'event_id': event_id}, limit=places))
+    promoted = cursor.fetchall()
+    if not promoted:
+        return []
+    reg_date = datetime.datetime.now()
+    in_list, params = db.bind_list([row[0] for row in promoted])
+    params['reg_date'] = reg_date
+    cursor.execute(f"UPDATE REGISTRATIONS SET status = 'REGISTERED', reg_date = :reg_date WHERE reg_id IN ({in_list})", params)
+    return [tuple(row) + (reg_date,) for row in promoted]
+
+def _announce_promotions(event_id, event, promoted):
+    # Called after the promoting transaction has committed.
+    for _, student_id, name, _, reg_date in promoted:
+        live.publish(event_id, 'registered', student_id=student_id, name=name, reg_date=reg_date)
+    notify_promoted(event_id, event, [row[3] for row in promoted])
+
+# --- Bulk cancellation ---
+# These functions remove many registrations with a few set-based statements
+# per chunk of at most CANCEL_CHUNK_SIZE students, committing after each
+# chunk so undo and row locks stay bounded however large the event is. They
+# return a dict of the rows affected: 'registrations' and 'attendance'
+# deleted, 'promoted' from waitlists, and 'error' (None, or the message of
+# the error that stopped the operation; chunks committed before it stay
+# committed and are counted). Live viewers of each affected event are asked
+# to reload once, instead of receiving one change per student.
+
+CANCEL_CHUNK_SIZE = db.IN_LIST_CHUNK_SIZE
+
+def _cancel_counts():
+    return {'registrations': 0, 'attendance': 0, 'promoted': 0, 'error': None}
+
+def _delete_chunk(cursor, student_ids, counts, event_id=None):
+    """
+    Deletes the attendance and registration rows of `student_ids`, for one
+    event or (with event_id=None) for every event. Returns the number of
+    REGISTERED rows removed per event.
+    """
+    in_list, params = db.bind_list(student_ids)
+    event_filter = ""
+    if event_id is not None:
+        event_filter = "event_id = :event_id AND "
+        params['event_id'] = event_id
+    cursor.execute(
+        f"SELECT event_id, COUNT(*) FROM REGISTRATIONS WHERE {event_filter}status = 'REGISTERED' "
+        f"AND student_id IN ({in_list}) GROUP BY event_id",
+        params
+    )
+    freed = dict(cursor.fetchall())
+    cursor.execute(f"DELETE FROM ATTENDANCE WHERE {event_filter}student_id IN ({in_list})", params)
+    counts['attendance'] += cursor.rowcount
+    cursor.execute(f"DELETE FROM REGISTRATIONS WHERE {event_filter}student_id IN ({in_list})", params)
+    counts['registrations'] += cursor.rowcount
+    return freed
+
+@metrics.track_query
+def cancel_registrations(event_id, student_ids):
+    """
+    Cancels the registrations (and attendance) of many students for one
+    event. Places freed by registered students go to the head of the
+    waitlist, in the same transaction as each chunk.
+    """
+    counts = _cancel_counts()
+    announcements = []
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                for chunk in db.chunked(dict.fromkeys(student_ids), CANCEL_CHUNK_SIZE):
+                    cursor.execute(
+                        "SELECT event_name, event_date, event_time, venue FROM EVENTS WHERE event_id = :event_id FOR UPDATE",
+                        {'event_id': event_id}
+                    )
+                    event = cursor.fetchone()
+                    if not event:
+                        counts['error'] = "Error: Event not found."
+                        return counts
+                    freed = _delete_chunk(cursor, chunk, counts, event_id)
+                    promoted = _promote_from_waitlist(cursor, event_id, freed.get(event_id, 0))
+                    conn.commit()
+                    counts['promoted'] += len(promoted)
+                    if promoted:
+                        announcements.append((event, promoted))
+    except Exception as e:
+        print(f"Error canceling registrations: {e}")
+        counts['error'] = f"An unexpected error occurred: {e}"
+    finally:
+        for event, promoted in announcements:
+            notify_promoted(event_id, event, [row[3] for row in promoted])
+        if counts['registrations'] or counts['attendance']:
+            live.publish(event_id, 'resync')
+    return counts
+
+@metrics.track_query
+def cancel_event_registrations(event_id):
+    """
+    Cancels every registration and attendance record of an event, e.g. when
+    the event itself is called off. The waitlist is cleared too, so nobody is
+    promoted. The event row is kept.
+    """
+    counts = _cancel_counts()
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                while True:
+                    cursor.execute(
+                        "SELECT event_id FROM EVENTS WHERE event_id = :event_id FOR UPDATE",
+                        {'event_id': event_id}
+                    )
+                    if not cursor.fetchone():
+                        counts['error'] = "Error: Event not found."
+                        return counts
+                    cursor.execute(*db.paginate(
+                        "SELECT student_id FROM REGISTRATIONS WHERE event_id = :event_id ORDER BY reg_id",
+                        {'event_id': event_id}, limit=CANCEL_CHUNK_SIZE
+                    ))
+                    chunk = [row[0] for row in cursor.fetchall()]
+                    if not chunk:
+                        break
+                    _delete_chunk(cursor, chunk, counts, event_id)
+                    conn.commit()
+                # Attendance rows without a registration, if any
+                cursor.execute("DELETE FROM ATTENDANCE WHERE event_id = :event_id", {'event_id': event_id})
+                counts['attendance'] += cursor.rowcount
+                conn.commit()
+    except Exception as e:
+        print(f"Error canceling event registrations: {e}")
+        counts['error'] = f"An unexpected error occurred: {e}"
+    finally:
+        if counts['registrations'] or counts['attendance']:
+            live.publish(event_id, 'resync')
+    return counts
+
+@metrics.track_query
+def cancel_student_registrations(student_ids):
+    """
+    Cancels every registration and attendance record of a group of students
+    (e.g. a cohort that has left) across all events. Freed places are filled
+    from each event's waitlist.
+    """
+    student_ids = list(dict.fromkeys(student_ids))
+    counts = _cancel_counts()
+    announcements = []
+    affected_events = set()
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                for chunk in db.chunked(student_ids, CANCEL_CHUNK_SIZE):
+                    in_list, params = db.bind_list(chunk)
+                    # Lock the affected events in a fixed order so concurrent
+                    # purges cannot deadlock on each other.
+                    cursor.execute(
+                        f"""SELECT event_id, event_name, event_date, event_time, venue FROM EVENTS
+                        WHERE event_id IN (SELECT event_id FROM REGISTRATIONS WHERE student_id IN ({in_list}))
+                        ORDER BY event_id FOR UPDATE""",
+                        params
+                    )
+                    events = {row[0]: tuple(row[1:]) for row in cursor.fetchall()}
+                    freed = _delete_chunk(cursor, chunk, counts)
+                    promotions = [(event_id, _promote_from_waitlist(cursor, event_id, places))
+                                  for event_id, places in sorted(freed.items()) if event_id in events]
+                    conn.commit()
+                    affected_events.update(events)
+                    for event_id, promoted in promotions:
+                        counts['promoted'] += len(promoted)
+                        if promoted:
+                            announcements.append((event_id, events[event_id], promoted))
+    except Exception as e:
+        print(f"Error canceling student registrations: {e}")
+        counts['error'] = f"An unexpected error occurred: {e}"
+    finally:
+        # A student promoted by an early chunk may be purged by a later one.
+        purged = set(student_ids)
+        for event_id, event, promoted in announcements:
+            notify_promoted(event_id, event, [row[3] for row in promoted if row[1] not in purged])
+        for event_id in affected_events:
+            live.publish(event_id, 'resync')
+    return counts
+
+# --- Waitlist promotion emails ---
+# Promotions are collected for PROMOTION_NOTICE_DELAY seconds and then handed
+# to the background email sender as one batch per event, so a burst of
+# cancellations does not start one sender thread per promoted student.
+
+_notices_lock = threading.Lock()
+_pending_notices = {}  # event_id -> (event row, [email addresses])
+_notice_timer = None
+
+def notify_promoted(event_id, event, emails):
+    """
+    Queues "you are now registered" emails for students promoted from the
+    waitlist of `event` (an (event_name, event_date, event_time, venue) row).
+    """
+    global _notice_timer
+    emails = [email for email in emails if email]
+    if not emails:
+        return
+    with _notices_lock:
+        _pending_notices.setdefault(event_id, (event, []))[1].extend(emails)
+        if _notice_timer is None:
+            _notice_timer = threading.Timer(PROMOTION_NOTICE_DELAY, _send_promotion_notices)
+            _notice_timer.daemon = True
+            _notice_timer.start()
+
+def _send_promotion_notices():
+    global _notice_timer
+    with _notices_lock:
+        pending = list(_pending_notices.values())
+        _pending_notices.clear()
+        _notice_timer = None
+    for (event_name, event_date, event_time, venue), recipients in pending:
+        body = email_utils.create_event_notification_email_body(
+            event_name,
+            event_date.strftime("%Y-%m-%d"),
+            event_time,
+            venue,
+            "A place has opened up and you have been moved from the waitlist to the list of registered attendees."
+        )
+        email_utils.send_emails_in_background(recipients, f"You're registered: {event_name}", body)
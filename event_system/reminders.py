@@ -0,0 +1,353 @@
+# reminders.py
+# Reminder emails to registered students before each event.
+#
+# For every lead time in REMINDER_HOURS (default 24 and 1 hours), each event
+# gets one reminder campaign (campaigns.py) that many hours before its start
+# (event_date plus event_time; an event_time that cannot be read counts from
+# the start of the day).
+#
+# The scheduler does not poll every event. Every REFRESH_SECONDS it reads the
+# events starting within the next lead time plus two refresh intervals (a
+# range scan of IDX_EVENTS_DATE) and keeps their pending reminders in a heap
+# ordered by due time. Between refreshes it sleeps until the earliest due
+# reminder, so the work per tick is the reminders that are due, however many
+# events there are.
+#
+# With several web workers (or hosts) only one process sends. The processes
+# compete for a lease in SCHEDULER_LEASES, renewed every third of
+# LEASE_SECONDS by its holder; when the holder stops renewing, another process
+# takes over once the lease has expired. Process clocks must roughly agree.
+# EVENT_REMINDERS records each reminder before its campaign starts, and its key
+# (event_id, minutes_before) makes each reminder happen at most once, even
+# across a change of leader. If the campaign cannot be started (a database
+# error), the record is removed again, so the next refresh retries it.
+#
+# A reminder that is overdue, for example after downtime, is still sent if the
+# event has not started, unless a shorter reminder for the event is due as
+# well; then only the shorter one is sent.
+#
+# With REMINDERS_ENABLED=1 the web UI starts the scheduler in each --serve
+# worker after the fork, and in the development server at startup. It can
+# also run on its own:
+#   python -m event_system.reminders
+
+import atexit
+import datetime
+import heapq
+import os
+import socket
+import threading
+import uuid
+
+from . import db
+from . import metrics
+from . import campaigns
+from . import email_templates
+from .config import REMINDER_CONFIG
+from .events import start_datetime
+
+LEASE_NAME = 'reminders'
+CREATED_BY = 'reminders'
+
+REMINDERS_TOTAL = metrics.REGISTRY.counter(
+    "event_system_reminders_total",
+    "Event reminders handled by the scheduler, by outcome (sent or skipped).",
+    ("outcome",)
+)
+
+# Events starting in a date range, with the reminders already recorded for
+# them. Dates are whole days, so the range is widened to full days.
+UPCOMING_EVENTS_QUERY = """
+SELECT event_id, event_date, event_time
+FROM EVENTS
+WHERE event_date >= :date_from AND event_date < :date_to
+"""
+
+RECORDED_REMINDERS_QUERY = """
+SELECT r.event_id, r.minutes_before
+FROM EVENT_REMINDERS r
+JOIN EVENTS e ON r.event_id = e.event_id
+WHERE e.event_date >= :date_from AND e.event_date < :date_to
+"""
+
+
+def event_start(event_date, event_time):
+    """Returns the start of an event as a datetime; an unreadable time gives midnight."""
+    start = start_datetime(event_date, event_time)
+    if start is not None:
+        return start
+    day = event_date.date() if isinstance(event_date, datetime.datetime) else event_date
+    return datetime.datetime.combine(day, datetime.time())
+
+
+def _lead_label(minutes):
+    if minutes % 60:
+        return f"{minutes} minutes"
+    hours = minutes // 60
+    return "1 hour" if hours == 1 else f"{hours} hours"
+
+
+def reminder_templates(minutes):
+    """Returns the (subject, body) templates of the reminder sent `minutes` before an event."""
+    label = _lead_label(minutes)
+    subject = f"Reminder: {{{{ event_name }}}} starts in {label}"
+    body = email_templates.notification_template(f"This is a reminder that the event starts in {label}.")
+    return subject, body
+
+
+class ReminderScheduler:
+    """
+    Sends reminder campaigns `hours` before each event. start() runs it in a
+    daemon thread; only the process holding the lease sends.
+    """
+
+    def __init__(self, hours, refresh_seconds, lease_seconds, attach_invite=True):
+        self.lead_minutes = sorted({int(round(h * 60)) for h in hours if h > 0})
+        self.refresh_seconds = refresh_seconds
+        self.lease_seconds = lease_seconds
+        self.attach_invite = attach_invite
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+        self._heap = []         # (due, event_id, minutes_before, start)
+        self._next_refresh = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    # --- Lifecycle ---
+
+    def start(self):
+        """Starts the scheduler thread in this process, once (threads do not survive a fork)."""
+        with self._lock:
+            pid = os.getpid()
+            if self._pid == pid or not self.lead_minutes:
+                return
+            self._pid = pid
+            self.holder = f"{socket.gethostname()}:{pid}:{uuid.uuid4().hex[:8]}"
+            self.is_leader = False
+            self._heap = []
+            self._stop.clear()
+            atexit.register(self.stop)
+            threading.Thread(target=self.run, name="reminder-scheduler", daemon=True).start()
+
+    def stop(self):
+        """Stops the loop and gives up the lease, so another process can take over at once."""
+        self._stop.set()
+        if self.is_leader:
+            self._release_lease()
+
+    def run(self):
+        """The scheduler loop; returns after stop()."""
+        while not self._stop.is_set():
+            try:
+                self._tick()
+            except Exception as e:
+                print(f"Error in reminder scheduler: {e}")
+                self.is_leader = False
+            self._stop.wait(self._seconds_to_next_tick())
+
+    def _tick(self):
+        leader = self._acquire_lease()
+        if leader and not self.is_leader:
+            print(f"Reminder scheduler: {self.holder} is now sending reminders.")
+            self._next_refresh = None
+        self.is_leader = leader
+        if not leader:
+            return
+        now = datetime.datetime.now()
+        if self._next_refresh is None or now >= self._next_refresh:
+            self.refresh(now)
+        self.send_due(now)
+
+    def _seconds_to_next_tick(self):
+        wait = self.lease_seconds / 3
+        if self.is_leader:
+            now = datetime.datetime.now()
+            if self._heap:
+                wait = min(wait, (self._heap[0][0] - now).total_seconds())
+            if self._next_refresh is not None:
+                wait = min(wait, (self._next_refresh - now).total_seconds())
+        return max(wait, 0.1)
+
+    # --- Election ---
+
+    def _acquire_lease(self):
+        """Takes or renews the lease. Returns True if this process holds it."""
+        now = datetime.datetime.now()
+        params = {'name': LEASE_NAME, 'holder': self.holder,
+                  'expires_at': now + datetime.timedelta(seconds=self.lease_seconds)}
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                cursor.execute(
+                    "UPDATE SCHEDULER_LEASES SET holder = :holder, expires_at = :expires_at "
+                    "WHERE name = :name AND (holder = :holder OR expires_at < :now)",
+                    {**params, 'now': now}
+                )
+                if cursor.rowcount == 0:
+                    try:
+                        cursor.execute(
+                            "INSERT INTO SCHEDULER_LEASES (name, holder, expires_at) VALUES (:name, :holder, :expires_at)",
+                            params
+                        )
+                    except db.IntegrityError:
+                        return False  # held by another process
+                conn.commit()
+                return True
+
+    def _release_lease(self):
+        try:
+            with db.get_connection() as conn:
+                with db.cursor(conn) as cursor:
+                    cursor.execute(
+                        "UPDATE SCHEDULER_LEASES SET expires_at = :now WHERE name = :name AND holder = :holder",
+                        {'now': datetime.datetime.now(), 'name': LEASE_NAME, 'holder': self.holder}
+                    )
+                    conn.commit()
+        except Exception as e:
+            print(f"Error releasing the reminder scheduler lease: {e}")
+        self.is_leader = False
+
+    # --- Due-time index ---
+
+    def refresh(self, now=None):
+        """
+        Rebuilds the heap from the events starting before the next refresh
+        has had time to see them, leaving out reminders already recorded.
+        """
+        now = now or datetime.datetime.now()
+        horizon = now + datetime.timedelta(minutes=self.lead_minutes[-1], seconds=2 * self.refresh_seconds)
+        params = {'date_from': now.date(), 'date_to': horizon.date() + datetime.timedelta(days=1)}
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                cursor.execute(UPCOMING_EVENTS_QUERY, params)
+                upcoming = cursor.fetchall()
+                cursor.execute(RECORDED_REMINDERS_QUERY, params)
+                recorded = set(cursor.fetchall())
+
+        heap = []
+        for event_id, event_date, event_time in upcoming:
+            start = event_start(event_date, event_time)
+            if start <= now:
+                continue
+            for minutes in self.lead_minutes:
+                if (event_id, minutes) not in recorded:
+                    heap.append((start - datetime.timedelta(minutes=minutes), event_id, minutes, start))
+        heapq.heapify(heap)
+        self._heap = heap
+        self._next_refresh = now + datetime.timedelta(seconds=self.refresh_seconds)
+
+    def send_due(self, now=None):
+        """Handles every reminder due by `now`. Returns the number handled."""
+        now = now or datetime.datetime.now()
+        handled = 0
+        while self._heap and self._heap[0][0] <= now:
+            due, event_id, minutes, start = heapq.heappop(self._heap)
+            superseded = any(shorter < minutes and start - datetime.timedelta(minutes=shorter) <= now
+                             for shorter in self.lead_minutes)
+            if start <= now or superseded:
+                self._record(event_id, minutes)
+                REMINDERS_TOTAL.inc(outcome='skipped')
+            else:
+                self._send(event_id, minutes)
+            handled += 1
+        return handled
+
+    # --- Sending ---
+
+    def _record(self, event_id, minutes):
+        """Claims a reminder. Returns False if it was already recorded (by this or an earlier leader)."""
+        try:
+            with db.get_connection() as conn:
+                with db.cursor(conn) as cursor:
+                    cursor.execute(
+                        "INSERT INTO EVENT_REMINDERS (event_id, minutes_before, created_date) "
+                        "VALUES (:event_id, :minutes_before, :created_date)",
+                        {'event_id': event_id, 'minutes_before': minutes, 'created_date': datetime.datetime.now()}
+                    )
+                    conn.commit()
+                    return True
+        except db.IntegrityError:
+            return False
+
+    def _unrecord(self, event_id, minutes):
+        """Removes a claim whose campaign could not be started, so the next refresh retries it."""
+        try:
+            with db.get_connection() as conn:
+                with db.cursor(conn) as cursor:
+                    cursor.execute(
+                        "DELETE FROM EVENT_REMINDERS WHERE event_id = :event_id AND minutes_before = :minutes_before "
+                        "AND campaign_id IS NULL",
+                        {'event_id': event_id, 'minutes_before': minutes}
+                    )
+                    conn.commit()
+        except Exception as e:
+            print(f"Error releasing the reminder for event {event_id}: {e}")
+
+    @metrics.track_query
+    def _send(self, event_id, minutes):
+        if not self._record(event_id, minutes):
+            return
+        try:
+            with db.get_connection() as conn:
+                with db.cursor(conn) as cursor:
+                    cursor.execute(
+                        "SELECT event_name, event_date, event_time, venue FROM EVENTS WHERE event_id = :event_id",
+                        {'event_id': event_id}
+                    )
+                    event = cursor.fetchone()
+            subject, body = reminder_templates(minutes)
+            campaign_id, count = campaigns.start_campaign(event_id, event, subject, body,
+                                                          attach_invite=self.attach_invite, created_by=CREATED_BY)
+        except Exception:
+            self._unrecord(event_id, minutes)
+            raise
+        if campaign_id is None and count is None:
+            self._unrecord(event_id, minutes)
+            print(f"Reminder scheduler: the reminder for event {event_id} could not be started; "
+                  "it is retried at the next refresh.")
+            return
+        if campaign_id is None:
+            REMINDERS_TOTAL.inc(outcome='skipped')
+            return
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                cursor.execute(
+                    "UPDATE EVENT_REMINDERS SET campaign_id = :campaign_id "
+                    "WHERE event_id = :event_id AND minutes_before = :minutes_before",
+                    {'campaign_id': campaign_id, 'event_id': event_id, 'minutes_before': minutes}
+                )
+                conn.commit()
+        REMINDERS_TOTAL.inc(outcome='sent')
+        print(f"Reminder scheduler: campaign {campaign_id} reminds {count} students of event {event_id} "
+              f"{_lead_label(minutes)} ahead.")
+
+
+scheduler = ReminderScheduler(REMINDER_CONFIG['hours'], REMINDER_CONFIG['refresh_seconds'],
+                              REMINDER_CONFIG['lease_seconds'], REMINDER_CONFIG['attach_invite'])
+
+REMINDER_LEADER = metrics.REGISTRY.gauge(
+    "event_system_reminder_leader",
+    "1 if this process holds the reminder scheduler lease.",
+    function=lambda: 1 if scheduler.is_leader else 0
+)
+
+
+def start():
+    """Starts the scheduler in this process if REMINDERS_ENABLED is set."""
+    if REMINDER_CONFIG['enabled']:
+        scheduler.start()
+
+
+def main():
+    print(f"Reminder scheduler {scheduler.holder}: reminders {', '.join(_lead_label(m) for m in scheduler.lead_minutes)} "
+          "before each event. Press Ctrl+C to stop.")
+    try:
+        scheduler.run()
+    except KeyboardInterrupt:
+        scheduler.stop()
+    finally:
+        db.close_pool()
+
+
+if __name__ == '__main__':
+    main()
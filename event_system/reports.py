@@ -1,69 +1,147 @@
 # reports.py
 # Generates statistics and handles CSV exports for event attendance.
+# Bulk exports of many events to Parquet or Arrow files need pyarrow.
 
 import csv
+import datetime
 import os
 from . import db
+from . import metrics
 
-def get_event_statistics(event_id):
+EVENT_EXISTS_QUERY = "SELECT event_name FROM EVENTS WHERE event_id = :event_id"
+REGISTERED_COUNT_QUERY = "SELECT COUNT(*) FROM REGISTRATIONS WHERE event_id = :event_id AND status = 'REGISTERED'"
+ATTENDED_COUNT_QUERY = "SELECT COUNT(*) FROM ATTENDANCE WHERE event_id = :event_id AND attended = 'Y'"
+
+# Rows of past events moved out by archive.py; only read when a report asks
+# for them with include_archived=True.
+ARCHIVED_REGISTERED_COUNT_QUERY = "SELECT COUNT(*) FROM REGISTRATIONS_ARCHIVE WHERE event_id = :event_id AND status = 'REGISTERED'"
+ARCHIVED_ATTENDED_COUNT_QUERY = "SELECT COUNT(*) FROM ATTENDANCE_ARCHIVE WHERE event_id = :event_id AND attended = 'Y'"
+
+ATTENDANCE_EXPORT_QUERY = """
+SELECT s.student_id, s.name, COALESCE(a.attended, 'N') AS attendance_status
+FROM REGISTRATIONS r
+JOIN STUDENTS s ON r.student_id = s.student_id
+LEFT JOIN ATTENDANCE a ON r.event_id = a.event_id AND r.student_id = a.student_id
+WHERE r.event_id = :event_id AND r.status = 'REGISTERED'
+"""
+
+ARCHIVED_ATTENDANCE_EXPORT_QUERY = """
+SELECT s.student_id, s.name, COALESCE(a.attended, 'N') AS attendance_status
+FROM REGISTRATIONS_ARCHIVE r
+JOIN STUDENTS s ON r.student_id = s.student_id
+LEFT JOIN ATTENDANCE_ARCHIVE a ON r.event_id = a.event_id AND r.student_id = a.student_id
+WHERE r.event_id = :event_id AND r.status = 'REGISTERED'
+"""
+
+# Registrations with their attendance across many events, for the columnar
+# exports. Filled in with the live or archive tables and an event filter.
+BULK_EXPORT_QUERY = """
+SELECT e.event_id, e.event_name, e.event_date, e.venue, s.student_id, s.name, s.course, s.year,
+       r.reg_date, COALESCE(a.attended, 'N') AS attended, {archived} AS archived
+FROM EVENTS e
+JOIN {registrations} r ON r.event_id = e.event_id
+JOIN STUDENTS s ON r.student_id = s.student_id
+LEFT JOIN {attendance} a ON r.event_id = a.event_id AND r.student_id = a.student_id
+WHERE r.status = 'REGISTERED' AND {event_filter}
+"""
+
+EXPORT_FORMATS = ('parquet', 'arrow')
+EXPORT_BATCH_SIZE = 50000
+
+def _statistics(total_registered, total_attended):
+    # Calculate attendance percentage
+    percentage = (total_attended / total_registered) * 100 if total_registered > 0 else 0
+
+    return {
+        'registered': total_registered,
+        'attended': total_attended,
+        'percentage': round(percentage, 2)
+    }
+
+@metrics.track_query
+def get_event_statistics(event_id, include_archived=False):
     """
     Calculates attendance statistics for a specific event.
+    With `include_archived`, rows moved to the archive tables are counted too.
     """
     try:
         with db.get_connection() as conn:
-            with conn.cursor() as cursor:
+            with db.cursor(conn) as cursor:
                 # Check if event exists
-                cursor.execute("SELECT event_name FROM EVENTS WHERE event_id = :event_id", {'event_id': event_id})
+                cursor.execute(EVENT_EXISTS_QUERY, {'event_id': event_id})
                 if not cursor.fetchone():
                     print(f"No event found with ID: {event_id}")
                     return None
 
                 # Get total registered students
-                cursor.execute("SELECT COUNT(*) FROM REGISTRATIONS WHERE event_id = :event_id", {'event_id': event_id})
+                cursor.execute(REGISTERED_COUNT_QUERY, {'event_id': event_id})
                 total_registered = cursor.fetchone()[0]
 
                 # Get total attended students
-                cursor.execute(
-                    "SELECT COUNT(*) FROM ATTENDANCE WHERE event_id = :event_id AND attended = 'Y'",
-                    {'event_id': event_id}
-                )
+                cursor.execute(ATTENDED_COUNT_QUERY, {'event_id': event_id})
                 total_attended = cursor.fetchone()[0]
 
-                # Calculate attendance percentage
-                percentage = (total_attended / total_registered) * 100 if total_registered > 0 else 0
+                if include_archived:
+                    cursor.execute(ARCHIVED_REGISTERED_COUNT_QUERY, {'event_id': event_id})
+                    total_registered += cursor.fetchone()[0]
+                    cursor.execute(ARCHIVED_ATTENDED_COUNT_QUERY, {'event_id': event_id})
+                    total_attended += cursor.fetchone()[0]
+
+                return _statistics(total_registered, total_attended)
+    except Exception as e:
+        print(f"Error calculating statistics for event {event_id}: {e}")
+        return None
+
+@metrics.track_query
+async def get_event_statistics_async(event_id, include_archived=False):
+    """
+    Async version of get_event_statistics() for the asyncio web tier.
+    """
+    try:
+        async with db.get_async_connection() as conn:
+            with db.async_cursor(conn) as cursor:
+                await cursor.execute(EVENT_EXISTS_QUERY, {'event_id': event_id})
+                if not await cursor.fetchone():
+                    print(f"No event found with ID: {event_id}")
+                    return None
+
+                await cursor.execute(REGISTERED_COUNT_QUERY, {'event_id': event_id})
+                total_registered = (await cursor.fetchone())[0]
+
+                await cursor.execute(ATTENDED_COUNT_QUERY, {'event_id': event_id})
+                total_attended = (await cursor.fetchone())[0]
 
-                return {
-                    'registered': total_registered,
-                    'attended': total_attended,
-                    'percentage': round(percentage, 2)
-                }
+                if include_archived:
+                    await cursor.execute(ARCHIVED_REGISTERED_COUNT_QUERY, {'event_id': event_id})
+                    total_registered += (await cursor.fetchone())[0]
+                    await cursor.execute(ARCHIVED_ATTENDED_COUNT_QUERY, {'event_id': event_id})
+                    total_attended += (await cursor.fetchone())[0]
+
+                return _statistics(total_registered, total_attended)
     except Exception as e:
         print(f"Error calculating statistics for event {event_id}: {e}")
         return None
 
-def export_attendance_to_csv(event_id, full_file_path):
+@metrics.track_query
+def export_attendance_to_csv(event_id, full_file_path, include_archived=False):
     """
     Exports the attendance list for an event to a CSV file.
     Expects `full_file_path` to be the complete path including filename.
+    With `include_archived`, archived registrations are exported too.
     """
     try:
         with db.get_connection() as conn:
-            with conn.cursor() as cursor:
+            with db.cursor(conn) as cursor:
                 # Check if event exists (optional, as registrations check implicitly)
                 cursor.execute("SELECT event_name FROM EVENTS WHERE event_id = :event_id", {'event_id': event_id})
                 if not cursor.fetchone():
                     return "Error: Event not found."
 
                 # Fetch the attendance data
-                query = """
-                SELECT s.student_id, s.name, NVL(a.attended, 'N') AS attendance_status
-                FROM REGISTRATIONS r
-                JOIN STUDENTS s ON r.student_id = s.student_id
-                LEFT JOIN ATTENDANCE a ON r.event_id = a.event_id AND r.student_id = a.student_id
-                WHERE r.event_id = :event_id
-                ORDER BY s.name
-                """
-                cursor.execute(query, {'event_id': event_id})
+                query = ATTENDANCE_EXPORT_QUERY
+                if include_archived:
+                    query += "UNION ALL" + ARCHIVED_ATTENDANCE_EXPORT_QUERY
+                cursor.execute(query + "ORDER BY 2", {'event_id': event_id})
                 attendance_data = cursor.fetchall()
                 
                 if not attendance_data:
@@ -80,3 +158,137 @@ def export_attendance_to_csv(event_id, full_file_path):
     except Exception as e:
         print(f"Error exporting attendance to CSV for event {event_id}: {e}")
         return f"Error: Failed to export attendance data. Reason: {e}"
+
+
+def _export_schema(pa):
+    # Event and course values repeat on every row, so they are dictionary-encoded.
+    return pa.schema([
+        ('event_id', pa.int64()),
+        ('event_name', pa.dictionary(pa.int32(), pa.string())),
+        ('event_date', pa.date32()),
+        ('venue', pa.dictionary(pa.int32(), pa.string())),
+        ('student_id', pa.string()),
+        ('student_name', pa.string()),
+        ('course', pa.dictionary(pa.int32(), pa.string())),
+        ('year', pa.int16()),
+        ('reg_date', pa.timestamp('us')),
+        ('attended', pa.bool_()),
+        ('archived', pa.bool_()),
+    ])
+
+class _GrowingDictionary:
+    """
+    Codes for one dictionary-encoded column. New values are only ever
+    appended, so each batch's dictionary extends the previous batch's and
+    Arrow writes just the new values (a dictionary delta).
+    """
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+
+    def encode(self, pa, column):
+        indices = []
+        for value in column:
+            if value is None:
+                indices.append(None)
+                continue
+            code = self.codes.get(value)
+            if code is None:
+                code = self.codes[value] = len(self.values)
+                self.values.append(value)
+            indices.append(code)
+        return pa.DictionaryArray.from_arrays(pa.array(indices, pa.int32()), pa.array(self.values, pa.string()))
+
+def _record_batch(pa, schema, rows, dictionaries):
+    arrays = []
+    for field, column in zip(schema, zip(*rows)):
+        if field.name in dictionaries:
+            arrays.append(dictionaries[field.name].encode(pa, column))
+        elif field.name == 'attended':
+            arrays.append(pa.array([value == 'Y' for value in column], pa.bool_()))
+        elif field.name == 'archived':
+            arrays.append(pa.array([bool(value) for value in column], pa.bool_()))
+        else:
+            arrays.append(pa.array(column, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+def _bulk_export_queries(date_from, date_to, event_ids, include_archived):
+    """Yields (statement, params); one per chunk of `event_ids`, else one for the date range."""
+    if event_ids:
+        filters = [db.bind_list(chunk) for chunk in db.chunked(list(event_ids))]
+        filters = [(f"e.event_id IN ({in_list})", params) for in_list, params in filters]
+    else:
+        # Dates are inclusive; either end may be open.
+        filters = [("e.event_date >= :date_from AND e.event_date < :date_to", {
+            'date_from': date_from or datetime.date(1900, 1, 1),
+            'date_to': date_to + datetime.timedelta(days=1) if date_to else datetime.date(9999, 12, 31),
+        })]
+    for event_filter, params in filters:
+        query = BULK_EXPORT_QUERY.format(archived=0, registrations='REGISTRATIONS', attendance='ATTENDANCE',
+                                         event_filter=event_filter)
+        if include_archived:
+            query += "UNION ALL" + BULK_EXPORT_QUERY.format(
+                archived=1, registrations='REGISTRATIONS_ARCHIVE', attendance='ATTENDANCE_ARCHIVE',
+                event_filter=event_filter)
+        # No ORDER BY: sorting the whole export would hold it in (temp) memory.
+        yield query, params
+
+@metrics.track_query
+def export_attendance_columnar(full_file_path, file_format='parquet', date_from=None, date_to=None,
+                               event_ids=None, include_archived=True, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Exports the registrations and attendance of many events to one Parquet or
+    Arrow IPC (Feather v2) file, one row per registered student per event.
+
+    Events are selected by `event_ids`, or else by event date between
+    `date_from` and `date_to` (inclusive, either may be None; both None
+    exports every event). Rows are streamed from the database with fetchmany()
+    and written as record batches of `batch_size` rows, so memory use does
+    not grow with the export.
+    """
+    if file_format not in EXPORT_FORMATS:
+        return f"Error: Unknown export format '{file_format}'. Use one of: {', '.join(EXPORT_FORMATS)}."
+    try:
+        import pyarrow as pa
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        return "Error: pyarrow is required for Parquet and Arrow exports (pip install pyarrow)."
+
+    schema = _export_schema(pa)
+    dictionaries = {name: _GrowingDictionary() for name in ('event_name', 'venue', 'course')}
+    writer = None
+    total_rows = 0
+    exported_events = set()
+    try:
+        with db.get_connection() as conn:
+            with db.cursor(conn) as cursor:
+                for query, params in _bulk_export_queries(date_from, date_to, event_ids, include_archived):
+                    cursor.execute(query, params)
+                    while True:
+                        rows = cursor.fetchmany(batch_size)
+                        if not rows:
+                            break
+                        if writer is None:
+                            if file_format == 'parquet':
+                                writer = pyarrow.parquet.ParquetWriter(full_file_path, schema)
+                            else:
+                                options = pyarrow.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+                                writer = pyarrow.ipc.new_file(full_file_path, schema, options=options)
+                        writer.write_batch(_record_batch(pa, schema, rows, dictionaries))
+                        total_rows += len(rows)
+                        exported_events.update(row[0] for row in rows)
+        if writer is None:
+            return "Info: No registrations found for the selected events. Nothing to export."
+        writer.close()
+        writer = None
+        return (f"Success: {total_rows:,} registrations of {len(exported_events):,} events "
+                f"exported to {os.path.abspath(full_file_path)}")
+
+    except Exception as e:
+        print(f"Error exporting attendance to {file_format}: {e}")
+        if writer is not None:
+            writer.close()
+            os.remove(full_file_path)
+        return f"Error: Failed to export attendance data. Reason: {e}"
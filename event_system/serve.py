@@ -0,0 +1,66 @@
+# serve.py
+# Production server for the web UI: pre-forked worker processes, each with a
+# pool of request threads and its own database connection pool.
+
+from .config import WEB_CONFIG
+from . import db
+from . import live
+from . import reminders
+
+
+def _post_fork(server, worker):
+    """Creates the worker's own connection pool and reminder scheduler once it has been forked."""
+    db.init_pool()
+    # Each worker competes for the scheduler lease, so one of them sends.
+    reminders.start()
+
+
+def _worker_exit(server, worker):
+    """Closes the worker's pool after in-flight requests have drained."""
+    db.close_pool()
+
+
+def run(bind=None, workers=None, threads=None):
+    """
+    Serves the web UI with gunicorn.
+
+    Args:
+        bind (str): Address to listen on, e.g. '0.0.0.0:8000'.
+        workers (int): Number of worker processes.
+        threads (int): Number of request threads per worker.
+    """
+    try:
+        from gunicorn.app.base import BaseApplication
+    except ImportError:
+        print("Error: gunicorn is required for --serve mode (pip install gunicorn).")
+        print("It is only available on Unix-like systems; on Windows run a WSGI server such as waitress against event_system.wsgi:application.")
+        return
+
+    from .wsgi import application
+
+    options = {
+        'bind': bind or WEB_CONFIG['bind'],
+        'workers': workers or WEB_CONFIG['workers'],
+        'threads': threads or WEB_CONFIG['threads'],
+        'worker_class': 'gthread',
+        'graceful_timeout': WEB_CONFIG['graceful_timeout'],
+        # The app is imported once in the master and shared copy-on-write by the
+        # workers. This is safe because importing it creates no connections.
+        'preload_app': True,
+        'post_fork': _post_fork,
+        'worker_exit': _worker_exit,
+    }
+
+    # Before the fork, so every worker inherits it.
+    live.configure(options['workers'], options['threads'])
+
+    class EventSystemServer(BaseApplication):
+        def load_config(self):
+            for key, value in options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return application
+
+    print(f"Serving on http://{options['bind']} with {options['workers']} workers x {options['threads']} threads...")
+    EventSystemServer().run()
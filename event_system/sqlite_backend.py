@@ -0,0 +1,429 @@
+# sqlite_backend.py
+# Storage backend for an embedded SQLite database file.
+#
+# It runs the same data-access code as the Oracle backend, against the same
+# tables and constraints (database_setup_sqlite.sql), without a database
+# server. This makes it suitable for a small single-node deployment, CI and
+# every local benchmark.
+#
+# The few places where the modules' SQL is Oracle-specific are translated here
+# once per statement text:
+#   - ":1, :2" positional binds become "?1, ?2".
+#   - "SELECT ... FOR UPDATE" drops the clause and starts the transaction with
+#     BEGIN IMMEDIATE, which takes SQLite's single write lock right away. That
+#     serializes the capacity check and the insert the same way the row lock
+#     does on Oracle (more coarsely, since SQLite locks the whole database).
+#   - Pagination uses LIMIT/OFFSET (see PAGINATE_CLAUSE).
+#
+# Connections run in WAL mode, so readers never block the writer or each other.
+
+import asyncio
+import datetime
+import functools
+import os
+import queue
+import re
+import sqlite3
+import threading
+
+name = 'sqlite'
+
+DatabaseError = sqlite3.DatabaseError
+IntegrityError = sqlite3.IntegrityError
+
+SCHEMA_FILE = 'database_setup_sqlite.sql'
+
+PAGINATE_CLAUSE = " LIMIT :page_limit OFFSET :page_offset"
+
+BULK_INSERT_HINT = ""
+
+# Applied to every new connection. journal_mode=WAL is persistent in the file;
+# the rest are per connection.
+PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = NORMAL",   # durable at checkpoints; safe with WAL
+    "PRAGMA foreign_keys = ON",      # enforce the same FKs as Oracle
+    "PRAGMA cache_size = -65536",    # 64 MiB page cache per connection
+    "PRAGMA temp_store = MEMORY",    # sorts and temp indexes stay in memory
+    "PRAGMA mmap_size = 268435456",  # read through a 256 MiB memory map
+)
+
+# How long acquire() waits for a free connection before giving up, in seconds.
+ACQUIRE_TIMEOUT = 30
+
+
+# --- Dates ---
+# Oracle DATE columns come back as datetime.datetime, and the modules rely on
+# that. Values are stored as ISO-8601 text, which also sorts correctly.
+
+def _adapt_date(value):
+    return value.isoformat()
+
+
+def _adapt_datetime(value):
+    return value.isoformat(" ")
+
+
+def _convert_date(value):
+    return datetime.datetime.fromisoformat(value.decode())
+
+
+sqlite3.register_adapter(datetime.date, _adapt_date)
+sqlite3.register_adapter(datetime.datetime, _adapt_datetime)
+sqlite3.register_converter("DATE", _convert_date)
+
+
+# --- Statement translation ---
+
+_POSITIONAL_BIND = re.compile(r"'(?:[^']|'')*'|:(\d+)")
+_FOR_UPDATE = re.compile(r"\s+FOR\s+UPDATE(?:\s+(?:NOWAIT|SKIP\s+LOCKED|WAIT\s+\d+))?\s*$", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=512)
+def translate(statement):
+    """
+    Rewrites Oracle-specific syntax in `statement`.
+    Returns (statement, needs_write_lock).
+    """
+    statement = _POSITIONAL_BIND.sub(lambda m: f"?{m.group(1)}" if m.group(1) else m.group(0), statement)
+    statement, locks = _FOR_UPDATE.subn("", statement)
+    return statement, locks > 0
+
+
+class Cursor:
+    """A sqlite3 cursor that accepts the modules' Oracle-flavoured SQL."""
+
+    def __init__(self, connection):
+        self._connection = connection
+        self._cursor = connection.cursor()
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def close(self):
+        self._cursor.close()
+
+    def execute(self, statement, parameters=None):
+        statement, needs_write_lock = translate(statement)
+        if needs_write_lock and not self._connection.in_transaction:
+            self._connection.execute("BEGIN IMMEDIATE")
+        self._cursor.execute(statement, () if parameters is None else parameters)
+        return self
+
+    def executemany(self, statement, parameters):
+        statement, _ = translate(statement)
+        self._cursor.executemany(statement, parameters)
+
+
+class Connection:
+    """
+    A pooled connection. Like a pooled oracledb connection, close() (or
+    leaving a `with` block) rolls back anything uncommitted and returns it to
+    the pool.
+    """
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def cursor(self):
+        return Cursor(self._raw)
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        raw, self._raw = self._raw, None
+        if raw is not None:
+            self._pool._release(raw)
+
+
+class ConnectionPool:
+    """
+    A fixed-size pool of connections to one database file. `busy`, `opened`
+    and `max` mirror the oracledb pool attributes reported on /metrics.
+    """
+
+    def __init__(self, path, min, max, busy_timeout_ms):
+        self.path = path
+        self.max = max
+        self.busy_timeout_ms = busy_timeout_ms
+        self.busy = 0
+        self.opened = 0
+        self._closed = False
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max)
+        self._idle = queue.LifoQueue()  # most recently used first, its pages are warm
+        for _ in range(min):
+            self._idle.put(self._connect())
+
+    def _connect(self):
+        raw = connect_raw(self.path, self.busy_timeout_ms)
+        with self._lock:
+            self.opened += 1
+        return raw
+
+    def acquire(self):
+        if self._closed:
+            raise DatabaseError("The connection pool is closed.")
+        if not self._slots.acquire(timeout=ACQUIRE_TIMEOUT):
+            raise DatabaseError(f"Timed out after {ACQUIRE_TIMEOUT}s waiting for a pooled connection.")
+        try:
+            try:
+                raw = self._idle.get_nowait()
+            except queue.Empty:
+                raw = self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            self.busy += 1
+        return Connection(self, raw)
+
+    def _release(self, raw):
+        try:
+            if raw.in_transaction:
+                raw.rollback()
+        finally:
+            with self._lock:
+                self.busy -= 1
+            if self._closed:
+                raw.close()
+                with self._lock:
+                    self.opened -= 1
+            else:
+                self._idle.put(raw)
+            self._slots.release()
+
+    def close(self, force=False):
+        """Closes idle connections; busy ones are closed when released."""
+        self._closed = True
+        while True:
+            try:
+                raw = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            raw.close()
+            with self._lock:
+                self.opened -= 1
+
+
+# --- asyncio ---
+# sqlite3 has no asyncio interface, so statements run in the default thread
+# pool. The objects below follow the python-oracledb asyncio API that the
+# *_async read functions use.
+
+class AsyncCursor:
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    @property
+    def description(self):
+        return self._cursor.description
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
+    def close(self):
+        self._cursor.close()
+
+    async def execute(self, statement, parameters=None):
+        await asyncio.to_thread(self._cursor.execute, statement, parameters)
+
+    async def fetchone(self):
+        return await asyncio.to_thread(self._cursor.fetchone)
+
+    async def fetchmany(self, size=None):
+        if size is None:
+            return await asyncio.to_thread(self._cursor.fetchmany)
+        return await asyncio.to_thread(self._cursor.fetchmany, size)
+
+    async def fetchall(self):
+        return await asyncio.to_thread(self._cursor.fetchall)
+
+
+class AsyncConnection:
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self):
+        return AsyncCursor(self._connection.cursor())
+
+    async def commit(self):
+        await asyncio.to_thread(self._connection.commit)
+
+
+class _AsyncAcquire:
+    def __init__(self, pool):
+        self._pool = pool
+        self._connection = None
+
+    async def __aenter__(self):
+        self._connection = await asyncio.to_thread(self._pool.acquire)
+        return AsyncConnection(self._connection)
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._connection.close()
+        return False
+
+
+class AsyncConnectionPool:
+    def __init__(self, pool):
+        self._pool = pool
+
+    @property
+    def busy(self):
+        return self._pool.busy
+
+    @property
+    def opened(self):
+        return self._pool.opened
+
+    @property
+    def max(self):
+        return self._pool.max
+
+    def acquire(self):
+        return _AsyncAcquire(self._pool)
+
+    async def close(self, force=False):
+        self._pool.close(force)
+
+
+# --- Backend interface (see oracle_backend.py) ---
+
+def connect_raw(path, busy_timeout_ms=5000):
+    """Opens a sqlite3 connection with the tuned pragmas applied."""
+    raw = sqlite3.connect(
+        path,
+        timeout=busy_timeout_ms / 1000.0,  # wait for the write lock instead of failing
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        check_same_thread=False,  # pooled connections move between threads, one at a time
+        uri=path.startswith("file:"),
+    )
+    for pragma in PRAGMAS:
+        raw.execute(pragma)
+    return raw
+
+
+def create_pool(config, min, max):
+    return ConnectionPool(config["sqlite_path"], min, max, config["sqlite_busy_timeout_ms"])
+
+
+def create_pool_async(config, min, max):
+    return AsyncConnectionPool(create_pool(config, min, max))
+
+
+def connect(config):
+    return connect_raw(config["sqlite_path"], config["sqlite_busy_timeout_ms"])
+
+
+def gather_statistics(connection, tables):
+    """Refreshes the query planner's statistics (sqlite_stat1) after a bulk load."""
+    with connection.cursor() as cursor:
+        for table in tables:
+            cursor.execute(f"ANALYZE {table}")
+    connection.commit()
+
+
+def is_unique_violation(error, constraint, column):
+    """SQLite reports the columns ("UNIQUE constraint failed: USERS.username"), not the name."""
+    message = str(error)
+    return "UNIQUE constraint failed" in message and column.lower() in message.lower()
+
+
+# SQLite cannot add a constraint to an existing table without rebuilding it,
+# so migrations.py skips constraint additions; new databases get them from
+# the schema script.
+SUPPORTS_ADD_CONSTRAINT = False
+
+# AUTOINCREMENT keys take the place of Oracle's sequences.
+USES_SEQUENCES = False
+
+
+def object_exists(cursor, kind, name):
+    """
+    True if the database has a table or index called `name`, or a column
+    `name` ("TABLE.column"). Constraints are not catalogued.
+    """
+    if kind in ('constraint', 'sequence'):
+        return False
+    if kind == 'column':
+        table, _, column = name.partition('.')
+        cursor.execute("SELECT COUNT(*) FROM pragma_table_info(:table) WHERE name = :column COLLATE NOCASE",
+                       {'table': table, 'column': column})
+        return cursor.fetchone()[0] > 0
+    cursor.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = :kind AND name = :name COLLATE NOCASE",
+                   {'kind': kind, 'name': name})
+    return cursor.fetchone()[0] > 0
+
+
+def insert_returning_id(cursor, statement, parameters, column):
+    """Runs an INSERT and returns the new row's `column`, which must be its INTEGER PRIMARY KEY."""
+    cursor.execute(statement, parameters)
+    return cursor.lastrowid
+
+
+_TABLE_SCAN = re.compile(r"SCAN (\w+)$")
+_SUBQUERY = re.compile(r"(?:CO-ROUTINE|MATERIALIZE) (\w+)")
+
+
+def explain(cursor, statement, parameters=None):
+    """
+    Returns SQLite's query plan for `statement` as (step, table) pairs, one
+    per plan line; `table` (the name or alias) is set for full table scans.
+    """
+    cursor.execute("EXPLAIN QUERY PLAN " + statement, parameters or {})
+    depths = {0: -1}
+    subqueries = {'CONSTANT'}  # scanning a subquery's rows is not a table scan
+    steps = []
+    for node, parent, _, detail in cursor.fetchall():
+        depths[node] = depths.get(parent, -1) + 1
+        subquery = _SUBQUERY.match(detail)
+        if subquery:
+            subqueries.add(subquery.group(1))
+        match = _TABLE_SCAN.match(detail)
+        table = match.group(1) if match and match.group(1) not in subqueries else None
+        steps.append(("  " * depths[node] + detail, table))
+    return steps
+
+
+def create_schema(path):
+    """(Re)creates all tables in the database file at `path`."""
+    schema_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), SCHEMA_FILE)
+    with open(schema_path, 'r') as f:
+        script = f.read()
+    raw = connect_raw(path)
+    try:
+        raw.executescript(script)
+        raw.commit()
+    finally:
+        raw.close()
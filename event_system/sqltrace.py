@@ -0,0 +1,260 @@
+# sqltrace.py
+# Statement-level timing and slow-query logging for the data-access modules.
+#
+# All modules open cursors through db.cursor(conn) (db.async_cursor(conn) in
+# the *_async functions of the asyncio web tier). When tracing is disabled
+# (the default) that returns the driver's own cursor, so the only cost is a
+# single flag check. When enabled, the cursor is wrapped in a TracedCursor that
+# records the normalized statement text, bind count, rows returned and elapsed
+# time of every statement, feeds the /metrics histograms, and writes a
+# structured (JSON) log line for statements slower than the threshold.
+# Tools can also register listeners that see every traced statement with its
+# binds (e.g. benchmarks/check_plans.py, which collects statements to explain).
+
+import functools
+import json
+import logging
+import re
+import time
+
+from . import metrics
+from .config import SQL_TRACE_CONFIG
+
+logger = logging.getLogger("event_system.sql")
+
+enabled = SQL_TRACE_CONFIG['enabled']
+slow_query_seconds = SQL_TRACE_CONFIG['slow_query_ms'] / 1000.0
+
+STATEMENT_DURATION = metrics.REGISTRY.histogram(
+    "event_system_db_statement_duration_seconds",
+    "Execution plus fetch time of individual SQL statements (only while SQL tracing is enabled).",
+    ("statement",)
+)
+SLOW_STATEMENTS = metrics.REGISTRY.counter(
+    "event_system_db_slow_statements_total",
+    "SQL statements slower than the slow-query threshold.",
+    ("statement",)
+)
+STATEMENT_ERRORS = metrics.REGISTRY.counter(
+    "event_system_db_statement_errors_total",
+    "SQL statements that raised a database error.",
+    ("statement",)
+)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w:.])\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+# A list of binds such as db.bind_list() builds for one chunk of IDs.
+_BIND_LIST = re.compile(r"\bIN\s*\(\s*:\w+(?:\s*,\s*:\w+)*\s*\)", re.IGNORECASE)
+
+
+@functools.lru_cache(maxsize=512)
+def normalize(statement):
+    """
+    Collapses whitespace and replaces literals with '?', so that the same
+    statement always produces the same text regardless of formatting.
+    Bind lists ("IN (:b0, :b1, ...)") become "IN (…)", so a statement run
+    for chunks of different sizes still maps to a single metric label.
+    """
+    text = _BIND_LIST.sub("IN (…)", statement)
+    text = _STRING_LITERAL.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    return _WHITESPACE.sub(" ", text).strip()
+
+
+def enable(slow_query_ms=None):
+    """Turns statement tracing on for this process."""
+    global enabled, slow_query_seconds
+    if slow_query_ms is not None:
+        slow_query_seconds = slow_query_ms / 1000.0
+    enabled = True
+
+
+def disable():
+    """Turns statement tracing off for this process."""
+    global enabled
+    enabled = False
+
+
+_listeners = []
+
+
+def add_listener(listener):
+    """Calls listener(statement, parameters, many) before every traced statement."""
+    _listeners.append(listener)
+
+
+def remove_listener(listener):
+    _listeners.remove(listener)
+
+
+def _bind_count(parameters, many=False):
+    if not parameters:
+        return 0
+    if many:
+        return sum(len(row) for row in parameters)
+    return len(parameters)
+
+
+class TracedCursor:
+    """
+    Wraps a driver cursor and records one trace entry per statement. A
+    statement's entry is finalized when the next statement runs or the cursor
+    closes, so rows fetched after execute() are included.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._pending = None
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._count(1)
+            yield row
+
+    def close(self):
+        self._finish()
+        self._cursor.close()
+
+    def execute(self, statement, parameters=None, **kwargs):
+        return self._run(self._cursor.execute, statement, parameters, False, kwargs)
+
+    def executemany(self, statement, parameters, **kwargs):
+        return self._run(self._cursor.executemany, statement, parameters, True, kwargs)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._count(1 if row is not None else 0, time.perf_counter() - start)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        start = time.perf_counter()
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._count(len(rows), time.perf_counter() - start)
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._count(len(rows), time.perf_counter() - start)
+        return rows
+
+    def _run(self, method, statement, parameters, many, kwargs):
+        start = self._begin(statement, parameters, many)
+        try:
+            if parameters is None:
+                result = method(statement, **kwargs)
+            else:
+                result = method(statement, parameters, **kwargs)
+        except Exception as e:
+            self._failed(statement, parameters, many, start, e)
+            raise
+        self._executed(statement, parameters, many, start)
+        return result
+
+    def _begin(self, statement, parameters, many):
+        self._finish()
+        for listener in _listeners:
+            listener(statement, parameters, many)
+        return time.perf_counter()
+
+    def _failed(self, statement, parameters, many, start, error):
+        normalized = normalize(statement)
+        STATEMENT_ERRORS.inc(statement=normalized)
+        logger.error(json.dumps({
+            'event': 'sql_error',
+            'statement': normalized,
+            'binds': _bind_count(parameters, many),
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 3),
+            'error': str(error),
+        }))
+
+    def _executed(self, statement, parameters, many, start):
+        self._pending = {
+            'statement': statement,
+            'binds': _bind_count(parameters, many),
+            'elapsed': time.perf_counter() - start,
+            'rows': 0,
+            'is_query': self._cursor.description is not None,
+        }
+
+    def _count(self, rows, elapsed=0.0):
+        if self._pending is not None:
+            self._pending['rows'] += rows
+            self._pending['elapsed'] += elapsed
+
+    def _finish(self):
+        entry, self._pending = self._pending, None
+        if entry is None:
+            return
+        rows = entry['rows'] if entry['is_query'] else max(self._cursor.rowcount or 0, 0)
+        normalized = normalize(entry['statement'])
+        STATEMENT_DURATION.observe(entry['elapsed'], statement=normalized)
+        if entry['elapsed'] >= slow_query_seconds:
+            SLOW_STATEMENTS.inc(statement=normalized)
+            logger.warning(json.dumps({
+                'event': 'slow_query',
+                'statement': normalized,
+                'binds': entry['binds'],
+                'rows': rows,
+                'elapsed_ms': round(entry['elapsed'] * 1000, 3),
+                'threshold_ms': round(slow_query_seconds * 1000, 3),
+            }))
+
+
+class AsyncTracedCursor(TracedCursor):
+    """
+    TracedCursor for the cursors of the asyncio pool, whose execute and fetch
+    methods are coroutines. Elapsed times include waiting for the event loop.
+    """
+
+    def __iter__(self):
+        raise TypeError("Async cursors are read with the fetch methods.")
+
+    async def execute(self, statement, parameters=None, **kwargs):
+        return await self._run_async(self._cursor.execute, statement, parameters, False, kwargs)
+
+    async def executemany(self, statement, parameters, **kwargs):
+        return await self._run_async(self._cursor.executemany, statement, parameters, True, kwargs)
+
+    async def fetchone(self):
+        start = time.perf_counter()
+        row = await self._cursor.fetchone()
+        self._count(1 if row is not None else 0, time.perf_counter() - start)
+        return row
+
+    async def fetchmany(self, *args, **kwargs):
+        start = time.perf_counter()
+        rows = await self._cursor.fetchmany(*args, **kwargs)
+        self._count(len(rows), time.perf_counter() - start)
+        return rows
+
+    async def fetchall(self):
+        start = time.perf_counter()
+        rows = await self._cursor.fetchall()
+        self._count(len(rows), time.perf_counter() - start)
+        return rows
+
+    async def _run_async(self, method, statement, parameters, many, kwargs):
+        start = self._begin(statement, parameters, many)
+        try:
+            if parameters is None:
+                result = await method(statement, **kwargs)
+            else:
+                result = await method(statement, parameters, **kwargs)
+        except Exception as e:
+            self._failed(statement, parameters, many, start, e)
+            raise
+        self._executed(statement, parameters, many, start)
+        return result
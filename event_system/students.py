@@ -2,11 +2,12 @@
 # Handles student creation and listing.
 
 from . import db
+from . import metrics
 
 import re
 from . import db
-import oracledb
 
+@metrics.track_query
 def add_student(student_id, name, email, course, year):
     """
     Adds a new student to the database after validating inputs.
@@ -29,7 +30,7 @@ def add_student(student_id, name, email, course, year):
 
     try:
         with db.get_connection() as conn:
-            with conn.cursor() as cursor:
+            with db.cursor(conn) as cursor:
                 # Check for existing student ID
                 cursor.execute("SELECT student_id FROM STUDENTS WHERE student_id = :1", [student_id])
                 if cursor.fetchone():
@@ -53,20 +54,22 @@ def add_student(student_id, name, email, course, year):
                 })
                 conn.commit()
                 return "Success: Student added successfully."
-    except oracledb.DatabaseError as e:
+    except db.DatabaseError as e:
         return f"A database error occurred: {e}"
     except Exception as e:
         return f"An unexpected error occurred: {e}"
 
-def get_all_students():
+@metrics.track_query
+def get_all_students(limit=None, offset=0):
     """
-    Retrieves a list of all students from the database.
+    Retrieves a list of all students from the database, ordered by name.
+    Pass `limit`/`offset` to fetch a single page.
     """
     try:
         with db.get_connection() as conn:
-            with conn.cursor() as cursor:
-                query = "SELECT student_id, name, email, course, year FROM STUDENTS ORDER BY name"
-                cursor.execute(query)
+            with db.cursor(conn) as cursor:
+                query = "SELECT student_id, name, email, course, year FROM STUDENTS ORDER BY name, student_id"
+                cursor.execute(*db.paginate(query, limit=limit, offset=offset))
                 return cursor.fetchall()
     except Exception as e:
         print(f"Error fetching students: {e}")
@@ -1,8 +1,10 @@
 import tkinter as tk
 from tkinter import messagebox, ttk, filedialog
 from ttkthemes import ThemedTk
-from . import auth, events, registrations, attendance, reports, email_utils, students, db
+from . import auth, events, registrations, attendance, reports, email_utils, email_templates, email_builder, students, db, campaigns
 import datetime
+import mimetypes
+import os
 
 class EventSystemUI(ThemedTk):
     """
@@ -381,6 +383,32 @@ class EmailNotificationScreen(ttk.Frame):
 
         self.message_text = tk.Text(message_frame, height=10, width=70, font=("Arial", 12))
         self.message_text.pack(pady=5, padx=5, fill="both", expand=True)
+
+        attachment_frame = ttk.LabelFrame(self, text="Attachments")
+        attachment_frame.pack(pady=10, padx=10, fill="x")
+
+        self.attach_invite = tk.BooleanVar(value=True)
+        ttk.Checkbutton(attachment_frame, text="Calendar invite (.ics)", variable=self.attach_invite).pack(side="left", padx=5)
+
+        self.agenda_path = tk.StringVar()
+        ttk.Button(attachment_frame, text="Choose Agenda...", command=self.handle_choose_agenda).pack(side="left", padx=5)
+        ttk.Label(attachment_frame, textvariable=self.agenda_path).pack(side="left", padx=5)
+
+        status_frame = ttk.LabelFrame(self, text="Delivery Status for Selected Event")
+        status_frame.pack(pady=10, padx=10, fill="both", expand=True)
+
+        self.campaign_tree = ttk.Treeview(status_frame, columns=("ID", "Created", "Subject", "Recipients", "Sent", "Failed", "Pending"),
+                                          show='headings', height=5)
+        for column, width in (("ID", 50), ("Created", 130), ("Subject", 250), ("Recipients", 80), ("Sent", 60), ("Failed", 60), ("Pending", 60)):
+            self.campaign_tree.heading(column, text=column)
+            self.campaign_tree.column(column, width=width)
+        self.campaign_tree.pack(fill="both", expand=True, side="left")
+
+        status_buttons = ttk.Frame(status_frame)
+        status_buttons.pack(side="right", fill="y", padx=5)
+        ttk.Button(status_buttons, text="Refresh", command=self.populate_campaigns).pack(pady=5, fill="x")
+        ttk.Button(status_buttons, text="Show Failed", command=self.handle_show_failed).pack(pady=5, fill="x")
+        ttk.Button(status_buttons, text="Resend to Failed", command=self.handle_resend_failed).pack(pady=5, fill="x")
         
         action_frame = ttk.Frame(self)
         action_frame.pack(pady=20)
@@ -400,7 +428,76 @@ class EmailNotificationScreen(ttk.Frame):
         self.event_menu['values'] = list(self.event_map.keys())
 
     def handle_event_selection(self, event_arg):
-        pass
+        self.populate_campaigns()
+
+    def populate_campaigns(self):
+        """Lists the selected event's campaigns with their counts (one row read per campaign)."""
+        for item in self.campaign_tree.get_children():
+            self.campaign_tree.delete(item)
+
+        event_id = self.event_map.get(self.selected_event_id.get())
+        if not event_id:
+            return
+        for campaign in campaigns.get_campaigns(event_id):
+            campaign_id, _, _, subject, created_date, _, recipients, sent, failed, pending, _ = campaign
+            self.campaign_tree.insert("", "end", values=(campaign_id, created_date.strftime("%Y-%m-%d %H:%M"), subject,
+                                                         recipients, sent, failed, pending))
+
+    def _selected_campaign(self):
+        selection = self.campaign_tree.selection()
+        if not selection:
+            messagebox.showerror("Error", "Please select a campaign.")
+            return None
+        return self.campaign_tree.item(selection[0])['values'][0]
+
+    def handle_show_failed(self):
+        campaign_id = self._selected_campaign()
+        if campaign_id is None:
+            return
+        failed = campaigns.get_deliveries(campaign_id, campaigns.FAILED, limit=20)
+        if not failed:
+            messagebox.showinfo("Failed Deliveries", f"Campaign {campaign_id} has no failed deliveries.")
+            return
+        lines = [f"{student_id} {email}: {error}" for student_id, _, email, error, _ in failed]
+        messagebox.showinfo("Failed Deliveries", f"Campaign {campaign_id} (first {len(failed)}):\n\n" + "\n".join(lines))
+
+    def handle_resend_failed(self):
+        campaign_id = self._selected_campaign()
+        if campaign_id is None:
+            return
+        if not messagebox.askyesno("Confirm Resend", f"Resend campaign {campaign_id} to its failed recipients?"):
+            return
+        result = campaigns.resend_failed(campaign_id, self._email_completion_callback)
+        if "Success" in result:
+            messagebox.showinfo("Success", result)
+        elif "Info" in result:
+            messagebox.showinfo("Info", result)
+        else:
+            messagebox.showerror("Error", result)
+        self.populate_campaigns()
+
+    def handle_choose_agenda(self):
+        self.agenda_path.set(filedialog.askopenfilename(title="Choose Agenda") or "")
+
+    def _agenda(self):
+        """The chosen agenda as an email_builder.Attachment (read once for the whole send), or None."""
+        path = self.agenda_path.get()
+        if not path:
+            return None
+        with open(path, 'rb') as f:
+            data = f.read()
+        content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        return email_builder.Attachment(os.path.basename(path), content_type, data)
+
+    def _attachments(self, event_id, event):
+        """The attachments selected on the screen."""
+        attachments = []
+        if self.attach_invite.get():
+            attachments.append(email_builder.calendar_invite(event_id, event))
+        agenda = self._agenda()
+        if agenda:
+            attachments.append(agenda)
+        return attachments
 
     def _email_completion_callback(self, results):
         success_count = results.get('success_count', 0)
@@ -428,34 +525,41 @@ class EmailNotificationScreen(ttk.Frame):
         
         _, event_name, event_date, event_time, venue, _ = event_details
         
-        registered_students_data = registrations.get_registered_students(event_id)
-        if not registered_students_data:
-            messagebox.showwarning("No Recipients", "No students are registered for this event.")
-            return
-
-        recipients = [student[2] for student in registered_students_data if student[2]]
-        if not recipients:
-            messagebox.showwarning("No Recipients", "No valid email addresses found for registered students.")
+        # Registered students with a deliverable address, one per address, none suppressed.
+        recipient_count = campaigns.count_recipients(event_id)
+        if not recipient_count:
+            messagebox.showwarning("No Recipients", "No deliverable email addresses found for registered students.")
             return
 
+        # Each student gets their own copy, addressed by name with their check-in code.
         custom_message = self.message_text.get("1.0", tk.END).strip()
-        email_body = email_utils.create_event_notification_email_body(
-            event_name,
-            event_date.strftime("%Y-%m-%d"),
-            event_time,
-            venue,
-            custom_message
-        )
-        
-        email_subject = f"Notification: {event_name}"
+        email_body = email_templates.notification_template(custom_message)
+        email_subject = "Notification: {{ event_name }}"
 
         confirm = messagebox.askyesno("Confirm Send", 
-                                      f"Are you sure you want to send notifications to {len(recipients)} students for '{event_name}'?")
+                                      f"Are you sure you want to send notifications to {recipient_count} students for '{event_name}'?")
         if not confirm:
             return
 
-        messagebox.showinfo("Sending Emails", "Emails are being sent in the background. You will be notified upon completion.")
-        email_utils.send_emails_in_background(recipients, email_subject, email_body, self._email_completion_callback)
+        event = (event_name, event_date, event_time, venue)
+        try:
+            campaign_id, _ = campaigns.start_campaign(
+                event_id, event, email_subject, email_body, attach_invite=self.attach_invite.get(),
+                agenda=self._agenda(), created_by=self.user['username'] if self.user else None,
+                completion_callback=self._email_completion_callback
+            )
+        except email_templates.TemplateError as e:
+            messagebox.showerror("Template Error", str(e))
+            return
+        except OSError as e:
+            messagebox.showerror("Attachment Error", f"Could not read the agenda: {e}")
+            return
+        if campaign_id is None:
+            messagebox.showerror("Error", "Could not record the email campaign.")
+            return
+        self.populate_campaigns()
+        messagebox.showinfo("Sending Emails", f"Campaign {campaign_id}: emails are being sent in the background. "
+                                              "You will be notified upon completion.")
 
     def handle_send_test_email(self):
         current_user_email = email_utils.EMAIL_CONFIG.get("sender_email")
@@ -480,17 +584,24 @@ class EmailNotificationScreen(ttk.Frame):
         
         _, event_name, event_date, event_time, venue, _ = event_details
         custom_message = self.message_text.get("1.0", tk.END).strip()
-        email_body = email_utils.create_event_notification_email_body(
-            event_name,
-            event_date.strftime("%Y-%m-%d"),
-            event_time, 
-            venue,
-            f"THIS IS A TEST EMAIL.\n\n{custom_message}"
-        )
-        email_subject = f"TEST: Notification: {event_name}"
+        email_body = email_templates.notification_template(f"THIS IS A TEST EMAIL.\n\n{custom_message}")
+        email_subject = "TEST: Notification: {{ event_name }}"
 
+        # Rendered for a sample recipient, so the merge fields can be checked.
+        event = (event_name, event_date, event_time, venue)
+        try:
+            email_utils.send_personalized_emails_in_background(
+                event_id, event, email_subject, email_body,
+                [("TEST0001", "Test Recipient", current_user_email)], self._email_completion_callback,
+                attachments=self._attachments(event_id, event)
+            )
+        except email_templates.TemplateError as e:
+            messagebox.showerror("Template Error", str(e))
+            return
+        except OSError as e:
+            messagebox.showerror("Attachment Error", f"Could not read the agenda: {e}")
+            return
         messagebox.showinfo("Sending Test Email", "Sending a test email in the background.")
-        email_utils.send_emails_in_background([current_user_email], email_subject, email_body, self._email_completion_callback)
 
 
 class RegistrationScreen(ttk.Frame):
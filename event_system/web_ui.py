@@ -1,24 +1,97 @@
 import tempfile
-from flask import Flask, render_template, request, redirect, url_for, flash, session, send_file
+from flask import Flask, render_template, request, redirect, url_for, flash, session, send_file, g, Response
 from flask_wtf.csrf import CSRFProtect
-from . import auth, events, registrations, attendance, reports, email_utils, config, students, db
-from .forms import LoginForm, RegistrationForm, StudentForm, EventForm, EventRegistrationForm, CancelRegistrationForm, AttendanceForm, EmailForm
+from . import auth, events, registrations, attendance, reports, email_utils, config, students, db, metrics, live, intake, analytics, forecast, email_templates, email_builder, campaigns, reminders
+from .api import api as api_blueprint
+from .forms import LoginForm, RegistrationForm, StudentForm, EventForm, EventRegistrationForm, CancelRegistrationForm, AttendanceForm, EmailForm, ResendCampaignForm
 import datetime
+import hmac
 import os
+import time
 import atexit
 
 app = Flask(__name__, template_folder='templates', static_folder='static')
-app.secret_key = os.urandom(24)
+# A fixed key lets every worker process validate the same session cookies
+app.secret_key = config.WEB_CONFIG['secret_key'] or os.urandom(24)
 csrf = CSRFProtect(app)
 
-# --- App Lifecycle Management ---
-# Initialize the database connection pool when the app starts
-db.init_pool()
+# JSON API under /api/v1 (see api.py for why it is exempt from CSRF tokens)
+app.register_blueprint(api_blueprint)
+csrf.exempt(api_blueprint)
 
-# Register a function to close the pool when the app exits
-atexit.register(db.close_pool)
+# --- App Lifecycle Management ---
+# Importing this module only builds the Flask app object. Process-level setup
+# (the connection pool and its shutdown hook) happens in create_app(), so
+# importing the module never opens database connections. Without an explicit
+# init_pool, the pool is created lazily by db.get_connection() in the process
+# that serves requests (or per worker by serve.py). The reminder scheduler
+# (REMINDERS_ENABLED) is started the same way: by create_app() for the
+# development server and per worker by serve.py.
+_lifecycle_registered = False
+
+def create_app(init_pool=False, start_reminders=False):
+    """
+    Returns the configured Flask app, registering pool shutdown at exit.
+
+    Args:
+        init_pool (bool): Create the connection pool now instead of on the
+                          first request. Leave False in pre-fork servers.
+        start_reminders (bool): Start the reminder scheduler in this process
+                                (see reminders.py). Leave False in pre-fork
+                                servers.
+    """
+    global _lifecycle_registered
+    if not _lifecycle_registered:
+        # Register a function to close the pool when the app exits
+        atexit.register(db.close_pool)
+        _lifecycle_registered = True
+    if init_pool:
+        db.init_pool()
+    if start_reminders:
+        reminders.start()
+    return app
 # --- End Lifecycle Management ---
 
+# --- Request Metrics ---
+HTTP_REQUESTS = metrics.REGISTRY.counter(
+    "event_system_http_requests_total",
+    "HTTP requests handled, by route, method and status code.",
+    ("route", "method", "status")
+)
+HTTP_LATENCY = metrics.REGISTRY.histogram(
+    "event_system_http_request_duration_seconds",
+    "Time spent handling HTTP requests, by route.",
+    ("route", "method")
+)
+
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _record_request_metrics(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        # Label by endpoint rather than path so the number of series stays bounded
+        route = request.endpoint or 'unmatched'
+        HTTP_LATENCY.observe(time.perf_counter() - start, route=route, method=request.method)
+        HTTP_REQUESTS.inc(route=route, method=request.method, status=str(response.status_code))
+    return response
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """
+    Prometheus-style metrics. They need no login, so that a scraper can read
+    them, but their labels carry routes and normalized SQL text. With
+    METRICS_TOKEN set, requests must send it as "Authorization: Bearer
+    <token>"; without it, only expose the server on an internal interface.
+    """
+    token = config.WEB_CONFIG['metrics_token']
+    if token and not hmac.compare_digest(request.headers.get('Authorization', '').encode(), f"Bearer {token}".encode()):
+        return Response(status=401, headers={'WWW-Authenticate': 'Bearer'})
+    return Response(metrics.REGISTRY.expose(), mimetype=metrics.CONTENT_TYPE)
+# --- End Request Metrics ---
+
 @app.route('/')
 def index():
     if 'username' in session:
@@ -140,7 +213,9 @@ def registrations_page():
         event_id = form.event_id.data
         student_id = form.student_id.data
 
-        result = registrations.register_student_for_event(event_id, student_id)
+        result, position = intake.register(event_id, student_id)
+        if position is not None:
+            result = f"{result} (queue position {position})"
 
         if "Success" in result:
             flash(result, 'success')
@@ -154,10 +229,12 @@ def registrations_page():
     all_events = events.get_all_events()
     selected_event_id = request.args.get('event_id', type=int)
     registered_students = []
+    waitlist = []
     if selected_event_id and session.get('role') == 'admin':
         registered_students = registrations.get_registered_students(selected_event_id)
+        waitlist = registrations.get_waitlist(selected_event_id)
 
-    return render_template('registrations.html', events=all_events, registered_students=registered_students, selected_event_id=selected_event_id, role=session.get('role'), form=form)
+    return render_template('registrations.html', events=all_events, registered_students=registered_students, waitlist=waitlist, selected_event_id=selected_event_id, role=session.get('role'), form=form)
 
 @app.route('/cancel_registration', methods=['POST'])
 def cancel_registration():
@@ -207,6 +284,29 @@ def attendance_page():
 
     return render_template('attendance.html', events=all_events, attendance_list=attendance_list, selected_event_id=selected_event_id, role=session.get('role'), form=form)
 
+@app.route('/events/<int:event_id>/stream')
+def event_stream(event_id):
+    """
+    Streams registration and attendance changes for one event as
+    Server-Sent Events. Viewers share the in-process publisher, so open
+    streams add no database queries. See live.py for when streams are off
+    or full.
+    """
+    if 'username' not in session:
+        return Response(status=401)
+    if not live.enabled:
+        return Response(status=204)
+
+    last_sequence = live.parse_last_event_id(request.headers.get('Last-Event-ID'))
+    subscription = live.publisher.subscribe(event_id, last_sequence, limit=live.max_streams)
+    # EventSource gives up after an error status, so a full server answers
+    # with a stream that only sets a longer reconnect delay.
+    body = live.stream(subscription) if subscription is not None else live.busy()
+    response = Response(body, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx)
+    return response
+
 @app.route('/reports', methods=['GET'])
 def reports_page():
     if 'username' not in session:
@@ -216,9 +316,12 @@ def reports_page():
     selected_event_id = request.args.get('event_id', type=int)
     stats = None
     if selected_event_id:
-        stats = reports.get_event_statistics(selected_event_id)
+        stats = reports.get_event_statistics(selected_event_id, include_archived=True)
+    engagement = analytics.get_engagement_by_group()
+    capacity = forecast.get_forecast()
 
-    return render_template('reports.html', events=all_events, stats=stats, selected_event_id=selected_event_id)
+    return render_template('reports.html', events=all_events, stats=stats, selected_event_id=selected_event_id,
+                           engagement=engagement, capacity=capacity)
 
 @app.route('/reports/export/<int:event_id>')
 def export_csv(event_id):
@@ -231,7 +334,7 @@ def export_csv(event_id):
             full_file_path = tmp.name
         
         # Export the attendance data to the temporary file
-        result = reports.export_attendance_to_csv(event_id, full_file_path)
+        result = reports.export_attendance_to_csv(event_id, full_file_path, include_archived=True)
 
         if "Success" in result:
             return send_file(full_file_path, as_attachment=True, download_name=f'attendance_event_{event_id}.csv')
@@ -244,6 +347,65 @@ def export_csv(event_id):
         return redirect(url_for('reports_page'))
 
 
+@app.route('/reports/export')
+def export_columnar():
+    """Downloads the registrations and attendance of a date range as one Parquet or Arrow file."""
+    if 'username' not in session:
+        return redirect(url_for('login'))
+
+    file_format = request.args.get('format', 'parquet')
+    if file_format not in reports.EXPORT_FORMATS:
+        flash(f"Error: Unknown export format '{file_format}'.", 'danger')
+        return redirect(url_for('reports_page'))
+    try:
+        date_from = datetime.date.fromisoformat(request.args['date_from']) if request.args.get('date_from') else None
+        date_to = datetime.date.fromisoformat(request.args['date_to']) if request.args.get('date_to') else None
+    except ValueError:
+        flash("Error: Dates must be in YYYY-MM-DD format.", 'danger')
+        return redirect(url_for('reports_page'))
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_format}') as tmp:
+        full_file_path = tmp.name
+    result = reports.export_attendance_columnar(full_file_path, file_format, date_from, date_to)
+    if not result.startswith("Success"):
+        os.remove(full_file_path)
+        flash(result, 'danger' if result.startswith("Error") else 'info')
+        return redirect(url_for('reports_page'))
+
+    def stream():
+        # The file is removed once the download ends (or is aborted).
+        try:
+            with open(full_file_path, 'rb') as f:
+                while True:
+                    chunk = f.read(1024 * 1024)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            os.remove(full_file_path)
+
+    download_name = f"attendance_{date_from or 'start'}_to_{date_to or 'end'}.{file_format}"
+    response = Response(stream(), mimetype='application/octet-stream')
+    response.headers['Content-Disposition'] = f'attachment; filename={download_name}'
+    response.headers['Content-Length'] = os.path.getsize(full_file_path)
+    return response
+
+
+# Campaigns listed on /emails, and failed recipients shown for the selected one.
+CAMPAIGNS_SHOWN = 20
+FAILED_DELIVERIES_SHOWN = 100
+
+def _emails_page(form):
+    """Renders the email page: the compose form and the campaign status view."""
+    campaign_id = request.args.get('campaign_id', type=int)
+    campaign = campaigns.get_campaign(campaign_id) if campaign_id else None
+    failed_deliveries = []
+    if campaign and campaign[8]:
+        failed_deliveries = campaigns.get_deliveries(campaign_id, campaigns.FAILED, limit=FAILED_DELIVERIES_SHOWN)
+    return render_template('emails.html', form=form, merge_fields=email_templates.MERGE_FIELDS,
+                           campaigns=campaigns.get_campaigns(limit=CAMPAIGNS_SHOWN), campaign=campaign,
+                           failed_deliveries=failed_deliveries, stalled=campaign and campaigns.is_stalled(campaign))
+
 @app.route('/emails', methods=['GET', 'POST'])
 def emails_page():
     if 'username' not in session or session.get('role') != 'admin':
@@ -261,30 +423,74 @@ def emails_page():
             flash("Error: Could not retrieve event details.", 'danger')
             return redirect(url_for('emails_page'))
 
-        _, event_name, _, _, _, _ = event_details
+        _, event_name, event_date, event_time, venue, _ = event_details
+        event = (event_name, event_date, event_time, venue)
+        agenda = None
+        if form.agenda.data:
+            upload = form.agenda.data
+            agenda = email_builder.Attachment(
+                os.path.basename(upload.filename) or "agenda",
+                upload.mimetype or 'application/octet-stream',
+                upload.read()
+            )
 
         if form.send_test.data: # Check if send test button was clicked
             recipient = config.EMAIL_CONFIG.get("sender_email")
             if not recipient or recipient == "your_email@example.com":
                 flash("Please configure 'sender_email' in config.py for testing.", 'danger')
                 return redirect(url_for('emails_page'))
-            
-            email_utils.send_email(recipient, f"TEST: {subject}", body)
+
+            # Rendered for a sample recipient, so the merge fields can be checked.
+            try:
+                subject_template = email_templates.compile_template(subject, event_id, event)
+                body_template = email_templates.compile_template(body, event_id, event)
+            except email_templates.TemplateError as e:
+                flash(f"Error: {e}", 'danger')
+                return _emails_page(form)
+            attachments = []
+            if form.attach_invite.data:
+                attachments.append(email_builder.calendar_invite(event_id, event))
+            if agenda:
+                attachments.append(agenda)
+            sample = ("TEST0001", "Test Recipient", recipient)
+            email_utils.send_email(recipient, f"TEST: {subject_template.render(*sample)}", body_template.render(*sample),
+                                   attachments)
             flash(f"Test email sent to {recipient}", 'success')
         else:
-            registered_students_data = registrations.get_registered_students(event_id)
-            if not registered_students_data:
-                flash("No students are registered for this event.", 'warning')
-                return redirect(url_for('emails_page'))
-
-            recipients = [student[2] for student in registered_students_data if student[2]]
-            if not recipients:
-                flash("No valid email addresses found for registered students.", 'warning')
+            # Recipients are resolved (deduplicated, suppressed addresses left out) in the database.
+            try:
+                campaign_id, count = campaigns.start_campaign(
+                    event_id, event, subject, body, attach_invite=form.attach_invite.data,
+                    agenda=agenda, created_by=session.get('username')
+                )
+            except email_templates.TemplateError as e:
+                flash(f"Error: {e}", 'danger')
+                return _emails_page(form)
+            if campaign_id is None:
+                flash("Error: No deliverable email addresses among the registered students, "
+                      "or the campaign could not be recorded.", 'warning')
                 return redirect(url_for('emails_page'))
-            
-            email_utils.send_emails_in_background(recipients, subject, body)
-            flash(f"Emails are being sent to {len(recipients)} recipients in the background.", 'info')
+            flash(f"Campaign {campaign_id}: emails are being sent to {count} recipients in the background.", 'info')
+            return redirect(url_for('emails_page', campaign_id=campaign_id))
 
         return redirect(url_for('emails_page'))
 
-    return render_template('emails.html', form=form)
+    return _emails_page(form)
+
+@app.route('/emails/resend', methods=['POST'])
+def resend_campaign():
+    if 'username' not in session or session.get('role') != 'admin':
+        return redirect(url_for('login'))
+
+    form = ResendCampaignForm()
+    if form.validate_on_submit():
+        campaign_id = form.campaign_id.data
+        result = campaigns.resend_failed(campaign_id)
+        if "Success" in result:
+            flash(result, 'success')
+        elif "Info" in result:
+            flash(result, 'info')
+        else:
+            flash(result, 'danger')
+        return redirect(url_for('emails_page', campaign_id=campaign_id))
+    return redirect(url_for('emails_page'))
@@ -0,0 +1,20 @@
+# wsgi.py
+# WSGI entry point for production servers.
+#
+# Point any WSGI server at `event_system.wsgi:application`, for example:
+#
+#   gunicorn --workers 4 --threads 4 event_system.wsgi:application
+#
+# or use the bundled launcher, which also manages per-worker connection pools:
+#
+#   python -m event_system --serve --workers 4 --threads 4
+#
+# With another server, run the reminder scheduler (REMINDERS_ENABLED) on its
+# own: python -m event_system.reminders
+
+from .web_ui import create_app
+
+application = create_app()
+
+# Some servers look for `app` rather than `application`.
+app = application
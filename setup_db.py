@@ -3,6 +3,7 @@ import oracledb
 import os
 from dotenv import load_dotenv
 import re
+import sys
 
 load_dotenv()
 
@@ -44,5 +45,33 @@ def setup_database():
         if 'connection' in locals() and connection:
             connection.close()
 
+def setup_sqlite_database():
+    from event_system import sqlite_backend
+    from event_system.config import DB_CONFIG
+    try:
+        sqlite_backend.create_schema(DB_CONFIG['sqlite_path'])
+        print(f"SQLite database created at {DB_CONFIG['sqlite_path']}.")
+    except sqlite_backend.DatabaseError as e:
+        print(f"Database setup error: {e}")
+
+def record_migrations():
+    # The schema scripts already contain every migration; record them so
+    # later runs of the migration runner only apply newer ones.
+    from event_system import db, migrations
+    try:
+        migrations.migrate()
+    finally:
+        db.close_pool()
+
 if __name__ == "__main__":
-    setup_database()
+    if "--migrate" in sys.argv[1:]:
+        # Bring an existing database up to date without dropping anything.
+        from event_system import migrations
+        sys.argv.remove("--migrate")
+        migrations.main()
+    else:
+        if os.getenv("DB_BACKEND", "oracle").lower() == "sqlite":
+            setup_sqlite_database()
+        else:
+            setup_database()
+        record_migrations()
@@ -0,0 +1,34 @@
+# conftest.py
+# Shared setup for the test suite.
+#
+# config.py reads the environment when it is first imported, so the tests
+# select the SQLite backend and a throwaway database file here, before any
+# event_system module is loaded. Tests that touch the database take the
+# `database` fixture, which gives them freshly created tables.
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+_DB_DIR = tempfile.mkdtemp(prefix="event_system_tests_")
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ['SQLITE_PATH'] = os.path.join(_DB_DIR, 'test.db')
+# Check-in codes are then signed with a random key (see email_templates.py).
+os.environ.pop('CHECK_IN_SECRET', None)
+os.environ.pop('SECRET_KEY', None)
+
+
+@pytest.fixture
+def database():
+    """An empty database with every table; yields the db module."""
+    from event_system import db, sqlite_backend
+    from event_system.config import DB_CONFIG
+    db.close_pool()
+    sqlite_backend.create_schema(DB_CONFIG['sqlite_path'])
+    yield db
+    db.close_pool()
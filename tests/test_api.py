@@ -0,0 +1,48 @@
+# test_api.py
+# Status codes of the REST API (api.py) for registration requests.
+
+import pytest
+
+from event_system import intake
+from event_system.web_ui import app
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['username'] = 'admin'
+        session['role'] = 'admin'
+    return client
+
+
+@pytest.mark.parametrize("body", [{}, {'student_id': ''}, {'student_id': '  '}, {'student_id': ['S1']},
+                                  {'student_id': True}])
+def test_registration_needs_a_student_id(client, monkeypatch, body):
+    monkeypatch.setattr(intake, "register", lambda event_id, student_id: pytest.fail("registered"))
+
+    response = client.post('/api/v1/events/1/registrations', json=body)
+
+    assert response.status_code == 400
+
+
+def test_numeric_student_id_is_registered_as_a_string(client, monkeypatch):
+    calls = []
+    monkeypatch.setattr(intake, "register",
+                        lambda event_id, student_id: calls.append(student_id) or ("Success: Registered.", None))
+
+    response = client.post('/api/v1/events/1/registrations', json={'student_id': 1042})
+
+    assert response.status_code == 201
+    assert calls == ["1042"]
+
+
+def test_full_intake_queue_is_service_unavailable(client, monkeypatch):
+    monkeypatch.setattr(intake, "register", lambda event_id, student_id: (intake.QUEUE_FULL_MESSAGE, None))
+
+    response = client.post('/api/v1/events/1/registrations', json={'student_id': 'S1'})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == str(intake.QUEUE_FULL_RETRY_SECONDS)
+    assert response.get_json() == {'status': 'error', 'message': intake.QUEUE_FULL_MESSAGE}
@@ -0,0 +1,154 @@
+# test_campaigns.py
+# Delivery records of email campaigns: campaigns.DeliveryLog, the sender's
+# recipient stream and the recovery of a send whose process stopped.
+
+import datetime
+import smtplib
+
+import pytest
+
+from event_system import campaigns, email_utils
+
+
+@pytest.fixture
+def campaign(database):
+    """A campaign with three PENDING deliveries (students S1 to S3); yields its ID."""
+    with database.get_connection() as conn:
+        with database.cursor(conn) as cursor:
+            cursor.execute(
+                "INSERT INTO EVENTS (event_name, event_date, event_time, venue, total_slots) "
+                "VALUES ('Career Fair', :event_date, '10:00 AM', 'Hall B', 100)",
+                {'event_date': datetime.date(2030, 5, 1)}
+            )
+            cursor.executemany(
+                "INSERT INTO STUDENTS (student_id, name, email) VALUES (:student_id, :name, :email)",
+                [{'student_id': f"S{n}", 'name': f"Student {n}", 'email': f"s{n}@example.edu"} for n in (1, 2, 3)]
+            )
+            cursor.execute(
+                "INSERT INTO EMAIL_CAMPAIGNS (event_id, subject, body, created_date, recipients, heartbeat) "
+                "VALUES (1, 'Hello', 'Dear {{ name }}', :now, 3, :now)",
+                {'now': datetime.datetime.now()}
+            )
+            cursor.executemany(
+                "INSERT INTO EMAIL_DELIVERIES (campaign_id, student_id, email, status) "
+                "VALUES (1, :student_id, :email, 'PENDING')",
+                [{'student_id': f"S{n}", 'email': f"s{n}@example.edu"} for n in (1, 2, 3)]
+            )
+            conn.commit()
+    yield 1
+
+
+def _deliveries(db):
+    with db.get_connection() as conn:
+        with db.cursor(conn) as cursor:
+            cursor.execute("SELECT student_id, status, last_error FROM EMAIL_DELIVERIES ORDER BY student_id")
+            return cursor.fetchall()
+
+
+def _counters(db, campaign_id):
+    with db.get_connection() as conn:
+        with db.cursor(conn) as cursor:
+            cursor.execute("SELECT sent, failed, heartbeat FROM EMAIL_CAMPAIGNS WHERE campaign_id = :campaign_id",
+                           {'campaign_id': campaign_id})
+            return cursor.fetchone()
+
+
+def _set(db, statement, params=None):
+    with db.get_connection() as conn:
+        with db.cursor(conn) as cursor:
+            cursor.execute(statement, params or {})
+            conn.commit()
+
+
+def test_outcomes_follow_the_recipients_handed_to_the_sender(database, campaign):
+    log = campaigns.DeliveryLog(campaign)
+    log.sending("S1")
+    log.skip("S2", "No email address")
+    log.sending("S3")
+    log.record("s1@example.edu")
+    log.record("s3@example.edu", smtplib.SMTPServerDisconnected("Connection unexpectedly closed"))
+    log.flush()
+
+    assert _deliveries(database) == [
+        ("S1", "SENT", None),
+        ("S2", "FAILED", "No email address"),
+        ("S3", "FAILED", "Connection unexpectedly closed"),
+    ]
+    sent, failed, heartbeat = _counters(database, campaign)
+    assert (sent, failed) == (1, 2)
+    assert heartbeat is not None
+
+
+def test_permanent_rejection_suppresses_the_address(database, campaign):
+    log = campaigns.DeliveryLog(campaign)
+    log.sending("S1")
+    log.record(" S1@Example.edu", smtplib.SMTPRecipientsRefused({"S1@Example.edu": (550, b"No such user")}))
+    log.flush()
+
+    rows = campaigns.get_suppressions()
+    assert [(email, reason) for email, reason, _ in rows] == [
+        ("s1@example.edu", "Bounced (campaign 1): 550 No such user")
+    ]
+
+
+def test_only_pending_deliveries_are_updated_and_counted(database, campaign):
+    _set(database, "UPDATE EMAIL_DELIVERIES SET status = 'FAILED', last_error = 'Not sent' WHERE student_id = 'S1'")
+    log = campaigns.DeliveryLog(campaign)
+    log.sending("S1")
+    log.sending("S2")
+    log.record("s1@example.edu")
+    log.record("s2@example.edu")
+    log.flush()
+
+    assert _deliveries(database)[:2] == [("S1", "FAILED", "Not sent"), ("S2", "SENT", None)]
+    assert _counters(database, campaign)[:2] == (1, 0)
+
+
+def test_failed_flush_keeps_the_outcomes(database, campaign, monkeypatch):
+    log = campaigns.DeliveryLog(campaign)
+    log.sending("S1")
+    log.record("s1@example.edu")
+    monkeypatch.setattr(campaigns.db, "get_connection", lambda: (_ for _ in ()).throw(RuntimeError("down")))
+    log.flush()
+    monkeypatch.undo()
+    log.flush()
+
+    assert _deliveries(database)[0] == ("S1", "SENT", None)
+
+
+def test_recipients_without_an_address_are_not_handed_to_the_sender(database, campaign):
+    _set(database, "UPDATE EMAIL_DELIVERIES SET email = '' WHERE student_id = 'S2'")
+    log = campaigns.DeliveryLog(campaign)
+    depth = email_utils.EMAIL_QUEUE_DEPTH.value()
+
+    recipients = list(campaigns._pending_recipients(campaign, log, []))
+    for _, _, email in recipients:
+        log.record(email)
+    log.flush()
+
+    assert [student_id for student_id, _, _ in recipients] == ["S1", "S3"]
+    assert email_utils.EMAIL_QUEUE_DEPTH.value() == depth - 1
+    assert [status for _, status, _ in _deliveries(database)] == ["SENT", "FAILED", "SENT"]
+
+
+def test_resend_is_refused_while_the_sender_reports(database, campaign):
+    assert campaigns.resend_failed(campaign) == "Info: Campaign 1 is still sending (3 pending)."
+
+
+def test_resend_recovers_deliveries_left_by_a_stopped_sender(database, campaign, monkeypatch):
+    stale = datetime.datetime.now() - datetime.timedelta(seconds=campaigns.STALE_SEND_SECONDS + 60)
+    _set(database, "UPDATE EMAIL_DELIVERIES SET status = 'SENT' WHERE student_id = 'S1'")
+    _set(database, "UPDATE EMAIL_CAMPAIGNS SET sent = 1, heartbeat = :heartbeat", {'heartbeat': stale})
+    assert campaigns.is_stalled(campaigns.get_campaign(campaign))
+    resent = []
+    monkeypatch.setattr(campaigns, "_send", lambda campaign_id, *args: resent.append((campaign_id, args[-2])))
+
+    result = campaigns.resend_failed(campaign)
+
+    assert result == "Success: Resending campaign 1 to 2 failed recipient(s)."
+    assert resent == [(campaign, 2)]
+    assert [status for _, status, _ in _deliveries(database)] == ["SENT", "PENDING", "PENDING"]
+    sent, failed, heartbeat = _counters(database, campaign)
+    assert (sent, failed) == (1, 0)
+    assert heartbeat > stale
+    assert not campaigns.is_stalled(campaigns.get_campaign(campaign))
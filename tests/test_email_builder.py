@@ -0,0 +1,68 @@
+# test_email_builder.py
+# Message framing of email_builder.MessageBuilder and calendar invites.
+
+import datetime
+import email
+import email.policy
+
+from event_system import email_builder
+
+EVENT = ("Annual Tech Symposium", datetime.datetime(2025, 11, 14), "10:30 AM", "Main Auditorium")
+
+
+def _lines(message):
+    """Splits message bytes after each LF, keeping the line endings."""
+    return message.splitlines(keepends=True)
+
+
+def test_long_non_ascii_subject_is_folded_with_crlf():
+    builder = email_builder.MessageBuilder(sender="events@example.edu")
+    subject = "Rappel : « Journée portes ouvertes » commence bientôt — n'oubliez pas votre carte étudiante " * 3
+    message = builder.build("étudiant@example.edu", subject, "Bonjour")
+
+    lines = _lines(message)
+    assert len(lines) > 1
+    for line in lines:
+        assert line.endswith(b"\r\n"), line
+        assert b"\n" not in line[:-2] and b"\r" not in line[:-2], line
+    header_end = message.index(b"\r\n\r\n")
+    assert any(line.startswith(b" =?utf-8?") for line in _lines(message[:header_end + 2]))
+
+    parsed = email.message_from_bytes(message, policy=email.policy.default)
+    assert parsed['Subject'] == subject
+
+
+def test_message_with_attachments_is_crlf_multipart():
+    attachments = [email_builder.calendar_invite(42, EVENT),
+                   email_builder.Attachment("agenda.pdf", "application/pdf", bytes(range(256)) * 40)]
+    builder = email_builder.MessageBuilder(attachments, sender="events@example.edu")
+    message = builder.build("student@example.edu", "Your agenda", "Dear Student,\n\nSee the attached agenda.")
+
+    assert all(line.endswith(b"\r\n") for line in _lines(message))
+    parsed = email.message_from_bytes(message, policy=email.policy.default)
+    assert parsed.get_content_type() == 'multipart/mixed'
+    parts = list(parsed.iter_parts())
+    assert [part.get_content_type() for part in parts] == ['text/plain', 'text/calendar', 'application/pdf']
+    assert parts[0].get_content().replace("\r\n", "\n").strip() == "Dear Student,\n\nSee the attached agenda."
+    assert parts[2].get_content() == bytes(range(256)) * 40
+
+
+def test_body_is_reencoded_only_when_it_changes():
+    builder = email_builder.MessageBuilder(sender="events@example.edu")
+    first = builder.build("a@example.edu", "Hi", "Same body")
+    second = builder.build("b@example.edu", "Hi", "Same body")
+    third = builder.build("c@example.edu", "Hi", "Naïve body")
+
+    assert first.split(b"\r\n\r\n", 1)[1] == second.split(b"\r\n\r\n", 1)[1]
+    parsed = email.message_from_bytes(third, policy=email.policy.default)
+    assert parsed.get_content().strip() == "Naïve body"
+
+
+def test_calendar_invite_times():
+    invite = email_builder.calendar_invite(42, EVENT).data.decode('utf-8')
+    assert "DTSTART:20251114T103000\r\n" in invite
+    assert "DTEND:20251114T123000\r\n" in invite
+
+    all_day = email_builder.calendar_invite(42, EVENT[:2] + ("after lunch", EVENT[3])).data.decode('utf-8')
+    assert "DTSTART;VALUE=DATE:20251114\r\n" in all_day
+    assert "DTEND;VALUE=DATE:20251115\r\n" in all_day
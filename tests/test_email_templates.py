@@ -0,0 +1,26 @@
+# test_email_templates.py
+# Check-in codes of email_templates.py.
+
+import base64
+import hashlib
+import hmac
+
+from event_system import email_templates
+
+
+def test_check_in_code_verifies_for_its_event_and_student():
+    code = email_templates.check_in_code(7, "S1042")
+
+    assert email_templates.verify_check_in_code(7, "S1042", code)
+    assert email_templates.verify_check_in_code(7, "S1042", " " + code.lower().replace("-", " "))
+    assert not email_templates.verify_check_in_code(8, "S1042", code)
+    assert not email_templates.verify_check_in_code(7, "S1043", code)
+    assert not email_templates.verify_check_in_code(7, "S1042", None)
+
+
+def test_codes_are_not_signed_with_a_known_key_when_no_secret_is_set():
+    # conftest.py unsets CHECK_IN_SECRET and SECRET_KEY.
+    digest = hmac.new(b"default_check_in_secret", b"7:S1042", hashlib.sha256).digest()
+    guessed = base64.b32encode(digest[:5]).decode()
+
+    assert not email_templates.verify_check_in_code(7, "S1042", guessed)
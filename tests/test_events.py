@@ -0,0 +1,30 @@
+# test_events.py
+# Reading the clock time out of free-text event times.
+
+import datetime
+
+import pytest
+
+from event_system import events
+
+
+@pytest.mark.parametrize("text, slot", [
+    ("2:00 PM", "14:00"),
+    ("10:30 am", "10:30"),
+    ("12 PM", "12:00"),
+    ("12:15 a.m.", "00:15"),
+    ("14.45", "14:45"),
+    (" 9:05 ", "09:05"),
+    ("25:00", "25:00"),
+    ("After lunch", "After lunch"),
+    (None, ""),
+])
+def test_time_slot(text, slot):
+    assert events.time_slot(text) == slot
+
+
+def test_start_datetime():
+    day = datetime.datetime(2025, 11, 14)
+    assert events.start_datetime(day, "6:30 PM") == datetime.datetime(2025, 11, 14, 18, 30)
+    assert events.start_datetime(day.date(), "08:00") == datetime.datetime(2025, 11, 14, 8, 0)
+    assert events.start_datetime(day, "TBA") is None
@@ -0,0 +1,106 @@
+# test_intake.py
+# Admission control of intake.Intake: direct registrations while an event is
+# quiet, batched queues once it is busy, and the bound on each queue.
+# Registrations are replaced by fakes, so no database is needed.
+
+import os
+import threading
+
+import pytest
+
+from event_system import intake, registrations
+
+
+class FakeRegistrations:
+    """Stands in for registrations.py; registering student S0 waits for `hold`."""
+
+    def __init__(self):
+        self.direct = []
+        self.batches = []
+        self.hold = threading.Event()
+        self.hold.set()
+        self.entered = threading.Event()
+
+    def register_student_for_event(self, event_id, student_id):
+        self.direct.append((event_id, student_id))
+        if student_id == "S0":
+            self.entered.set()
+            self.hold.wait(5)
+        return f"Success: {student_id} registered."
+
+    def register_students_for_event(self, event_id, student_ids):
+        self.batches.append((event_id, list(student_ids)))
+        return [(student_id, f"Success: {student_id} registered.") for student_id in student_ids]
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = FakeRegistrations()
+    monkeypatch.setattr(registrations, "register_student_for_event", fake.register_student_for_event)
+    monkeypatch.setattr(registrations, "register_students_for_event", fake.register_students_for_event)
+    return fake
+
+
+def _busy(fake, queue):
+    """Starts a direct registration for event 1 that stays in flight until fake.hold is set."""
+    fake.hold.clear()
+    thread = threading.Thread(target=queue.register, args=(1, "S0"))
+    thread.start()
+    assert fake.entered.wait(5)
+    return thread
+
+
+def test_quiet_event_registers_directly(fake):
+    queue = intake.Intake(workers=1, batch_size=10, hot_threshold=2, max_pending=10)
+
+    assert queue.register(1, "S1") == ("Success: S1 registered.", None)
+    assert fake.direct == [(1, "S1")]
+    assert queue.queued() == 0
+
+
+def test_busy_event_is_queued_and_registered_in_batches(fake):
+    queue = intake.Intake(workers=1, batch_size=10, hot_threshold=1, max_pending=10)
+    # The workers start once both requests are queued, so they take one batch.
+    queue._pid = os.getpid()
+    busy = _busy(fake, queue)
+
+    first = queue.register(1, "S1", timeout=0)
+    second = queue.register(1, "S2", timeout=0)
+    queue._pid = None
+    queue._start_workers()
+    for _ in range(500):
+        if fake.batches:
+            break
+        threading.Event().wait(0.01)
+    fake.hold.set()
+    busy.join(5)
+
+    assert [position for _, position in (first, second)] == [1, 2]
+    assert fake.batches == [(1, ["S1", "S2"])]
+    assert fake.direct == [(1, "S0")]
+    assert queue.queued() == 0
+
+
+def test_full_queue_turns_requests_away(fake):
+    queue = intake.Intake(workers=1, batch_size=10, hot_threshold=1, max_pending=1)
+    # Workers count as started, so none drains the queue and it stays full.
+    queue._pid = os.getpid()
+    busy = _busy(fake, queue)
+
+    first = queue.register(1, "S1", timeout=0)
+    second = queue.register(1, "S2", timeout=0)
+    fake.hold.set()
+    busy.join(5)
+
+    assert first == ("Info: Registration request is queued (position 1). Check the roster shortly.", 1)
+    assert second == (intake.QUEUE_FULL_MESSAGE, None)
+    assert queue.queued() == 1
+
+
+def test_other_events_are_not_held_back(fake):
+    queue = intake.Intake(workers=1, batch_size=10, hot_threshold=1, max_pending=10)
+    busy = _busy(fake, queue)
+
+    assert queue.register(2, "S9") == ("Success: S9 registered.", None)
+    fake.hold.set()
+    busy.join(5)
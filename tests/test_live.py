@@ -0,0 +1,53 @@
+# test_live.py
+# Limits on Server-Sent Event streams (live.py and the web UI's stream route).
+
+import pytest
+
+from event_system import live
+from event_system.web_ui import app
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(live, "enabled", True)
+    monkeypatch.setattr(live, "max_streams", None)
+    app.config['TESTING'] = True
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['username'] = 'coordinator'
+    return client
+
+
+def test_configure_turns_streams_off_for_several_workers(monkeypatch):
+    monkeypatch.setattr(live, "enabled", True)
+    monkeypatch.setattr(live, "max_streams", None)
+    live.configure(workers=4, threads=8)
+    assert not live.enabled
+
+    live.configure(workers=1, threads=8)
+    assert live.enabled and live.max_streams == 4
+
+
+def test_subscribe_stops_at_the_limit():
+    publisher = live.Publisher()
+    first = publisher.subscribe(1, limit=2)
+    publisher.subscribe(2, limit=2)
+
+    assert publisher.subscribe(1, limit=2) is None
+    publisher.unsubscribe(first)
+    assert publisher.subscribe(1, limit=2) is not None
+
+
+def test_stream_route_without_live_updates(client, monkeypatch):
+    monkeypatch.setattr(live, "enabled", False)
+
+    assert client.get('/events/1/stream').status_code == 204
+
+
+def test_stream_route_over_the_limit_asks_to_retry_later(client, monkeypatch):
+    monkeypatch.setattr(live, "max_streams", 0)
+
+    response = client.get('/events/1/stream')
+
+    assert response.status_code == 200
+    assert response.get_data(as_text=True) == f"retry: {live.BUSY_RETRY_MS}\n\n"
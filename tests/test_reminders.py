@@ -0,0 +1,129 @@
+# test_reminders.py
+# Due reminders of reminders.ReminderScheduler: which are sent, which are
+# skipped, and that each is recorded once. Campaigns are not really started.
+
+import datetime
+
+import pytest
+
+from event_system import campaigns, reminders
+
+START = datetime.datetime(2030, 3, 15, 10, 0)
+
+
+@pytest.fixture
+def event(database):
+    """An event starting at START, with a campaign row for reminders to point at; yields its ID."""
+    with database.get_connection() as conn:
+        with database.cursor(conn) as cursor:
+            cursor.execute(
+                "INSERT INTO EVENTS (event_name, event_date, event_time, venue, total_slots) "
+                "VALUES ('Robotics Demo', :event_date, '10:00', 'Lab 3', 40)",
+                {'event_date': START.date()}
+            )
+            cursor.execute("INSERT INTO EMAIL_CAMPAIGNS (event_id, subject, body) VALUES (1, 'Reminder', 'Body')")
+            conn.commit()
+    yield 1
+
+
+@pytest.fixture
+def started(monkeypatch):
+    """Replaces campaigns.start_campaign; set `started.result` to choose its outcome."""
+    class Started(list):
+        result = (1, 25)
+
+        def __call__(self, event_id, event, subject, body, **kwargs):
+            self.append((event_id, subject))
+            if isinstance(self.result, Exception):
+                raise self.result
+            return self.result
+
+    started = Started()
+    monkeypatch.setattr(campaigns, "start_campaign", started)
+    return started
+
+
+def _scheduler():
+    return reminders.ReminderScheduler([24, 1], refresh_seconds=300, lease_seconds=60, attach_invite=False)
+
+
+def _recorded(db):
+    with db.get_connection() as conn:
+        with db.cursor(conn) as cursor:
+            cursor.execute("SELECT event_id, minutes_before, campaign_id FROM EVENT_REMINDERS ORDER BY minutes_before")
+            return cursor.fetchall()
+
+
+def test_due_reminder_is_sent_once(database, event, started):
+    now = START - datetime.timedelta(hours=23)
+    scheduler = _scheduler()
+    scheduler.refresh(now)
+
+    assert scheduler.send_due(now) == 1
+    assert started == [(event, "Reminder: {{ event_name }} starts in 24 hours")]
+    assert _recorded(database) == [(event, 1440, 1)]
+
+    # A new leader does not send it again.
+    successor = _scheduler()
+    successor.refresh(now)
+    assert successor.send_due(now) == 0
+    assert len(started) == 1
+
+
+def test_nothing_is_sent_before_it_is_due(database, event, started):
+    now = START - datetime.timedelta(hours=25)
+    scheduler = _scheduler()
+    scheduler.refresh(now)
+
+    assert scheduler.send_due(now) == 0
+    assert started == []
+
+
+def test_overdue_reminder_gives_way_to_a_shorter_one(database, event, started):
+    now = START - datetime.timedelta(minutes=30)
+    scheduler = _scheduler()
+    scheduler.refresh(now)
+
+    assert scheduler.send_due(now) == 2
+    assert started == [(event, "Reminder: {{ event_name }} starts in 1 hour")]
+    assert _recorded(database) == [(event, 60, 1), (event, 1440, None)]
+
+
+def test_no_reminders_once_the_event_started(database, event, started):
+    scheduler = _scheduler()
+    scheduler.refresh(START - datetime.timedelta(minutes=5))
+
+    assert scheduler.send_due(START + datetime.timedelta(minutes=1)) == 2
+    assert started == []
+
+
+def test_reminder_without_recipients_is_not_retried(database, event, started):
+    started.result = (None, 0)
+    now = START - datetime.timedelta(minutes=30)
+    scheduler = _scheduler()
+    scheduler.refresh(now)
+    scheduler.send_due(now)
+
+    scheduler.refresh(now)
+    assert scheduler.send_due(now) == 0
+    assert len(started) == 1
+
+
+@pytest.mark.parametrize("failure", [(None, None), RuntimeError("database unavailable")])
+def test_reminder_that_could_not_start_is_retried(database, event, started, failure):
+    started.result = failure
+    now = START - datetime.timedelta(minutes=30)
+    scheduler = _scheduler()
+    scheduler.refresh(now)
+    try:
+        scheduler.send_due(now)
+    except RuntimeError:
+        pass
+    assert (event, 60, None) not in _recorded(database)
+
+    started.result = (1, 25)
+    later = now + datetime.timedelta(minutes=5)
+    scheduler.refresh(later)
+    assert scheduler.send_due(later) == 1
+    assert started[-1] == (event, "Reminder: {{ event_name }} starts in 1 hour")
+    assert (event, 60, 1) in _recorded(database)
@@ -0,0 +1,44 @@
+# test_sqlite_backend.py
+# Translation of the modules' Oracle-flavoured SQL by sqlite_backend.py.
+
+import pytest
+
+from event_system import sqlite_backend
+
+
+@pytest.mark.parametrize("statement, expected", [
+    ("SELECT * FROM STUDENTS WHERE student_id IN (:1, :2, :10)",
+     "SELECT * FROM STUDENTS WHERE student_id IN (?1, ?2, ?10)"),
+    ("SELECT * FROM EVENTS WHERE event_id = :event_id", "SELECT * FROM EVENTS WHERE event_id = :event_id"),
+    ("SELECT ':1', 'it''s :2' FROM EVENTS WHERE event_id = :1",
+     "SELECT ':1', 'it''s :2' FROM EVENTS WHERE event_id = ?1"),
+    ("UPDATE EVENTS SET event_time = '10:30' WHERE event_id = :3",
+     "UPDATE EVENTS SET event_time = '10:30' WHERE event_id = ?3"),
+])
+def test_positional_binds(statement, expected):
+    assert sqlite_backend.translate(statement) == (expected, False)
+
+
+@pytest.mark.parametrize("clause", [
+    " FOR UPDATE", " for update", "\nFOR UPDATE NOWAIT", " FOR UPDATE SKIP LOCKED", " FOR  UPDATE WAIT 5 ",
+])
+def test_for_update_takes_the_write_lock(clause):
+    statement = "SELECT total_slots FROM EVENTS WHERE event_id = :event_id"
+
+    assert sqlite_backend.translate(statement + clause) == (statement, True)
+
+
+def test_for_update_inside_a_literal_is_kept():
+    statement = "SELECT 'FOR UPDATE' FROM EVENTS"
+
+    assert sqlite_backend.translate(statement + " FOR UPDATE") == (statement, True)
+    assert sqlite_backend.translate(statement) == (statement, False)
+
+
+def test_locking_select_starts_an_immediate_transaction(database):
+    with database.get_connection() as conn:
+        with database.cursor(conn) as cursor:
+            cursor.execute("SELECT COUNT(*) FROM EVENTS WHERE event_id = :1 FOR UPDATE", [1])
+            assert cursor.fetchone() == (0,)
+            assert conn._raw.in_transaction
+            conn.rollback()
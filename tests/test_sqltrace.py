@@ -0,0 +1,56 @@
+# test_sqltrace.py
+# Statement tracing of the asyncio read functions (db.async_cursor) and the
+# normalized statement text used as the metric label.
+
+import asyncio
+import datetime
+import json
+import logging
+
+import pytest
+
+from event_system import events, sqltrace
+
+
+@pytest.fixture
+def tracing(monkeypatch):
+    """Turns tracing on with every statement logged as slow; yields the statements seen by a listener."""
+    monkeypatch.setattr(sqltrace, "enabled", True)
+    monkeypatch.setattr(sqltrace, "slow_query_seconds", 0)
+    seen = []
+    listener = lambda statement, parameters, many: seen.append(statement)
+    sqltrace.add_listener(listener)
+    yield seen
+    sqltrace.remove_listener(listener)
+
+
+def _run(coroutine, db):
+    async def run():
+        try:
+            return await coroutine
+        finally:
+            await db.close_async_pool()
+    return asyncio.run(run())
+
+
+def test_async_reads_are_traced(database, tracing, caplog):
+    for name in ("Orientation", "Hackathon"):
+        events.create_event(name, datetime.date(2030, 1, 10), "09:00 AM", "Hall A", 50)
+    tracing.clear()
+    caplog.clear()
+
+    with caplog.at_level(logging.WARNING, logger="event_system.sql"):
+        rows = _run(events.get_all_events_async(), database)
+
+    assert sorted(row[1] for row in rows) == ["Hackathon", "Orientation"]
+    assert len(tracing) == 1 and "FROM EVENTS" in tracing[0]
+    entries = [json.loads(record.getMessage()) for record in caplog.records]
+    assert [(entry['event'], entry['rows']) for entry in entries] == [('slow_query', 2)]
+
+
+def test_bind_lists_of_any_length_share_a_label(database):
+    statement = "SELECT student_id FROM STUDENTS WHERE student_id IN ({})"
+    labels = {sqltrace.normalize(statement.format(database.bind_list(ids)[0]))
+              for ids in (["S1"], ["S1", "S2", "S3"], [f"S{n}" for n in range(database.IN_LIST_CHUNK_SIZE)])}
+
+    assert labels == {"SELECT student_id FROM STUDENTS WHERE student_id IN (…)"}
@@ -0,0 +1,41 @@
+# test_web_ui.py
+# Access to the /metrics endpoint of the web UI, with and without METRICS_TOKEN.
+
+import pytest
+
+from event_system import config
+from event_system.web_ui import app
+
+
+@pytest.fixture
+def client():
+    app.config['TESTING'] = True
+    return app.test_client()
+
+
+def test_metrics_are_open_without_a_token(client, monkeypatch):
+    monkeypatch.setitem(config.WEB_CONFIG, 'metrics_token', None)
+
+    response = client.get('/metrics')
+
+    assert response.status_code == 200
+    assert b"event_system_http_requests_total" in response.data
+
+
+@pytest.mark.parametrize("headers", [{}, {'Authorization': 'Bearer wrong'}, {'Authorization': 's3cret'},
+                                     {'Authorization': 'Bearer s3crét'}])
+def test_metrics_need_the_token_once_it_is_set(client, monkeypatch, headers):
+    monkeypatch.setitem(config.WEB_CONFIG, 'metrics_token', 's3cret')
+
+    response = client.get('/metrics', headers=headers)
+
+    assert response.status_code == 401
+    assert response.headers['WWW-Authenticate'] == 'Bearer'
+
+
+def test_metrics_are_served_with_the_token(client, monkeypatch):
+    monkeypatch.setitem(config.WEB_CONFIG, 'metrics_token', 's3cret')
+
+    response = client.get('/metrics', headers={'Authorization': 'Bearer s3cret'})
+
+    assert response.status_code == 200